@@ -1,65 +1,161 @@
+import time
 import logging
 from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Set, Tuple
 from utils.db_manager import DBManager
+from utils.candidate_record import CandidateRecord
 from utils.email_sender import send_email
+from utils.checkpoints import CheckpointManager, STAGE_SCHEDULE
+from utils.slot_allocator import SlotAllocator, InterviewRequest, Booking
+from config import INTERVIEW_AVAILABILITY_FILE, INTERVIEW_MIN_NOTICE_HOURS
 
 logger = logging.getLogger(__name__)
 
+SCHEDULE_COLUMNS = ("id", "candidate_name", "email", "match_score", "resume_id")
+BOOKING_ATTEMPTS = 3 # Re-allocation rounds for bookings that lost their slot to another process
+
 class InterviewSchedulerAgent:
-    def __init__(self, db_manager: DBManager):
+    def __init__(self, db_manager: DBManager, checkpoints: Optional[CheckpointManager] = None):
         self.db_manager = db_manager
+        self.checkpoints = checkpoints or CheckpointManager(db_manager)
 
     def schedule_interviews(self, jd_id: int, job_title: str = "the Position"):
+        if self.checkpoints.is_done(STAGE_SCHEDULE, jd_key=str(jd_id)):
+            logger.info(f"Interview scheduling for JD ID {jd_id} already completed in a previous run. Skipping.")
+            return
+
         logger.info(f"Starting interview scheduling for shortlisted candidates for JD ID: {jd_id} ({job_title})")
-        
-        shortlisted_candidates = self.db_manager.get_candidates_by_status_for_jd(jd_id, 'shortlisted')
-        # get_candidates_by_status_for_jd returns: id, candidate_name, email, match_score, resume_file_path
+        self.schedule_all_interviews([(jd_id, job_title)])
 
-        if not shortlisted_candidates:
-            logger.info(f"No shortlisted candidates found for JD ID: {jd_id} to schedule interviews.")
-            self.db_manager.add_log("InterviewSchedulerAgent", "INFO", f"No shortlisted candidates for JD {jd_id} to schedule.")
-            return
+    def schedule_all_interviews(self, jds: List[Tuple[int, str]]) -> int:
+        """
+        Schedules every shortlisted candidate of `jds` ((jd_id, job_title) pairs) in one allocation, best
+        match score first across all of them, then sends the invitations. Returns the number invited.
+        """
+        candidates_by_jd = {
+            jd_id: list(self.db_manager.iter_candidates_for_jd(jd_id, columns=SCHEDULE_COLUMNS, status='shortlisted'))
+            for jd_id, _ in jds
+        }
+        bookings = self._book_slots(jds, candidates_by_jd)
+
+        invited_total = 0
+        for jd_id, job_title in jds:
+            candidates = candidates_by_jd[jd_id]
+            if not candidates:
+                logger.info(f"No shortlisted candidates found for JD ID: {jd_id} to schedule interviews.")
+                self.db_manager.add_log("InterviewSchedulerAgent", "INFO", f"No shortlisted candidates for JD {jd_id} to schedule.")
+                self.checkpoints.save(STAGE_SCHEDULE, {"invited": 0}, jd_key=str(jd_id))
+                continue
+
+            scheduled_count, unscheduled_count = 0, 0
+            for candidate in candidates:
+                if bookings is not None and candidate.id not in bookings:
+                    # Stays 'shortlisted', so a later run picks it up once more availability is added
+                    logger.warning(f"No free interview slot for {candidate.candidate_name} (ID: {candidate.id}) for JD {jd_id}.")
+                    unscheduled_count += 1
+                    continue
+                booking = bookings.get(candidate.id) if bookings is not None else None
+                if self._send_invitation(jd_id, job_title, candidate, booking):
+                    scheduled_count += 1
+
+            if unscheduled_count:
+                self.db_manager.add_log("InterviewSchedulerAgent", "WARNING",
+                                        f"{unscheduled_count} shortlisted candidates for JD {jd_id} could not be given an interview slot.")
+            logger.info(f"Interview scheduling process completed for JD ID: {jd_id}. Invitations sent to {scheduled_count} candidates.")
+            self.checkpoints.save(STAGE_SCHEDULE, {"invited": scheduled_count, "unscheduled": unscheduled_count}, jd_key=str(jd_id))
+            invited_total += scheduled_count
+        return invited_total
+
+    def _book_slots(self, jds: List[Tuple[int, str]], candidates_by_jd: Dict[int, List[CandidateRecord]]) -> Optional[Dict[int, Booking]]:
+        """Interview slot per candidate id, existing bookings included; None when no availability is configured."""
+        now = datetime.now()
+        allocator = SlotAllocator.from_file(INTERVIEW_AVAILABILITY_FILE, now=now, min_notice_hours=INTERVIEW_MIN_NOTICE_HOURS)
+        if allocator is None:
+            logger.warning(f"No interviewer availability file at {INTERVIEW_AVAILABILITY_FILE}; proposing a generic interview time.")
+            return None
+
+        # Upcoming bookings from earlier runs and other workers: taken slots, and already-booked candidates keep theirs
+        booked = self._reserve_booked(allocator, now, set())
+        reserved = set(booked)
 
-        scheduled_count = 0
-        for candidate_info in shortlisted_candidates:
-            candidate_id, name, email, score, _ = candidate_info
-            
-            logger.info(f"Processing candidate {name} ({email}) for interview scheduling.")
+        titles = dict(jds)
+        pending = [InterviewRequest(candidate.id, candidate.resume_id, candidate.match_score or 0.0,
+                                    allocator.panel_for(jd_id, titles[jd_id]))
+                   for jd_id, candidates in candidates_by_jd.items() for candidate in candidates if candidate.id not in booked]
+        bookings = {candidate.id: booked[candidate.id] for candidates in candidates_by_jd.values()
+                    for candidate in candidates if candidate.id in booked}
+        reused = len(bookings)
+        started = time.monotonic()
+        for _ in range(BOOKING_ATTEMPTS):
+            if not pending:
+                break
+            allocated = allocator.allocate(pending)
+            conflicts = set(self.db_manager.add_interview_bookings([
+                (booking.match_id, booking.interviewers, booking.start.isoformat(timespec="minutes"),
+                 booking.end.isoformat(timespec="minutes")) for booking in allocated.values()
+            ]))
+            bookings.update({match_id: booking for match_id, booking in allocated.items() if match_id not in conflicts})
+            # Another process booked overlapping time first: reserve its bookings so the next round avoids them
+            pending = [request for request in pending if request.match_id in conflicts]
+            if pending:
+                reserved.update(self._reserve_booked(allocator, now, reserved | set(bookings)))
+        logger.info(f"Interview slots: {len(bookings)} booked ({reused} from earlier runs) for "
+                    f"{sum(len(candidates) for candidates in candidates_by_jd.values())} shortlisted candidates "
+                    f"in {time.monotonic() - started:.3f}s")
+        return bookings
 
-            # Simple time slot suggestion (can be made more sophisticated)
-            # For this example, let's suggest a generic time or ask them to reply
-            # A real system might use a calendar API or a scheduling link.
+    def _reserve_booked(self, allocator: SlotAllocator, now: datetime, known: Set[int]) -> Dict[int, Booking]:
+        """Reserves upcoming stored bookings (except the match ids in `known`) in the allocator and returns them."""
+        booked: Dict[int, Booking] = {}
+        for match_id, resume_id, interviewer, slot_start, slot_end in self.db_manager.get_interview_bookings(now.isoformat(timespec="minutes")):
+            if match_id in known:
+                continue
+            start, end = datetime.fromisoformat(slot_start), datetime.fromisoformat(slot_end)
+            allocator.reserve(interviewer, start, end, resume_id=resume_id)
+            previous = booked.get(match_id)
+            booked[match_id] = Booking(match_id, (previous.interviewers if previous else ()) + (interviewer,), start, end)
+        return booked
+
+    def _send_invitation(self, jd_id: int, job_title: str, candidate: CandidateRecord, booking: Optional[Booking]) -> bool:
+        candidate_id, name, email = candidate.id, candidate.candidate_name, candidate.email
+        logger.info(f"Processing candidate {name} ({email}) for interview scheduling.")
+
+        if booking:
+            slot_text = f"""We have scheduled your interview for:
+{booking.start.strftime('%A, %Y-%m-%d from %H:%M')} to {booking.end.strftime('%H:%M')}
+with {', '.join(booking.interviewers)}.
+
+Please reply to this email to confirm, or to request an alternative time."""
+        else:
+            # Without interviewer availability, suggest a generic time and let the candidate confirm
             interview_time_suggestion = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d at 10:00 AM (Your Local Time)")
-            
-            subject = f"Interview Invitation: {job_title}"
-            body = f"""
+            slot_text = f"""We have tentatively proposed an interview slot for you on:
+{interview_time_suggestion}
+
+Please reply to this email to confirm your availability or to request an alternative time."""
+
+        subject = f"Interview Invitation: {job_title}"
+        body = f"""
 Dear {name},
 
 Congratulations! We were impressed with your application for the {job_title} position (Ref JD ID: {jd_id}) and would like to invite you for an interview.
 
-We have tentatively proposed an interview slot for you on:
-{interview_time_suggestion}
-
-Please reply to this email to confirm your availability or to request an alternative time.
+{slot_text}
 We look forward to speaking with you.
 
 Best regards,
 The Hiring Team
 """
-            # Send email
-            email_sent = send_email(to_email=email, subject=subject, body=body)
-
-            if email_sent:
-                # Update candidate status and tentative interview time (or note that invitation was sent)
-                # For simplicity, we'll just update status to 'invited'.
-                # A real system might store the proposed slot or wait for confirmation.
-                self.db_manager.update_candidate_status(candidate_id, 'invited') #, interview_datetime=interview_time_suggestion if you want to store it
-                logger.info(f"Interview invitation sent to {name} ({email}). Status updated to 'invited'.")
-                self.db_manager.add_log("InterviewSchedulerAgent", "INFO", f"Interview invitation sent to {name} (ID: {candidate_id}) for JD {jd_id}.")
-                scheduled_count += 1
-            else:
-                logger.error(f"Failed to send interview invitation email to {name} ({email}).")
-                self.db_manager.add_log("InterviewSchedulerAgent", "ERROR", f"Failed to send email to {name} (ID: {candidate_id}) for JD {jd_id}.")
-                # Optionally, update status to 'invitation_failed' or retry later.
-
-        logger.info(f"Interview scheduling process completed for JD ID: {jd_id}. Invitations sent to {scheduled_count} candidates.")
\ No newline at end of file
+        # Send email
+        email_sent = send_email(to_email=email, subject=subject, body=body)
+
+        if email_sent:
+            # The booked slot is already stored in interview_datetime; the status records that the invitation went out
+            self.db_manager.update_candidate_status(candidate_id, 'invited')
+            logger.info(f"Interview invitation sent to {name} ({email}). Status updated to 'invited'.")
+            self.db_manager.add_log("InterviewSchedulerAgent", "INFO", f"Interview invitation sent to {name} (ID: {candidate_id}) for JD {jd_id}.")
+            return True
+        logger.error(f"Failed to send interview invitation email to {name} ({email}).")
+        self.db_manager.add_log("InterviewSchedulerAgent", "ERROR", f"Failed to send email to {name} (ID: {candidate_id}) for JD {jd_id}.")
+        # The booking is kept, so a retry re-sends the same slot
+        return False
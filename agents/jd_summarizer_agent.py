@@ -2,17 +2,14 @@ import json
 import logging
 from utils.ollama_client import OllamaClient
 from utils.db_manager import DBManager
+from utils.checkpoints import CheckpointManager, STAGE_JD_SUMMARY, text_hash
 from typing import Optional, Tuple, Dict, Any # Import necessary types
 
 logger = logging.getLogger(__name__)
 
-class JDSummarizerAgent:
-    def __init__(self, ollama_client: OllamaClient, db_manager: DBManager):
-        self.ollama_client = ollama_client
-        self.db_manager = db_manager
 
-    def summarize_jd(self, jd_text: str, source_file: str = "N/A") -> Optional[Tuple[int, Dict[str, Any]]]:
-        prompt = f"""
+def build_summary_prompt(jd_text: str) -> str:
+    return f"""
         Analyze the following job description and extract key information.
         Please format your response as a JSON object with the following keys:
         - "job_title": (string) The job title.
@@ -30,6 +27,44 @@ class JDSummarizerAgent:
 
         Ensure the output is a valid JSON object.
         """
+
+
+def apply_summary_defaults(summary_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Initialize missing keys with default values
+    summary_data.setdefault("job_title", "Not specified")
+    summary_data.setdefault("required_skills", [])
+    summary_data.setdefault("experience_years", "Not specified")
+    summary_data.setdefault("education_level", "Not specified")
+    summary_data.setdefault("responsibilities", [])
+    summary_data.setdefault("company_culture_keywords", [])
+    summary_data.setdefault("location", "Not specified")
+    return summary_data
+
+
+class JDSummarizerAgent:
+    def __init__(self, ollama_client: OllamaClient, db_manager: DBManager, checkpoints: Optional[CheckpointManager] = None):
+        self.ollama_client = ollama_client
+        self.db_manager = db_manager
+        self.checkpoints = checkpoints or CheckpointManager(db_manager)
+
+    def _get_checkpointed_summary(self, jd_key: str, source_file: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        checkpoint = self.checkpoints.get(STAGE_JD_SUMMARY, jd_key=jd_key)
+        if not checkpoint:
+            return None
+        jd_row = self.db_manager.get_job_description_by_id(checkpoint["jd_id"])
+        if not jd_row or not isinstance(jd_row[2], dict):
+            logger.warning(f"Checkpointed JD ID {checkpoint['jd_id']} for {source_file} is missing from the database. Summarizing again.")
+            return None
+        logger.info(f"Reusing summary of JD ID {jd_row[0]} for {source_file} from checkpoint.")
+        return jd_row[0], jd_row[2]
+
+    def summarize_jd(self, jd_text: str, source_file: str = "N/A") -> Optional[Tuple[int, Dict[str, Any]]]:
+        jd_key = text_hash(jd_text)
+        checkpointed = self._get_checkpointed_summary(jd_key, source_file)
+        if checkpointed:
+            return checkpointed
+
+        prompt = build_summary_prompt(jd_text)
         try:
             logger.info(f"Summarizing Job Description from {source_file}...")
             # The ollama_client.generate_completion with format_json=True should return a dict
@@ -56,16 +91,7 @@ class JDSummarizerAgent:
                 logger.error(f"summary_data is None after LLM processing for {source_file}")
                 return None
 
-            # Basic validation of expected keys (can be more robust)
-            expected_keys = ["job_title", "required_skills", "experience_years", "education_level", "responsibilities"]
-            # Initialize missing keys with default values
-            summary_data.setdefault("job_title", "Not specified")
-            summary_data.setdefault("required_skills", [])
-            summary_data.setdefault("experience_years", "Not specified")
-            summary_data.setdefault("education_level", "Not specified")
-            summary_data.setdefault("responsibilities", [])
-            summary_data.setdefault("company_culture_keywords", [])
-            summary_data.setdefault("location", "Not specified")
+            apply_summary_defaults(summary_data)
 
 
             jd_id = self.db_manager.add_job_description(
@@ -79,6 +105,7 @@ class JDSummarizerAgent:
                 self.db_manager.add_log("JDSummarizerAgent", "ERROR", f"Failed to store JD summary for {source_file}")
                 return None
                 
+            self.checkpoints.save(STAGE_JD_SUMMARY, {"jd_id": jd_id}, jd_key=jd_key)
             self.db_manager.add_log("JDSummarizerAgent", "INFO", f"Successfully summarized and stored JD (ID: {jd_id}) from {source_file}")
             logger.info(f"Successfully summarized JD from {source_file}. DB ID: {jd_id}")
             return jd_id, summary_data
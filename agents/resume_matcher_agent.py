@@ -1,44 +1,218 @@
 import os
+import re
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from typing import Optional, Dict, List, Any, Union # Import necessary types
+from typing import Optional, Dict, List, Any, Union, Tuple # Import necessary types
 
 from utils.ollama_client import OllamaClient
 from utils.db_manager import DBManager
-from utils.file_parser import parse_resume
-from config import RESUMES_DIR
+from utils.db_pool import ThreadSafeDBManager
+from utils.file_parser import parse_resume, extract_document_metadata
+from utils.resume_heuristics import extract_resume_fields, missing_fields, is_complete_enough
+from utils.text_compactor import compact_resume_text, DEFAULT_SECTION_PRIORITY
+from utils.skill_vocabulary import SkillVocabulary
+from utils.embedding_store import EmbeddingMatrixStore, embedding_key
+from utils.hybrid_scorer import HybridScorer, NOT_INDEXED
+from utils.near_duplicates import NearDuplicateDetector, DuplicateMatch
+from utils.extraction_batches import BatchItem, pack_batches, parse_batch_response, BATCH_RESULTS_KEY
+from utils.checkpoints import (
+    CheckpointManager, file_hash, STAGE_RESUME_EXTRACT, STAGE_RESUME_MATCH, STAGE_SHORTLIST, STAGE_SCHEDULE
+)
+from config import (
+    RESUMES_DIR, RESUME_EXTRACTION_MODE, RESUME_PROMPT_TOKEN_BUDGET, ENABLE_SKILL_COVERAGE,
+    ENABLE_EMBEDDING_STORE, EMBEDDING_STORE_DIR, EMBEDDING_STORE_DTYPE, RESUME_WORKERS, ENABLE_NEAR_DUPLICATE_DETECTION,
+    RESUME_EXTRACTION_BATCH_SIZE, RESUME_BATCH_TOKEN_BUDGET
+)
 
 logger = logging.getLogger(__name__)
 
-class ResumeMatcherAgent:
-    def __init__(self, ollama_client: OllamaClient, db_manager: DBManager):
-        self.ollama_client = ollama_client
-        self.db_manager = db_manager
+UNKNOWN_EMAIL = "unknown@example.com"
+# Field -> prompt description. Only the fields the heuristics could not fill are sent to the LLM.
+RESUME_FIELD_DESCRIPTIONS: Dict[str, str] = {
+    "candidate_name": '(string) Full name of the candidate. If not found, use "Unknown".',
+    "email": f'(string) Email address. If not found, use "{UNKNOWN_EMAIL}".',
+    "phone": "(string, optional) Phone number.",
+    "skills": "(list of strings) Technical and soft skills.",
+    "experience_summary": "(string) A brief summary of total years of experience and key roles.",
+    "education": '(list of strings) Education details (e.g., "Bachelor\'s in CS - XYZ University").',
+    "projects": "(list of strings, optional) Key projects mentioned.",
+}
+CONTACT_FIELDS = {"candidate_name", "email", "phone"}
+RESUME_EXTENSIONS = (".pdf", ".docx")
+
+
+def is_resume_file(filename: str) -> bool:
+    return filename.lower().endswith(RESUME_EXTENSIONS)
+
+
+def jd_embedding_text(jd_summary: Dict[str, Any]) -> Optional[str]:
+    """Embedding input for a JD summary, or None if the summary has nothing to embed."""
+    jd_skills = jd_summary.get("required_skills", [])
+    jd_responsibilities = jd_summary.get("responsibilities", [])
+    jd_experience = str(jd_summary.get("experience_years", "")) # Ensure string
+    text = f"Required Skills: {', '.join(jd_skills)}. Responsibilities: {', '.join(jd_responsibilities)}. Experience: {jd_experience}"
+    if not text.strip() or text.strip() == "Required Skills: . Responsibilities: . Experience:":
+        return None
+    return text
+
+
+def resume_embedding_text(resume_data: Dict[str, Any]) -> Optional[str]:
+    """Embedding input for extracted resume data, or None if there is nothing to embed."""
+    resume_skills = resume_data.get("skills", [])
+    resume_experience = str(resume_data.get("experience_summary", "")) # Ensure string
+    text = f"Skills: {', '.join(resume_skills)}. Experience Summary: {resume_experience}"
+    if not text.strip() or text.strip() == "Skills: . Experience Summary:":
+        return None
+    return text
 
-    def _extract_structured_resume_data(self, resume_text: str, resume_filename: str) -> Optional[Dict[str, Any]]:
-        prompt = f"""
+
+def compact_for_extraction(resume_text: str, fields_to_extract: List[str]) -> str:
+    section_priority: Dict[str, int] = {}
+    if not CONTACT_FIELDS.intersection(fields_to_extract):
+        # Contact details are already known, so the header block is the least useful content
+        section_priority["header"] = DEFAULT_SECTION_PRIORITY
+    return compact_resume_text(resume_text, RESUME_PROMPT_TOKEN_BUDGET, section_priority)
+
+
+def build_extraction_prompt(resume_text: str, fields_to_extract: List[str]) -> str:
+    field_lines = "\n".join(f'        - "{field}": {RESUME_FIELD_DESCRIPTIONS[field]}' for field in fields_to_extract)
+    return f"""
         Analyze the following resume text and extract key information.
         Please format your response as a JSON object with the following keys:
-        - "candidate_name": (string) Full name of the candidate. If not found, use "Unknown".
-        - "email": (string) Email address. If not found, use "unknown@example.com".
-        - "phone": (string, optional) Phone number.
-        - "skills": (list of strings) Technical and soft skills.
-        - "experience_summary": (string) A brief summary of total years of experience and key roles.
-        - "education": (list of strings) Education details (e.g., "Bachelor's in CS - XYZ University").
-        - "projects": (list of strings, optional) Key projects mentioned.
-
-        Resume Text (first 4000 characters):
+{field_lines}
+
+        Resume Text (cleaned, most relevant sections):
         ---
-        {resume_text[:4000]}
+        {compact_for_extraction(resume_text, fields_to_extract)}
         ---
         Ensure the output is a valid JSON object. If a field is not found, provide a sensible default (e.g., empty list for skills, "N/A" for text fields).
         Prioritize finding the candidate's name and email.
         """
 
+
+def apply_extraction_defaults(extracted_data: Dict[str, Any], resume_filename: str) -> Dict[str, Any]:
+    # Basic validation and default values
+    extracted_data.setdefault("candidate_name", "Unknown")
+    # Ensure a somewhat unique placeholder email if extraction fails
+    default_email_prefix = os.path.splitext(resume_filename)[0].replace(" ", "_").replace(".", "_")
+    extracted_data.setdefault("email", f"unknown_{default_email_prefix}@example.com")
+    extracted_data.setdefault("phone", None) # Explicitly None if not found
+    extracted_data.setdefault("skills", [])
+    extracted_data.setdefault("experience_summary", "N/A")
+    extracted_data.setdefault("education", [])
+    extracted_data.setdefault("projects", [])
+    return extracted_data
+
+
+def merge_extraction(extracted_data: Dict[str, Any], heuristic_data: Dict[str, Any], resume_filename: str) -> Dict[str, Any]:
+    # LLM values win; the heuristics only fill the fields the LLM left empty or was not asked for
+    merged = dict(heuristic_data)
+    merged.update({field: value for field, value in extracted_data.items() if value not in (None, "", [])})
+    return apply_extraction_defaults(merged, resume_filename)
+
+
+def plan_extraction(resume_text: str, resume_filename: str,
+                    metadata: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """Heuristic fields (per RESUME_EXTRACTION_MODE) and the fields still needed from the LLM; [] means no LLM call."""
+    if RESUME_EXTRACTION_MODE not in ("hybrid", "fast"):
+        return {}, list(RESUME_FIELD_DESCRIPTIONS)
+    heuristic_data = extract_resume_fields(resume_text, metadata)
+    fields_to_extract = missing_fields(heuristic_data)
+    logger.debug(f"Heuristics found {sorted(heuristic_data)} for {resume_filename}; missing: {fields_to_extract}")
+
+    if RESUME_EXTRACTION_MODE == "fast" and is_complete_enough(heuristic_data):
+        logger.info(f"Heuristic extraction complete for resume: {resume_filename}. Skipping LLM call.")
+        return heuristic_data, []
+    if not fields_to_extract:
+        logger.info(f"Heuristics extracted every field for resume: {resume_filename}. Skipping LLM call.")
+    return heuristic_data, fields_to_extract
+
+
+def build_batch_extraction_prompt(batch: List[BatchItem]) -> str:
+    fields = [field for field in RESUME_FIELD_DESCRIPTIONS if any(field in item.fields for item in batch)]
+    field_lines = "\n".join(f'        - "{field}": {RESUME_FIELD_DESCRIPTIONS[field]}' for field in fields)
+    resume_blocks = "\n".join(f"        [{item.resume_id}]\n        ---\n        {item.text}\n        ---" for item in batch)
+    return f"""
+        Analyze each of the following {len(batch)} resumes separately and extract key information from each one.
+        Please format your response as a JSON object {{"{BATCH_RESULTS_KEY}": [...]}} with exactly one entry per resume.
+        Each entry is a JSON object with "resume_id" (the id in square brackets above the resume) and the following keys:
+{field_lines}
+
+        Resumes (cleaned, most relevant sections):
+{resume_blocks}
+
+        Ensure the output is a valid JSON object. Never copy details from one resume into another resume's entry.
+        If a field is not found, provide a sensible default (e.g., empty list for skills, "N/A" for text fields).
+        """
+
+
+def valid_batch_entry(entry: Dict[str, Any], item: BatchItem, resume_text: str) -> bool:
+    if not any(field in entry for field in item.fields):
+        return False
+    # An email the resume does not contain was most likely copied from a neighbouring resume in the prompt
+    email = entry.get("email")
+    if isinstance(email, str) and "@" in email and email != UNKNOWN_EMAIL and email.lower() not in resume_text.lower():
+        return False
+    return True
+
+
+class ResumeMatcherAgent:
+    def __init__(self, ollama_client: OllamaClient, db_manager: DBManager, checkpoints: Optional[CheckpointManager] = None):
+        self.ollama_client = ollama_client
+        self.db_manager = db_manager
+        self.checkpoints = checkpoints or CheckpointManager(db_manager)
+        self.skill_vocabulary: Optional[SkillVocabulary] = SkillVocabulary(ollama_client, db_manager) if ENABLE_SKILL_COVERAGE else None
+        self.scorer = HybridScorer()
+        self.embedding_store: Optional[EmbeddingMatrixStore] = None
+        if ENABLE_EMBEDDING_STORE:
+            model_dir = re.sub(r"[^A-Za-z0-9_.-]+", "_", ollama_client.embedding_model)
+            self.embedding_store = EmbeddingMatrixStore(os.path.join(EMBEDDING_STORE_DIR, model_dir), dtype=EMBEDDING_STORE_DTYPE)
+            logger.info(f"Embedding store opened at {self.embedding_store.directory} ({len(self.embedding_store)} vectors, {self.embedding_store.dtype})")
+        self.duplicate_detector: Optional[NearDuplicateDetector] = NearDuplicateDetector(db_manager) if ENABLE_NEAR_DUPLICATE_DETECTION else None
+
+        # Parallel resume processing needs a DB manager that is safe to share across threads
+        self.workers = RESUME_WORKERS if isinstance(db_manager, ThreadSafeDBManager) else 1
+        if RESUME_WORKERS > 1 and self.workers == 1:
+            logger.warning(f"RESUME_WORKERS={RESUME_WORKERS} ignored: the DB manager is not thread-safe. Processing resumes sequentially.")
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+
+    def _get_resume_embedding(self, resume_text_for_embedding: str) -> Optional[Union[List[float], np.ndarray]]:
+        # Identical embedding inputs (same resume across JDs, re-runs) are served from the store
+        if self.embedding_store is None:
+            return self.ollama_client.generate_embedding(resume_text_for_embedding) or None
+        key = embedding_key(resume_text_for_embedding)
+        stored = self.embedding_store.get(key)
+        if stored is not None:
+            logger.debug(f"Reusing stored resume embedding {key}")
+            return stored
+        embedding = self.ollama_client.generate_embedding(resume_text_for_embedding)
+        if embedding:
+            try:
+                self.embedding_store.append([key], [embedding])
+            except ValueError as e:
+                logger.error(f"Could not store resume embedding {key}: {e}")
+        return embedding or None
+
+    def _merge_extraction(self, extracted_data: Dict[str, Any], heuristic_data: Dict[str, Any], resume_filename: str) -> Dict[str, Any]:
+        extracted_data = merge_extraction(extracted_data, heuristic_data, resume_filename)
+        logger.info(f"Successfully extracted data for resume: {resume_filename}. Candidate: {extracted_data.get('candidate_name')}")
+        return extracted_data
+
+    def _extract_structured_resume_data(self, resume_text: str, resume_filename: str,
+                                        metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        heuristic_data, fields_to_extract = plan_extraction(resume_text, resume_filename, metadata)
+        if not fields_to_extract:
+            return apply_extraction_defaults(heuristic_data, resume_filename)
+
+        prompt = build_extraction_prompt(resume_text, fields_to_extract)
+
         try:
-            logger.info(f"Extracting structured data from resume: {resume_filename}")
+            logger.info(f"Extracting structured data from resume: {resume_filename} (fields: {', '.join(fields_to_extract)})")
             # llm_response type depends on ollama_client.generate_completion
             llm_response: Union[Dict[str, Any], str] = self.ollama_client.generate_completion(prompt, format_json=True)
             
@@ -50,39 +224,97 @@ class ResumeMatcherAgent:
                 except json.JSONDecodeError:
                     logger.error(f"Failed to decode LLM response into JSON for resume {resume_filename}. Response: {llm_response}")
                     self.db_manager.add_log("ResumeMatcherAgent", "ERROR", f"Failed to parse resume JSON: {resume_filename} - {llm_response[:200]}")
-                    return None
             elif isinstance(llm_response, dict):
                 extracted_data = llm_response
             else:
                 logger.error(f"Unexpected data format from LLM for resume {resume_filename}. Type: {type(llm_response)}. Response: {str(llm_response)[:200]}")
                 self.db_manager.add_log("ResumeMatcherAgent", "ERROR", f"Unexpected resume data format: {resume_filename} - {str(llm_response)[:200]}")
-                return None
             
-            if extracted_data is None: # Safeguard
+            if extracted_data is None:
+                # The heuristic fields are still usable as long as we know who the candidate is
+                if heuristic_data.get("candidate_name") or heuristic_data.get("email"):
+                    logger.warning(f"LLM extraction failed for resume {resume_filename}; falling back to heuristic fields.")
+                    return apply_extraction_defaults(heuristic_data, resume_filename)
                 logger.error(f"extracted_data is None after LLM processing for resume {resume_filename}")
                 return None
 
-            # Basic validation and default values
-            extracted_data.setdefault("candidate_name", "Unknown")
-            # Ensure a somewhat unique placeholder email if extraction fails
-            default_email_prefix = os.path.splitext(resume_filename)[0].replace(" ", "_").replace(".", "_")
-            extracted_data.setdefault("email", f"unknown_{default_email_prefix}@example.com")
-            extracted_data.setdefault("phone", None) # Explicitly None if not found
-            extracted_data.setdefault("skills", [])
-            extracted_data.setdefault("experience_summary", "N/A")
-            extracted_data.setdefault("education", [])
-            extracted_data.setdefault("projects", [])
-            
-            logger.info(f"Successfully extracted data for resume: {resume_filename}. Candidate: {extracted_data.get('candidate_name')}")
-            return extracted_data
+            return self._merge_extraction(extracted_data, heuristic_data, resume_filename)
 
         except Exception as e:
             logger.error(f"Error extracting structured data from resume {resume_filename}: {e}", exc_info=True)
             self.db_manager.add_log("ResumeMatcherAgent", "ERROR", f"Exception during resume data extraction for {resume_filename}: {e}")
             return None
 
-    def _calculate_similarity(self, text1_embedding: List[float], text2_embedding: List[float]) -> float:
-        if not text1_embedding or not text2_embedding:
+    def _extract_batch(self, batch: List[BatchItem], inputs: Dict[str, Tuple[str, Optional[Dict[str, Any]], Dict[str, Any]]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        One batched extraction prompt. Resumes with a missing, malformed or mixed-up entry are retried: on their
+        own batch if some entries came back, otherwise split in halves; a batch of one uses the single-resume path.
+        """
+        if len(batch) == 1:
+            resume_text, metadata, _ = inputs[batch[0].key]
+            return {batch[0].key: self._extract_structured_resume_data(resume_text, os.path.basename(batch[0].key), metadata)}
+
+        logger.info(f"Extracting structured data from {len(batch)} resumes in one prompt: "
+                    f"{', '.join(os.path.basename(item.key) for item in batch)}")
+        try:
+            llm_response = self.ollama_client.generate_completion(build_batch_extraction_prompt(batch), format_json=True)
+        except Exception as e:
+            logger.error(f"Error in batched resume extraction: {e}", exc_info=True)
+            llm_response = None
+        entries = parse_batch_response(llm_response, [item.resume_id for item in batch])
+
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        retry: List[BatchItem] = []
+        for item in batch:
+            resume_text, _, heuristic_data = inputs[item.key]
+            entry = entries.get(item.resume_id)
+            if entry is None or not valid_batch_entry(entry, item, resume_text):
+                retry.append(item)
+                continue
+            results[item.key] = self._merge_extraction(entry, heuristic_data, os.path.basename(item.key))
+
+        if retry:
+            logger.warning(f"Batched extraction returned no usable entry for {len(retry)} of {len(batch)} resumes. Retrying them.")
+            self.db_manager.add_log("ResumeMatcherAgent", "WARNING", f"Batched extraction retried {len(retry)} of {len(batch)} resumes")
+            parts = [retry] if len(retry) < len(batch) else [retry[:len(retry) // 2], retry[len(retry) // 2:]]
+            for part in parts:
+                results.update(self._extract_batch(part, inputs))
+        return results
+
+    def extract_resumes_batched(self, resumes: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+                                batch_size: int = RESUME_EXTRACTION_BATCH_SIZE,
+                                token_budget: int = RESUME_BATCH_TOKEN_BUDGET) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Batched counterpart of _extract_structured_resume_data for (resume_file_path, raw_text, metadata) tuples.
+        Resumes that still need the LLM after heuristics are packed up to batch_size per prompt, within
+        token_budget tokens of resume text. Returns {resume_file_path: extracted data or None}.
+        """
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        inputs: Dict[str, Tuple[str, Optional[Dict[str, Any]], Dict[str, Any]]] = {}
+        pending: List[BatchItem] = []
+        for resume_file_path, resume_text, metadata in resumes:
+            filename = os.path.basename(resume_file_path)
+            heuristic_data, fields_to_extract = plan_extraction(resume_text, filename, metadata)
+            if not fields_to_extract:
+                results[resume_file_path] = apply_extraction_defaults(heuristic_data, filename)
+                continue
+            inputs[resume_file_path] = (resume_text, metadata, heuristic_data)
+            pending.append(BatchItem(resume_file_path, f"r{len(pending) + 1}",
+                                     compact_for_extraction(resume_text, fields_to_extract), fields_to_extract))
+
+        batches = pack_batches(pending, token_budget, batch_size)
+        if batches:
+            logger.info(f"Extracting {len(pending)} resumes with {len(batches)} batched prompts (up to {batch_size} per prompt)")
+        if self.workers > 1 and len(batches) > 1:
+            batch_results = self._resume_executor().map(lambda batch: self._extract_batch(batch, inputs), batches)
+        else:
+            batch_results = (self._extract_batch(batch, inputs) for batch in batches)
+        for batch_result in batch_results:
+            results.update(batch_result)
+        return results
+
+    def _calculate_similarity(self, text1_embedding: Union[List[float], np.ndarray], text2_embedding: Union[List[float], np.ndarray]) -> float:
+        if text1_embedding is None or text2_embedding is None:
             logger.warning("One or both embeddings are empty, similarity cannot be calculated.")
             return 0.0
         
@@ -104,22 +336,15 @@ class ResumeMatcherAgent:
             logger.error(f"Error calculating cosine similarity: {e}")
             return 0.0
 
-    def process_resumes_for_jd(self, jd_id: int, jd_summary: Dict[str, Any]):
-        logger.info(f"Starting resume processing for JD ID: {jd_id}")
-        if not os.path.exists(RESUMES_DIR):
-            logger.error(f"Resumes directory not found: {RESUMES_DIR}")
-            self.db_manager.add_log("ResumeMatcherAgent", "ERROR", f"Resumes directory not found: {RESUMES_DIR}")
-            return
-
+    def build_jd_context(self, jd_id: int, jd_summary: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Embeds the JD once. The returned context can be reused to score any number of resumes."""
         jd_skills = jd_summary.get("required_skills", [])
-        jd_responsibilities = jd_summary.get("responsibilities", [])
-        jd_experience = str(jd_summary.get("experience_years", "")) # Ensure string
-        
-        jd_text_for_embedding = f"Required Skills: {', '.join(jd_skills)}. Responsibilities: {', '.join(jd_responsibilities)}. Experience: {jd_experience}"
-        if not jd_text_for_embedding.strip() or jd_text_for_embedding.strip() == "Required Skills: . Responsibilities: . Experience:":
-            logger.error(f"JD ID {jd_id} has insufficient information in summary for embedding. Skills: {jd_skills}, Responsibilities: {jd_responsibilities}, Exp: {jd_experience}")
+        jd_text_for_embedding = jd_embedding_text(jd_summary)
+        if jd_text_for_embedding is None:
+            logger.error(f"JD ID {jd_id} has insufficient information in summary for embedding. Skills: {jd_skills}, "
+                         f"Responsibilities: {jd_summary.get('responsibilities', [])}, Exp: {jd_summary.get('experience_years', '')}")
             self.db_manager.add_log("ResumeMatcherAgent", "ERROR", f"JD ID {jd_id} insufficient summary for embedding.")
-            return
+            return None
 
         logger.info(f"Generating embedding for JD ID: {jd_id} using text: '{jd_text_for_embedding[:100]}...'")
         jd_embedding: List[float] = self.ollama_client.generate_embedding(jd_text_for_embedding) # type: ignore # Ollama client returns list
@@ -127,84 +352,417 @@ class ResumeMatcherAgent:
         if not jd_embedding:
             logger.error(f"Failed to generate embedding for JD ID: {jd_id}. Skipping resume matching for this JD.")
             self.db_manager.add_log("ResumeMatcherAgent", "ERROR", f"Failed to generate embedding for JD ID: {jd_id}")
-            return
+            return None
 
-        processed_count = 0
-        for filename in os.listdir(RESUMES_DIR):
-            resume_file_path = os.path.join(RESUMES_DIR, filename)
-            if not (filename.lower().endswith(".pdf") or filename.lower().endswith(".docx")):
-                logger.debug(f"Skipping non-resume file: {filename}")
+        return {"jd_id": jd_id, "summary": jd_summary, "skills": jd_skills, "embedding": jd_embedding,
+                "requirements": self.scorer.jd_requirements(jd_summary)}
+
+    def refresh_jd_contexts(self, jd_contexts: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Adds contexts (summary + embedding) for JDs not yet in the in-memory cache; existing entries are kept warm."""
+        open_jds = self.db_manager.get_open_job_descriptions()
+        open_ids = {jd_id for jd_id, _ in open_jds}
+        for jd_id, jd_summary in open_jds:
+            if jd_id not in jd_contexts:
+                context = self.build_jd_context(jd_id, jd_summary)
+                if context:
+                    jd_contexts[jd_id] = context
+        for jd_id in list(jd_contexts):
+            if jd_id not in open_ids:
+                del jd_contexts[jd_id]
+        return jd_contexts
+
+    def _record_resume_error(self, jd_id: int, resume_file_path: str, error_kind: str):
+        filename = os.path.basename(resume_file_path)
+        if error_kind == "parse":
+            self.db_manager.add_or_update_candidate(
+                job_description_id=jd_id,
+                candidate_name=f"ErrorParsing_{filename}",
+                email=f"error_parse_{os.path.splitext(filename)[0]}@system.local",
+                resume_file_path=resume_file_path,
+                status='error',
+                notes=f"Failed to parse resume text from {filename}"
+            )
+        else:
+            self.db_manager.add_or_update_candidate(
+                job_description_id=jd_id,
+                candidate_name=f"ErrorExtracting_{filename}",
+                email=f"error_extract_{os.path.splitext(filename)[0]}@system.local",
+                resume_file_path=resume_file_path,
+                status='error',
+                notes=f"Failed to extract structured data from {filename}"
+            )
+
+    def prepare_resume(self, resume_file_path: str, resume_key: str,
+                       raw_text: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Parses and extracts one resume (or reuses a checkpointed extraction); raw_text skips parsing when the
+        caller already has it. Returns (structured_resume_data, None) on success or (None, "parse" | "extract") on failure.
+        """
+        filename = os.path.basename(resume_file_path)
+        structured_resume_data = self.checkpoints.get(STAGE_RESUME_EXTRACT, resume_key=resume_key) if resume_key else None
+        if structured_resume_data:
+            logger.info(f"Reusing extracted data for resume {filename} from checkpoint.")
+            return structured_resume_data, None
+
+        raw_resume_text = raw_text or parse_resume(resume_file_path)
+        if not raw_resume_text:
+            logger.warning(f"Could not parse text from resume: {filename}. Skipping.")
+            self.db_manager.add_log("ResumeMatcherAgent", "WARNING", f"Failed to parse resume: {filename}")
+            return None, "parse"
+
+        structured_resume_data = self._extract_structured_resume_data(
+            raw_resume_text, filename, metadata=extract_document_metadata(resume_file_path)
+        )
+        if not structured_resume_data:
+            logger.warning(f"Could not extract structured data from resume: {filename}. Skipping match.")
+            return None, "extract"
+        if resume_key:
+            self.checkpoints.save(STAGE_RESUME_EXTRACT, structured_resume_data, resume_key=resume_key)
+        return structured_resume_data, None
+
+    def _embed_resume(self, structured_resume_data: Dict[str, Any], filename: str) -> Optional[Union[List[float], np.ndarray]]:
+        resume_text_for_embedding = resume_embedding_text(structured_resume_data)
+        if resume_text_for_embedding is None:
+            logger.warning(f"Resume {filename} has insufficient extracted data for embedding. Score will be 0.")
+            return None
+        logger.info(f"Generating embedding for resume: {filename} using text: '{resume_text_for_embedding[:100]}...'")
+        resume_embedding = self._get_resume_embedding(resume_text_for_embedding)
+        if resume_embedding is None:
+            logger.warning(f"Failed to generate embedding for resume: {filename}. Score will be 0.")
+        return resume_embedding
+
+    def match_resume_to_jd(self, jd_context: Dict[str, Any], resume_file_path: str, resume_key: str,
+                           structured_resume_data: Dict[str, Any],
+                           resume_embedding: Optional[Union[List[float], np.ndarray]]) -> Optional[float]:
+        """Stores the candidate for this JD and scores it. Returns the match score, or None if the candidate could not be saved."""
+        jd_id = jd_context["jd_id"]
+        filename = os.path.basename(resume_file_path)
+        candidate_name = structured_resume_data.get("candidate_name", "Unknown")
+        candidate_email = structured_resume_data.get("email", f"unknown_{os.path.splitext(filename)[0]}@example.com")
+        candidate_phone = structured_resume_data.get("phone")
+
+        candidate_id = self.db_manager.add_or_update_candidate(
+            job_description_id=jd_id,
+            candidate_name=candidate_name,
+            email=candidate_email,
+            phone=candidate_phone,
+            resume_file_path=resume_file_path,
+            extracted_resume_json=structured_resume_data,
+            status='summarized',
+            content_hash=resume_key or None
+        )
+        if candidate_id is None:
+            logger.error(f"Failed to add or update candidate {candidate_name} from {filename} in DB. Skipping matching.")
+            return None # Skip if candidate couldn't be saved
+
+        semantic_score = 0.0
+        if resume_embedding is not None:
+            semantic_score = self._calculate_similarity(jd_context["embedding"], resume_embedding)
+
+        skill_coverage = None
+        if self.skill_vocabulary is not None:
+            skill_coverage = self.skill_vocabulary.coverage(jd_context["skills"], structured_resume_data.get("skills", []))
+
+        # A batch of one: the same vectorized features the rescore path computes for a whole JD
+        requirements = jd_context["requirements"]
+        indexed = self.db_manager.get_match_features(jd_id, requirements["skills"], [candidate_id])
+        features = self.scorer.features(
+            requirements, [indexed.get(candidate_id, NOT_INDEXED)], np.array([semantic_score]),
+            None if skill_coverage is None else np.array([skill_coverage])
+        )
+        match_score = float(self.scorer.combine(features)[0])
+        components = {column: values[0] for column, values in self.scorer.components(features).items()}
+        component_text = ", ".join(f"{column.replace('_score', '')} {value:.3f}" for column, value in components.items() if value is not None)
+        logger.info(f"Match score for {filename} (Candidate ID: {candidate_id}) with JD ID {jd_id}: {match_score:.4f} ({component_text})")
+
+        self.db_manager.update_candidate_score_and_status(
+            candidate_id=candidate_id,
+            match_score=match_score,
+            status='matched',
+            components=components
+        )
+        self.db_manager.add_log("ResumeMatcherAgent", "INFO", f"Processed resume {filename} for JD {jd_id}. Candidate ID: {candidate_id}, Score: {match_score:.4f}")
+        if resume_key:
+            self.checkpoints.save(STAGE_RESUME_MATCH, {"candidate_id": candidate_id, "match_score": match_score},
+                                  jd_key=str(jd_id), resume_key=resume_key)
+        return match_score
+
+    def _invalidate_downstream_checkpoints(self, jd_id: int):
+        # New matches mean an earlier shortlist/schedule pass for this JD is out of date
+        self.checkpoints.clear(STAGE_SHORTLIST, jd_key=str(jd_id))
+        self.checkpoints.clear(STAGE_SCHEDULE, jd_key=str(jd_id))
+
+    def _near_duplicate_of(self, resume_file_path: str, resume_key: str) -> Tuple[Optional[DuplicateMatch], Optional[str]]:
+        """
+        The representative this resume is a near-duplicate of (None if it is not a duplicate), plus its parsed
+        text when it had to be parsed for the check. Files seen before are looked up by content hash, unparsed.
+        """
+        if self.duplicate_detector is None or not resume_key:
+            return None, None
+        known, match = self.duplicate_detector.lookup(resume_key, resume_file_path)
+        if known:
+            if match:
+                logger.info(f"Resume {os.path.basename(resume_file_path)} is a near-duplicate of "
+                            f"{os.path.basename(match.resume_file_path)}. Skipping.")
+            return match, None
+        raw_text = parse_resume(resume_file_path)
+        if not raw_text:
+            return None, None  # prepare_resume records the parse error
+        return self.duplicate_detector.check(resume_key, resume_file_path, raw_text), raw_text
+
+    def process_resume_for_jds(self, resume_file_path: str, jd_contexts: List[Dict[str, Any]]) -> Dict[int, float]:
+        """
+        Parses, extracts and embeds one resume once, then scores it against every JD context.
+        JDs this resume was already matched against (per checkpoints) are skipped.
+        Returns {jd_id: match_score} for the JDs scored in this call.
+        """
+        filename = os.path.basename(resume_file_path)
+        resume_key = file_hash(resume_file_path) or ""
+        pending_contexts = [
+            context for context in jd_contexts
+            if not (resume_key and self.checkpoints.is_done(STAGE_RESUME_MATCH, jd_key=str(context["jd_id"]), resume_key=resume_key))
+        ]
+        if not pending_contexts:
+            logger.info(f"Resume {filename} was already matched against all {len(jd_contexts)} JDs. Skipping.")
+            return {}
+
+        duplicate_of, raw_text = self._near_duplicate_of(resume_file_path, resume_key)
+        if duplicate_of:
+            return {}
+
+        structured_resume_data, error_kind = self.prepare_resume(resume_file_path, resume_key, raw_text)
+        if structured_resume_data is None:
+            for context in pending_contexts:
+                self._record_resume_error(context["jd_id"], resume_file_path, error_kind or "extract")
+            return {}
+
+        resume_embedding = self._embed_resume(structured_resume_data, filename)
+        scores: Dict[int, float] = {}
+        for context in pending_contexts:
+            match_score = self.match_resume_to_jd(context, resume_file_path, resume_key, structured_resume_data, resume_embedding)
+            if match_score is not None:
+                scores[context["jd_id"]] = match_score
+                self._invalidate_downstream_checkpoints(context["jd_id"])
+        return scores
+
+    def _process_resume_for_jd(self, jd_context: Dict[str, Any], resume_file_path: str, raw_text: Optional[str] = None,
+                               prepared: Optional[Tuple[Optional[Dict[str, Any]], Optional[str]]] = None) -> bool:
+        """
+        Extracts, embeds and scores one resume against one JD. Returns True if a match was stored.
+        prepared is a prepare_resume result computed beforehand (batched extraction).
+        """
+        jd_id = jd_context["jd_id"]
+        filename = os.path.basename(resume_file_path)
+        logger.info(f"Processing resume: {filename} for JD ID: {jd_id}")
+
+        resume_key = file_hash(resume_file_path) or ""
+        if resume_key and self.checkpoints.is_done(STAGE_RESUME_MATCH, jd_key=str(jd_id), resume_key=resume_key):
+            logger.info(f"Resume {filename} was already matched against JD ID {jd_id} in a previous run. Skipping.")
+            return False
+
+        structured_resume_data, error_kind = prepared or self.prepare_resume(resume_file_path, resume_key, raw_text)
+        if structured_resume_data is None:
+            self._record_resume_error(jd_id, resume_file_path, error_kind or "extract")
+            return False
+
+        resume_embedding = self._embed_resume(structured_resume_data, filename)
+        return self.match_resume_to_jd(jd_context, resume_file_path, resume_key, structured_resume_data, resume_embedding) is not None
+
+    def _resume_executor(self) -> ThreadPoolExecutor:
+        # Kept for the agent's lifetime so per-thread sibling agents (and their warm caches) are reused across JDs
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="resume-worker")
+        return self._executor
+
+    def _worker_agent(self) -> "ResumeMatcherAgent":
+        # Skill vocabulary and embedding store instances hold unsynchronized in-memory state, so one agent per thread
+        agent = getattr(self._local, "agent", None)
+        if agent is None:
+            agent = ResumeMatcherAgent(self.ollama_client, self.db_manager,
+                                       CheckpointManager(self.db_manager, resume=self.checkpoints.resume))
+            agent.workers = 1
+            self._local.agent = agent
+        return agent
+
+    def _drop_near_duplicates(self, resume_file_paths: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Removes near-duplicates of other resumes (in this batch or seen before) so only one resume per cluster is
+        extracted. Returns the remaining paths and the texts parsed along the way, keyed by path.
+        Runs in sorted file order, so the first file of a new cluster becomes its representative.
+        """
+        if self.duplicate_detector is None:
+            return resume_file_paths, {}
+        kept: List[str] = []
+        parsed_texts: Dict[str, str] = {}
+        for path in resume_file_paths:
+            duplicate_of, raw_text = self._near_duplicate_of(path, file_hash(path) or "")
+            if duplicate_of:
                 continue
+            kept.append(path)
+            if raw_text:
+                parsed_texts[path] = raw_text
+        if len(kept) < len(resume_file_paths):
+            logger.info(f"Skipping {len(resume_file_paths) - len(kept)} near-duplicate resumes; {len(kept)} left to process.")
+        return kept, parsed_texts
 
-            logger.info(f"Processing resume: {filename} for JD ID: {jd_id}")
-            
-            raw_resume_text = parse_resume(resume_file_path)
-            if not raw_resume_text:
-                logger.warning(f"Could not parse text from resume: {filename}. Skipping.")
-                self.db_manager.add_log("ResumeMatcherAgent", "WARNING", f"Failed to parse resume: {filename}")
-                self.db_manager.add_or_update_candidate(
-                    job_description_id=jd_id,
-                    candidate_name=f"ErrorParsing_{filename}",
-                    email=f"error_parse_{os.path.splitext(filename)[0]}@system.local",
-                    resume_file_path=resume_file_path,
-                    status='error',
-                    notes=f"Failed to parse resume text from {filename}"
-                )
+    def _prepare_resumes_batched(self, jd_id: int, resume_file_paths: List[str],
+                                 parsed_texts: Dict[str, str]) -> Dict[str, Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        prepare_resume for many resumes at once, with batched LLM extraction. Resumes already matched against
+        this JD, with a checkpointed extraction, or that do not parse are left to the per-resume path.
+        """
+        to_extract: List[Tuple[str, str, Optional[Dict[str, Any]]]] = []
+        resume_keys: Dict[str, str] = {}
+        for path in resume_file_paths:
+            resume_key = resume_keys[path] = file_hash(path) or ""
+            if resume_key and (self.checkpoints.is_done(STAGE_RESUME_MATCH, jd_key=str(jd_id), resume_key=resume_key)
+                               or self.checkpoints.is_done(STAGE_RESUME_EXTRACT, resume_key=resume_key)):
                 continue
+            raw_text = parsed_texts.get(path) or parse_resume(path)
+            if raw_text:
+                to_extract.append((path, raw_text, extract_document_metadata(path)))
 
-            structured_resume_data = self._extract_structured_resume_data(raw_resume_text, filename)
-            if not structured_resume_data:
-                logger.warning(f"Could not extract structured data from resume: {filename}. Skipping match.")
-                self.db_manager.add_or_update_candidate(
-                    job_description_id=jd_id,
-                    candidate_name=f"ErrorExtracting_{filename}",
-                    email=f"error_extract_{os.path.splitext(filename)[0]}@system.local",
-                    resume_file_path=resume_file_path,
-                    status='error',
-                    notes=f"Failed to extract structured data from {filename}"
-                )
+        prepared: Dict[str, Tuple[Optional[Dict[str, Any]], Optional[str]]] = {}
+        for path, structured_resume_data in self.extract_resumes_batched(to_extract).items():
+            if structured_resume_data is None:
+                prepared[path] = (None, "extract")
                 continue
-            
-            candidate_name = structured_resume_data.get("candidate_name", "Unknown")
-            candidate_email = structured_resume_data.get("email", f"unknown_{os.path.splitext(filename)[0]}@example.com")
-            candidate_phone = structured_resume_data.get("phone")
+            if resume_keys[path]:
+                self.checkpoints.save(STAGE_RESUME_EXTRACT, structured_resume_data, resume_key=resume_keys[path])
+            prepared[path] = (structured_resume_data, None)
+        return prepared
 
-            candidate_id = self.db_manager.add_or_update_candidate(
-                job_description_id=jd_id,
-                candidate_name=candidate_name,
-                email=candidate_email,
-                phone=candidate_phone,
-                resume_file_path=resume_file_path,
-                extracted_resume_json=structured_resume_data,
-                status='summarized'
-            )
-            if candidate_id is None:
-                logger.error(f"Failed to add or update candidate {candidate_name} from {filename} in DB. Skipping matching.")
-                continue # Skip if candidate couldn't be saved
+    def process_resumes_for_jd(self, jd_id: int, jd_summary: Dict[str, Any]):
+        logger.info(f"Starting resume processing for JD ID: {jd_id}")
+        if not os.path.exists(RESUMES_DIR):
+            logger.error(f"Resumes directory not found: {RESUMES_DIR}")
+            self.db_manager.add_log("ResumeMatcherAgent", "ERROR", f"Resumes directory not found: {RESUMES_DIR}")
+            return
 
-            resume_skills = structured_resume_data.get("skills", [])
-            resume_experience = str(structured_resume_data.get("experience_summary", "")) # Ensure string
-            resume_text_for_embedding = f"Skills: {', '.join(resume_skills)}. Experience Summary: {resume_experience}"
-            
-            match_score = 0.0
-            if not resume_text_for_embedding.strip() or resume_text_for_embedding.strip() == "Skills: . Experience Summary:":
-                logger.warning(f"Resume {filename} has insufficient extracted data for embedding. Score will be 0.")
+        jd_context = self.build_jd_context(jd_id, jd_summary)
+        if jd_context is None:
+            return
+
+        resume_file_paths = []
+        for filename in sorted(os.listdir(RESUMES_DIR)):
+            if not is_resume_file(filename):
+                logger.debug(f"Skipping non-resume file: {filename}")
+                continue
+            resume_file_paths.append(os.path.join(RESUMES_DIR, filename))
+        resume_file_paths, parsed_texts = self._drop_near_duplicates(resume_file_paths)
+        prepared = self._prepare_resumes_batched(jd_id, resume_file_paths, parsed_texts) if RESUME_EXTRACTION_BATCH_SIZE > 1 else {}
+
+        def process(agent: "ResumeMatcherAgent", path: str) -> bool:
+            return agent._process_resume_for_jd(jd_context, path, parsed_texts.get(path), prepared.get(path))
+
+        if self.workers > 1:
+            # Each pool thread uses its own sibling agent; Ollama parallelism is capped by the client's adaptive limit
+            results = list(self._resume_executor().map(lambda path: process(self._worker_agent(), path), resume_file_paths))
+        else:
+            results = [process(self, path) for path in resume_file_paths]
+        processed_count = sum(results)
+
+        if processed_count:
+            self._invalidate_downstream_checkpoints(jd_id)
+        logger.info(f"Finished processing {processed_count} resumes for JD ID: {jd_id}.")
+
+    # --- Rescoring from stored extractions ---
+    def _embed_texts(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Vectors for many embedding inputs. Inputs already in the embedding store are reused; only the rest are
+        sent to Ollama (in parallel when RESUME_WORKERS > 1) and appended to the store in one write.
+        Inputs that could not be embedded are missing from the result.
+        """
+        vectors: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        for text in texts:
+            stored = self.embedding_store.get(embedding_key(text)) if self.embedding_store is not None else None
+            if stored is not None:
+                vectors[text] = stored
             else:
-                logger.info(f"Generating embedding for resume: {filename} using text: '{resume_text_for_embedding[:100]}...'")
-                resume_embedding: List[float] = self.ollama_client.generate_embedding(resume_text_for_embedding) # type: ignore
-                if not resume_embedding:
-                    logger.warning(f"Failed to generate embedding for resume: {filename}. Score will be 0.")
-                else:
-                    match_score = self._calculate_similarity(jd_embedding, resume_embedding)
-            
-            logger.info(f"Match score for {filename} (Candidate ID: {candidate_id}) with JD ID {jd_id}: {match_score:.4f}")
-            
-            self.db_manager.update_candidate_score_and_status(
-                candidate_id=candidate_id,
-                match_score=match_score,
-                status='matched'
+                missing.append(text)
+        if not missing:
+            return vectors
+
+        logger.info(f"Embedding {len(missing)} new texts ({len(vectors)} reused from the embedding store)")
+        if self.workers > 1:
+            embedded = list(self._resume_executor().map(self.ollama_client.generate_embedding, missing))
+        else:
+            embedded = [self.ollama_client.generate_embedding(text) for text in missing]
+        new_keys, new_vectors = [], []
+        for text, embedding in zip(missing, embedded):
+            if embedding:
+                vectors[text] = np.asarray(embedding, dtype=np.float32)
+                new_keys.append(embedding_key(text))
+                new_vectors.append(embedding)
+        if self.embedding_store is not None and new_keys:
+            try:
+                self.embedding_store.append(new_keys, new_vectors)
+            except ValueError as e:
+                logger.error(f"Could not store {len(new_keys)} new embeddings: {e}")
+        return vectors
+
+    def rescore_candidates_for_jd(self, jd_context: Dict[str, Any]) -> int:
+        """
+        Recomputes the hybrid match score and its components for every stored candidate of a JD from their
+        extracted resume JSON, without parsing files or calling the LLM. Scores are computed for all candidates at once
+        and written in one transaction; 'shortlisted' candidates go back to 'matched' so shortlisting can run
+        again (invited/rejected candidates keep their status). Returns the number of candidates rescored.
+        """
+        jd_id = jd_context["jd_id"]
+        candidate_ids: List[int] = []
+        candidate_texts: List[Optional[str]] = []
+        candidate_resumes: List[Dict[str, Any]] = []
+        for candidate in self.db_manager.iter_candidates_for_jd(jd_id, columns=("id", "status", "extracted_resume_json")):
+            resume_data = candidate.resume_data
+            if candidate.status == 'error' or not resume_data:
+                continue
+            candidate_ids.append(candidate.id)
+            candidate_texts.append(resume_embedding_text(resume_data))
+            candidate_resumes.append(resume_data)
+        if not candidate_ids:
+            logger.info(f"No stored candidates to rescore for JD ID: {jd_id}.")
+            return 0
+
+        # Identical inputs (the same resume under several names, empty extractions) are embedded and scored once
+        unique_texts = list(dict.fromkeys(text for text in candidate_texts if text is not None))
+        if self.embedding_store is not None:
+            self.embedding_store.refresh()  # Reuse vectors other processes appended since the store was opened
+        vectors = self._embed_texts(unique_texts)
+        jd_vector = np.asarray(jd_context["embedding"], dtype=np.float32)
+        jd_vector /= np.linalg.norm(jd_vector) or 1.0
+
+        text_scores = np.zeros(len(unique_texts) + 1, dtype=np.float32)  # last slot: texts without a vector
+        usable = [position for position, text in enumerate(unique_texts)
+                  if text in vectors and vectors[text].shape[0] == jd_vector.shape[0]]
+        if len(usable) < len(vectors):
+            logger.error(f"Skipped {len(vectors) - len(usable)} resume embeddings whose dimensions do not match JD ID {jd_id}.")
+        stored_rows = [self.embedding_store.position(embedding_key(unique_texts[position])) for position in usable] \
+            if self.embedding_store is not None else [None]
+        if usable and None not in stored_rows:
+            # Every vector is in the store: score the stored rows straight from the memory map
+            text_scores[usable] = self.embedding_store.scores(jd_vector, rows=stored_rows)
+        elif usable:
+            matrix = np.vstack([vectors[unique_texts[position]] for position in usable])
+            norms = np.linalg.norm(matrix, axis=1)
+            norms[norms == 0] = 1.0
+            text_scores[usable] = (matrix / norms[:, None]) @ jd_vector
+        text_position = {text: position for position, text in enumerate(unique_texts)}
+        semantic_scores = text_scores[[text_position.get(text, len(unique_texts)) for text in candidate_texts]]
+
+        skill_coverage = None
+        if self.skill_vocabulary is not None:
+            skill_coverage = self.skill_vocabulary.coverage_batch(
+                jd_context["skills"], [resume.get("skills", []) for resume in candidate_resumes]
             )
-            self.db_manager.add_log("ResumeMatcherAgent", "INFO", f"Processed resume {filename} for JD {jd_id}. Candidate ID: {candidate_id}, Score: {match_score:.4f}")
-            processed_count += 1
 
-        logger.info(f"Finished processing {processed_count} resumes for JD ID: {jd_id}.")
\ No newline at end of file
+        requirements = jd_context["requirements"]
+        indexed = self.db_manager.get_match_features(jd_id, requirements["skills"])
+        features = self.scorer.features(requirements, [indexed.get(candidate_id, NOT_INDEXED) for candidate_id in candidate_ids],
+                                        semantic_scores, skill_coverage)
+        match_scores = self.scorer.combine(features)
+        self.db_manager.update_candidate_scores(candidate_ids, match_scores.tolist(), self.scorer.components(features))
+        self._invalidate_downstream_checkpoints(jd_id)
+        logger.info(f"Rescored {len(candidate_ids)} candidates for JD ID: {jd_id} ({len(unique_texts)} distinct resume texts).")
+        self.db_manager.add_log("ResumeMatcherAgent", "INFO", f"Rescored {len(candidate_ids)} candidates for JD {jd_id} from stored extractions.")
+        return len(candidate_ids)
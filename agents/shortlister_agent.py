@@ -1,50 +1,58 @@
 import logging
+from typing import Optional
 from utils.db_manager import DBManager
+from utils.checkpoints import CheckpointManager, STAGE_SHORTLIST
 from config import SHORTLIST_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
 class ShortlisterAgent:
-    def __init__(self, db_manager: DBManager):
+    def __init__(self, db_manager: DBManager, checkpoints: Optional[CheckpointManager] = None):
         self.db_manager = db_manager
+        self.checkpoints = checkpoints or CheckpointManager(db_manager)
 
     def shortlist_candidates(self, jd_id: int):
-        logger.info(f"Starting shortlisting process for JD ID: {jd_id} with threshold >= {SHORTLIST_THRESHOLD}")
-        
-        # Get all candidates with status 'matched' for the given JD
-        # The schema for get_all_candidates_for_jd returns:
-        # id, candidate_name, email, match_score, status, resume_file_path, extracted_resume_json
-        candidates_to_evaluate = self.db_manager.get_all_candidates_for_jd(jd_id)
-
-        shortlisted_count = 0
-        if not candidates_to_evaluate:
-            logger.info(f"No candidates found with 'matched' status for JD ID: {jd_id} to shortlist.")
+        if self.checkpoints.is_done(STAGE_SHORTLIST, jd_key=str(jd_id)):
+            logger.info(f"Shortlisting for JD ID {jd_id} already completed in a previous run. Skipping.")
             return
 
-        for candidate_data in candidates_to_evaluate:
-            candidate_id = candidate_data[0]
-            candidate_name = candidate_data[1]
-            match_score = candidate_data[3]
-            current_status = candidate_data[4]
+        logger.info(f"Starting shortlisting process for JD ID: {jd_id} with threshold >= {SHORTLIST_THRESHOLD}")
+        
+        # Only id, name and score of 'matched' candidates are needed; resume JSON is never loaded
+        candidates_to_evaluate = self.db_manager.iter_candidates_for_jd(
+            jd_id, columns=("id", "candidate_name", "match_score"), status='matched'
+        )
+
+        evaluated_count = 0
+        shortlisted_ids = []
+        for candidate in candidates_to_evaluate:
+            evaluated_count += 1
+            candidate_id = candidate.id
+            candidate_name = candidate.candidate_name
+            match_score = candidate.match_score
 
-            if current_status != 'matched': # Only process 'matched' candidates
-                logger.debug(f"Skipping candidate {candidate_name} (ID: {candidate_id}) with status {current_status}")
-                continue
-            
             if match_score is None:
                 logger.warning(f"Candidate {candidate_name} (ID: {candidate_id}) has no match score. Skipping.")
                 continue
 
             if match_score >= SHORTLIST_THRESHOLD:
-                self.db_manager.update_candidate_status(candidate_id, 'shortlisted')
+                shortlisted_ids.append(candidate_id)
                 logger.info(f"Candidate {candidate_name} (ID: {candidate_id}) shortlisted with score {match_score:.4f} for JD ID: {jd_id}")
                 self.db_manager.add_log("ShortlisterAgent", "INFO", f"Candidate ID {candidate_id} ({candidate_name}) shortlisted for JD {jd_id}. Score: {match_score:.4f}")
-                shortlisted_count += 1
             else:
                 # Optionally, mark as 'rejected' or keep as 'matched' if no explicit rejection step
                 # self.db_manager.update_candidate_status(candidate_id, 'rejected_auto_score')
                 logger.info(f"Candidate {candidate_name} (ID: {candidate_id}) not shortlisted. Score: {match_score:.4f} (below threshold {SHORTLIST_THRESHOLD})")
 
+        if not evaluated_count:
+            logger.info(f"No candidates found with 'matched' status for JD ID: {jd_id} to shortlist.")
+            self.checkpoints.save(STAGE_SHORTLIST, {"shortlisted": 0}, jd_key=str(jd_id))
+            return
+
+        # Status updates happen after the read cursor is exhausted, in a single transaction
+        self.db_manager.update_candidates_status(shortlisted_ids, 'shortlisted')
+        shortlisted_count = len(shortlisted_ids)
 
         logger.info(f"Shortlisting complete for JD ID: {jd_id}. {shortlisted_count} candidates shortlisted.")
-        self.db_manager.add_log("ShortlisterAgent", "INFO", f"Shortlisting complete for JD {jd_id}. {shortlisted_count} candidates met threshold.")
\ No newline at end of file
+        self.db_manager.add_log("ShortlisterAgent", "INFO", f"Shortlisting complete for JD {jd_id}. {shortlisted_count} candidates met threshold.")
+        self.checkpoints.save(STAGE_SHORTLIST, {"shortlisted": shortlisted_count}, jd_key=str(jd_id))
\ No newline at end of file
@@ -8,15 +8,104 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_LLM_MODEL = os.getenv("OLLAMA_LLM_MODEL", "llama3:latest")
 OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text:latest") # or mxbai-embed-large
 
+OLLAMA_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_TIMEOUT_SECONDS", "300"))
+# Adaptive concurrency (AIMD) for Ollama calls, tracked separately for completions and embeddings
+OLLAMA_ADAPTIVE_CONCURRENCY = os.getenv("OLLAMA_ADAPTIVE_CONCURRENCY", "True").lower() == "true"
+OLLAMA_CONCURRENCY_INITIAL = int(os.getenv("OLLAMA_CONCURRENCY_INITIAL", "2"))
+OLLAMA_CONCURRENCY_MIN = int(os.getenv("OLLAMA_CONCURRENCY_MIN", "1"))
+OLLAMA_CONCURRENCY_MAX = int(os.getenv("OLLAMA_CONCURRENCY_MAX", "16"))
+OLLAMA_LATENCY_TOLERANCE = float(os.getenv("OLLAMA_LATENCY_TOLERANCE", "3.0")) # Back off when latency exceeds this x the no-load baseline
+# Several Ollama hosts: comma-separated URLs. Completions and embeddings can be pointed at different hosts.
+OLLAMA_BASE_URLS = os.getenv("OLLAMA_BASE_URLS", OLLAMA_BASE_URL)
+OLLAMA_GENERATE_URLS = os.getenv("OLLAMA_GENERATE_URLS", OLLAMA_BASE_URLS)
+OLLAMA_EMBEDDING_URLS = os.getenv("OLLAMA_EMBEDDING_URLS", OLLAMA_BASE_URLS)
+OLLAMA_HEALTH_CHECK_SECONDS = float(os.getenv("OLLAMA_HEALTH_CHECK_SECONDS", "30")) # 0 disables background health checks
+OLLAMA_BACKEND_MAX_FAILURES = int(os.getenv("OLLAMA_BACKEND_MAX_FAILURES", "3")) # Consecutive failures before a host is taken out
+OLLAMA_BACKEND_COOLDOWN_SECONDS = float(os.getenv("OLLAMA_BACKEND_COOLDOWN_SECONDS", "30"))
+# Persistent cache of Ollama responses keyed by (endpoint, model, options, prompt); identical concurrent calls are always coalesced
+OLLAMA_CACHE_ENABLED = os.getenv("OLLAMA_CACHE_ENABLED", "True").lower() == "true"
+OLLAMA_CACHE_PATH = os.getenv("OLLAMA_CACHE_PATH", "database/llm_cache.db")
+OLLAMA_CACHE_MAX_MB = float(os.getenv("OLLAMA_CACHE_MAX_MB", "256")) # Least recently used entries are evicted beyond this
+OLLAMA_CACHE_TTL_HOURS = float(os.getenv("OLLAMA_CACHE_TTL_HOURS", "168")) # 0 keeps entries until evicted
+
 # Database Settings
 DB_PATH = os.getenv("DB_PATH", "database/recruitment.db")
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "30000")) # How long a connection waits on a locked DB
+# Thread-safe DB mode (utils/db_pool.py): writes from all threads are batched into one transaction
+DB_POOL_MAX_BATCH = int(os.getenv("DB_POOL_MAX_BATCH", "100"))
+DB_POOL_BATCH_WAIT_MS = float(os.getenv("DB_POOL_BATCH_WAIT_MS", "2")) # How long the writer waits for more writes to batch
+# Opt-in compression of large payload columns (job_descriptions.raw_text, resumes.extracted_resume_json):
+# "none", "zlib" or "zstd" (needs the zstandard package). Values below the minimum size stay plain text.
+# Compressed values are not JSON, so SQL json_extract() over the candidates view only works on plain rows.
+DB_COMPRESSION = os.getenv("DB_COMPRESSION", "none")
+DB_COMPRESSION_MIN_BYTES = int(os.getenv("DB_COMPRESSION_MIN_BYTES", "512"))
+# Maintenance (python main.py maintain): logs older than this are rolled up per day/agent/level and deleted
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+DB_VACUUM_PAGES = int(os.getenv("DB_VACUUM_PAGES", "0")) # Free pages returned per run by incremental vacuum (0 = all)
+# Results export (python main.py export): rows fetched and written per batch; bounds memory use
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+
+# Worker Mode - JD work items are leased from the work_queue table
+WORK_QUEUE_LEASE_SECONDS = int(os.getenv("WORK_QUEUE_LEASE_SECONDS", "300"))
+WORK_QUEUE_HEARTBEAT_SECONDS = int(os.getenv("WORK_QUEUE_HEARTBEAT_SECONDS", "60"))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+WORK_QUEUE_POLL_SECONDS = int(os.getenv("WORK_QUEUE_POLL_SECONDS", "5"))
 
 # Data Paths
 JOB_DESCRIPTION_CSV = os.getenv("JOB_DESCRIPTION_CSV", "data/job_descriptions.csv")
 RESUMES_DIR = os.getenv("RESUMES_DIR", "data/CVs")
 
+# Daemon Mode - watches RESUMES_DIR and scores new resumes against all JDs in the DB
+DAEMON_DEBOUNCE_SECONDS = float(os.getenv("DAEMON_DEBOUNCE_SECONDS", "2")) # File must be unchanged this long before processing
+DAEMON_POLL_SECONDS = float(os.getenv("DAEMON_POLL_SECONDS", "1"))
+DAEMON_JD_REFRESH_SECONDS = int(os.getenv("DAEMON_JD_REFRESH_SECONDS", "60")) # How often to pick up newly summarized JDs
+
+# Scoring Service - local HTTP API that keeps the Ollama client, JD summaries and embeddings warm
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+SERVICE_MAX_CONCURRENCY = int(os.getenv("SERVICE_MAX_CONCURRENCY", "4")) # Requests processed at once
+SERVICE_MAX_QUEUE = int(os.getenv("SERVICE_MAX_QUEUE", "16")) # Requests allowed to wait; beyond this the service returns 503
+SERVICE_MAX_UPLOAD_BYTES = int(os.getenv("SERVICE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+SERVICE_UPLOAD_DIR = os.getenv("SERVICE_UPLOAD_DIR", RESUMES_DIR) # Uploaded resumes are stored here
+
+# Resumes processed in parallel per JD (values > 1 switch the pipeline to the thread-safe DB manager);
+# actual Ollama parallelism is still bounded by the adaptive limit above
+RESUME_WORKERS = int(os.getenv("RESUME_WORKERS", "1"))
+
 # Agent Settings
 SHORTLIST_THRESHOLD = float(os.getenv("SHORTLIST_THRESHOLD", "0.75")) # Adjusted threshold
+# Resume extraction: "llm" (LLM only), "hybrid" (regex pre-extraction, LLM asked only for missing fields)
+# or "fast" (like hybrid, but the LLM is skipped entirely when the heuristics found every core field)
+RESUME_EXTRACTION_MODE = os.getenv("RESUME_EXTRACTION_MODE", "hybrid").lower()
+# Approximate token budget for the resume text sent in the extraction prompt (filled section by section)
+RESUME_PROMPT_TOKEN_BUDGET = int(os.getenv("RESUME_PROMPT_TOKEN_BUDGET", "1000"))
+# Batched extraction (opt-in): values > 1 pack up to this many resumes into one extraction prompt, within
+# RESUME_BATCH_TOKEN_BUDGET tokens of resume text; missing or malformed entries are retried in smaller batches
+RESUME_EXTRACTION_BATCH_SIZE = int(os.getenv("RESUME_EXTRACTION_BATCH_SIZE", "1"))
+RESUME_BATCH_TOKEN_BUDGET = int(os.getenv("RESUME_BATCH_TOKEN_BUDGET", "3000"))
+# Per-skill coverage score (stored in candidates.skill_coverage_score) using a shared skill embedding vocabulary
+ENABLE_SKILL_COVERAGE = os.getenv("ENABLE_SKILL_COVERAGE", "True").lower() == "true"
+# Hybrid match score: weighted mean of semantic, skill_coverage, skill_overlap, experience and education features
+# (each 0..1, stored per candidate as <feature>_score). SHORTLIST_THRESHOLD applies to the combined score, so the
+# default (semantic only) keeps the threshold meaning cosine similarity. When adding features, e.g.
+# "semantic=0.5,skill_coverage=0.2,skill_overlap=0.1,experience=0.1,education=0.1", re-pick the threshold as well
+SCORE_WEIGHTS = os.getenv("SCORE_WEIGHTS", "semantic=1.0")
+
+# Near-duplicate resumes (same CV as PDF and DOCX, small edits) are detected with MinHash/LSH before extraction;
+# only the first resume of a cluster is extracted and matched, the others are linked to it
+ENABLE_NEAR_DUPLICATE_DETECTION = os.getenv("ENABLE_NEAR_DUPLICATE_DETECTION", "True").lower() == "true"
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85")) # Estimated Jaccard similarity of 5-word shingles
+
+# Embedding Store - memory-mapped, quantized resume embedding matrix (one sub-directory per embedding model)
+ENABLE_EMBEDDING_STORE = os.getenv("ENABLE_EMBEDDING_STORE", "True").lower() == "true"
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "database/embeddings")
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float16") # float32, float16 or int8 (with per-row scale)
+
+# Interview Scheduling - interviewer availability, slot length and per-JD panels (JSON, see utils/slot_allocator.py).
+# Without the file, invitations propose a single generic time as before.
+INTERVIEW_AVAILABILITY_FILE = os.getenv("INTERVIEW_AVAILABILITY_FILE", "data/interviewer_availability.json")
+INTERVIEW_MIN_NOTICE_HOURS = float(os.getenv("INTERVIEW_MIN_NOTICE_HOURS", "24")) # Earliest slot offered, from now
 
 # Email Settings (for Interview Scheduler) - Fill these in .env or here
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -28,9 +117,15 @@ SENDER_EMAIL = os.getenv("SENDER_EMAIL", "omkarmutyalwar8072@example.com")
 ENABLE_EMAIL_SENDING = os.getenv("ENABLE_EMAIL_SENDING", "True").lower() == "true"
 
 
-# Logging
-LOG_FILE = "logs/app.log"
-LOG_LEVEL = "INFO" # DEBUG, INFO, WARNING, ERROR, CRITICAL
+# Logging - records go through a queue; a background thread writes LOG_FILE and the console (utils/logging_setup.py)
+LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO") # DEBUG, INFO, WARNING, ERROR, CRITICAL
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text") # "text" or "json" (JSON lines in LOG_FILE; the console stays text)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(20 * 1024 * 1024))) # LOG_FILE is rotated at this size (0 = never)
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5")) # Rotated files kept (app.log.1 ... app.log.N)
+# Sampling of high-volume INFO/DEBUG records per logger: a fraction to keep or a rate, e.g.
+# "agents.resume_matcher_agent=0.1,utils.file_parser=20/s". WARNING and above are never dropped.
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
 
 # Ensure directories exist
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
@@ -1,43 +1,149 @@
+import json
 import logging
-import pandas as pd
+import argparse
+import multiprocessing
 import os
-from typing import Optional # For Python < 3.10 compatibility
+import time
+import sqlite3
+from typing import Optional, NamedTuple, Dict, Any, List # For Python < 3.10 compatibility
 
 from config import (
-    LOG_FILE, LOG_LEVEL, JOB_DESCRIPTION_CSV, RESUMES_DIR, OLLAMA_LLM_MODEL, OLLAMA_EMBEDDING_MODEL
+    JOB_DESCRIPTION_CSV, RESUMES_DIR, OLLAMA_LLM_MODEL, OLLAMA_EMBEDDING_MODEL,
+    WORK_QUEUE_LEASE_SECONDS, WORK_QUEUE_HEARTBEAT_SECONDS, WORK_QUEUE_MAX_ATTEMPTS, WORK_QUEUE_POLL_SECONDS,
+    DAEMON_DEBOUNCE_SECONDS, DAEMON_POLL_SECONDS, DAEMON_JD_REFRESH_SECONDS, SERVICE_HOST, SERVICE_PORT,
+    SERVICE_MAX_CONCURRENCY, RESUME_WORKERS, LOG_RETENTION_DAYS, DB_VACUUM_PAGES, EXPORT_BATCH_ROWS, DB_PATH
 )
 from utils.ollama_client import OllamaClient
 from utils.db_manager import DBManager
-from setup_db import create_tables
+from utils.db_pool import ThreadSafeDBManager
+from utils.jd_loader import load_job_descriptions
+from utils.work_queue import LeaseHeartbeat, default_worker_id
+from utils.checkpoints import CheckpointManager
+from utils.folder_watcher import FolderWatcher
+from utils.latency import LatencyTracker
+from utils.scoring_service import ScoringService, make_server
+from utils.db_maintenance import DBMaintenance
+from utils.run_planner import RunPlanner, format_plan
+from utils.results_export import ResultsExporter
+from utils.logging_setup import setup_logging, forward_logs
+from setup_db import create_tables, pending_schema_changes
 
 from agents.jd_summarizer_agent import JDSummarizerAgent
-from agents.resume_matcher_agent import ResumeMatcherAgent
+from agents.resume_matcher_agent import ResumeMatcherAgent, is_resume_file
 from agents.shortlister_agent import ShortlisterAgent
 from agents.interview_scheduler_agent import InterviewSchedulerAgent
 
     
 # --- Logging Setup ---
-os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Queue-backed: file and console writes happen on a listener thread, off the per-resume path
+setup_logging()
 logger = logging.getLogger(__name__)
 
+PLAN_SCRATCH_DB = "file:run_plan?mode=memory&cache=shared"  # migrated in-memory copy `plan` uses for outdated schemas
+
+
+class PipelineAgents(NamedTuple):
+    jd_summarizer: JDSummarizerAgent
+    resume_matcher: ResumeMatcherAgent
+    shortlister: ShortlisterAgent
+    scheduler: InterviewSchedulerAgent
+
+
+def open_db_manager() -> DBManager:
+    # Parallel resume workers share the manager across threads, which needs the thread-safe variant
+    return ThreadSafeDBManager() if RESUME_WORKERS > 1 else DBManager()
+
+
+def log_ollama_stats(ollama_client: OllamaClient):
+    for backend in ollama_client.pool.backends:
+        logger.info(f"Ollama host {backend.url}: {'healthy' if backend.healthy else 'down'}, {backend.requests} requests, "
+                    f"{backend.failures} failures, serving {', '.join(sorted(backend.endpoints)) or 'nothing'}")
+        for endpoint, limiter in backend.limiters.items():
+            metrics = limiter.metrics()
+            logger.info(f"Ollama {endpoint}@{backend.url} concurrency: limit {metrics['limit']}, {metrics['increases']} increases, "
+                        f"{metrics['decreases']} decreases, {metrics['timeouts']} timeouts, {metrics['overloads']} overloads, "
+                        f"slot wait {limiter.queue_wait.format_summary()}")
+    responses = ollama_client.response_metrics()
+    for endpoint, stats in responses["endpoints"].items():
+        reuse = f"{stats['reuse_rate']:.0%}" if stats["reuse_rate"] is not None else "n/a"
+        logger.info(f"Ollama {endpoint} calls: {stats['calls']}, {stats['cache_hits']} cache hits, {stats['coalesced']} coalesced, "
+                    f"{stats['ollama_requests']} sent ({reuse} reused)")
+    if responses["cache"]:
+        cache = responses["cache"]
+        logger.info(f"LLM response cache: {cache['stored_bytes'] / (1024 * 1024):.1f}MB stored, {cache['stores']} stores, "
+                    f"{cache['evictions']} evictions, {cache['expired']} expired")
+
+
+def build_agents(ollama_client: OllamaClient, db_manager: DBManager, resume: bool = False) -> PipelineAgents:
+    # Completed stages are always checkpointed; with resume=True they are also skipped
+    checkpoints = CheckpointManager(db_manager, resume=resume)
+    agents = PipelineAgents(
+        jd_summarizer=JDSummarizerAgent(ollama_client, db_manager, checkpoints),
+        resume_matcher=ResumeMatcherAgent(ollama_client, db_manager, checkpoints),
+        shortlister=ShortlisterAgent(db_manager, checkpoints),
+        scheduler=InterviewSchedulerAgent(db_manager, checkpoints),
+    )
+    logger.info("All agents initialized." + (" Resuming from checkpoints." if resume else ""))
+    return agents
+
+
+def log_candidate_statuses(db_manager: DBManager, jd_id: int, job_title: str):
+    logger.info(f"Displaying final candidate statuses for JD ID: {jd_id}")
+    displayed = 0
+    for candidate in db_manager.iter_candidates_for_jd(jd_id):
+        if not displayed:
+            logger.info(f"{'='*20} Final Candidate Statuses for JD ID: {jd_id} ({job_title}) {'='*20}")
+        displayed += 1
+        cand_score, cand_skill_coverage = candidate.match_score, candidate.skill_coverage_score
+        logger.info(f"  - Name: {candidate.candidate_name}, Email: {candidate.email}, Score: {cand_score if cand_score is None else f'{cand_score:.4f}'}, "
+                    f"Skill Coverage: {cand_skill_coverage if cand_skill_coverage is None else f'{cand_skill_coverage:.4f}'}, Status: {candidate.status}")
+    if displayed:
+        logger.info(f"{'='*70}")
+    else:
+        logger.info(f"No candidates processed or found for JD ID: {jd_id}")
+
+
+def process_job_description(agents: PipelineAgents, db_manager: DBManager, jd: Dict[str, Any], label: str) -> Optional[int]:
+    """Runs summarise -> match -> shortlist -> schedule for one JD. Returns the JD ID, or None if summarization failed."""
+    jd_raw_text = jd["raw_text"]
+    jd_title_from_csv = jd["title"]
+
+    logger.info(f"Processing Job Description: {jd_title_from_csv if jd_title_from_csv != 'N/A Job Title' else label}")
 
-EXPECTED_JD_TEXT_COLUMN = "Job Description"  # <--- Your column name for JD text
-EXPECTED_JD_TITLE_COLUMN = "Job Title"      # <--- Your column name for JD title (optional)
-# --- Fallback column names if the above are not found (used by dummy data) ---
-FALLBACK_JD_TEXT_COLUMN = "job_description_text"
-FALLBACK_JD_TITLE_COLUMN = "job_title"
+    summarization_result = agents.jd_summarizer.summarize_jd(jd_raw_text, source_file=jd["source_file"])
 
+    if not summarization_result:
+        logger.error(f"Failed to summarize job description {label}. Skipping to next JD.")
+        db_manager.add_log("MainPipeline", "ERROR", f"JD summarization failed for {jd['source_file']}")
+        return None
 
-def run_pipeline():
-    logger.info("🚀 Starting Recruitment Automation Pipeline 🚀")
+    current_jd_id, jd_summary = summarization_result
+    job_title_from_summary = jd_summary.get("job_title", jd_title_from_csv)
+    logger.info(f"Job Description (ID: {current_jd_id}) summarized successfully: {job_title_from_summary}")
+
+    # Process resumes for this JD
+    logger.info(f"Starting resume processing for JD ID: {current_jd_id}")
+    agents.resume_matcher.process_resumes_for_jd(current_jd_id, jd_summary)
+    logger.info(f"Resume matching completed for JD ID: {current_jd_id}")
+
+    # Shortlist candidates for this JD
+    logger.info(f"Starting shortlisting for JD ID: {current_jd_id}")
+    agents.shortlister.shortlist_candidates(current_jd_id)
+    logger.info(f"Shortlisting completed for JD ID: {current_jd_id}")
+
+    # Schedule interviews for this JD
+    logger.info(f"Starting interview scheduling for JD ID: {current_jd_id}")
+    agents.scheduler.schedule_interviews(current_jd_id, job_title=job_title_from_summary)
+    logger.info(f"Interview scheduling process completed for JD ID: {current_jd_id}")
+
+    # Display results for this JD
+    log_candidate_statuses(db_manager, current_jd_id, job_title_from_summary)
+
+    return current_jd_id
+
+
+def run_pipeline(resume: bool = False):
+    logger.info("🚀 Starting Recruitment Automation Pipeline 🚀" + (" (resuming from checkpoints)" if resume else ""))
 
     logger.info("Performing initial setup...")
     create_tables()
@@ -55,135 +161,22 @@ def run_pipeline():
         return
 
     try:
-        db_manager = DBManager()
+        db_manager = open_db_manager()
         logger.info("Database manager initialized.")
 
-        jd_summarizer = JDSummarizerAgent(ollama_client, db_manager)
-        resume_matcher = ResumeMatcherAgent(ollama_client, db_manager)
-        shortlister = ShortlisterAgent(db_manager)
-        scheduler = InterviewSchedulerAgent(db_manager)
-        logger.info("All agents initialized.")
-
-        logger.info(f"Loading job descriptions from: {JOB_DESCRIPTION_CSV}")
-        jd_df: Optional[pd.DataFrame] = None # Ensure jd_df is defined for the scope
-
-        # Determine which column names to primarily use
-        jd_text_col_to_use = EXPECTED_JD_TEXT_COLUMN
-        jd_title_col_to_use = EXPECTED_JD_TITLE_COLUMN
-
-        if not os.path.exists(JOB_DESCRIPTION_CSV):
-            logger.error(f"Job description CSV file not found: {JOB_DESCRIPTION_CSV}")
-            db_manager.add_log("MainPipeline", "ERROR", f"JD CSV file not found: {JOB_DESCRIPTION_CSV}")
-            logger.info(f"Creating a dummy {JOB_DESCRIPTION_CSV} for demonstration.")
-            # Use fallback names for dummy data generation
-            dummy_jd_data = {FALLBACK_JD_TITLE_COLUMN: ['Senior Python Developer'],
-                             FALLBACK_JD_TEXT_COLUMN: ['We need a skilled Python developer with 5+ years experience in Django, Flask, and REST APIs. Must have a BS in Computer Science. Responsibilities include developing new features, maintaining existing code, and collaborating with the team. Strong problem-solving skills required.']}
-            pd.DataFrame(dummy_jd_data).to_csv(JOB_DESCRIPTION_CSV, index=False, encoding='utf-8')
-            logger.info(f"Dummy {JOB_DESCRIPTION_CSV} created. Please replace with your actual data.")
-            # For dummy data, we know the column names
-            jd_text_col_to_use = FALLBACK_JD_TEXT_COLUMN
-            jd_title_col_to_use = FALLBACK_JD_TITLE_COLUMN
-            jd_df = pd.read_csv(JOB_DESCRIPTION_CSV, encoding='utf-8')
-        else:
-            encodings_to_try = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
-            for enc in encodings_to_try:
-                try:
-                    temp_df = pd.read_csv(JOB_DESCRIPTION_CSV, encoding=enc)
-                    # Check if primary expected columns exist
-                    if EXPECTED_JD_TEXT_COLUMN in temp_df.columns:
-                        jd_text_col_to_use = EXPECTED_JD_TEXT_COLUMN
-                        if EXPECTED_JD_TITLE_COLUMN in temp_df.columns:
-                            jd_title_col_to_use = EXPECTED_JD_TITLE_COLUMN
-                        else: # Use fallback for title if primary title not found
-                            jd_title_col_to_use = FALLBACK_JD_TITLE_COLUMN 
-                        jd_df = temp_df
-                        logger.info(f"Successfully read {JOB_DESCRIPTION_CSV} with encoding: {enc} using columns: '{jd_text_col_to_use}', '{jd_title_col_to_use}' (optional)")
-                        break
-                    # Check if fallback text column exists (e.g., user named it like the dummy)
-                    elif FALLBACK_JD_TEXT_COLUMN in temp_df.columns:
-                        jd_text_col_to_use = FALLBACK_JD_TEXT_COLUMN
-                        if FALLBACK_JD_TITLE_COLUMN in temp_df.columns:
-                             jd_title_col_to_use = FALLBACK_JD_TITLE_COLUMN
-                        else: # Use primary for title if fallback title not found but primary was defined
-                             jd_title_col_to_use = EXPECTED_JD_TITLE_COLUMN
-                        jd_df = temp_df
-                        logger.info(f"Successfully read {JOB_DESCRIPTION_CSV} with encoding: {enc} using columns: '{jd_text_col_to_use}', '{jd_title_col_to_use}' (optional)")
-                        break
-                    else:
-                        logger.warning(f"Neither '{EXPECTED_JD_TEXT_COLUMN}' nor '{FALLBACK_JD_TEXT_COLUMN}' found in {JOB_DESCRIPTION_CSV} with encoding {enc}. Trying next encoding or checking columns.")
-                except UnicodeDecodeError:
-                    logger.warning(f"Failed to read {JOB_DESCRIPTION_CSV} with encoding {enc}. Trying next...")
-                except Exception as e_read:
-                    logger.error(f"Error reading {JOB_DESCRIPTION_CSV} with encoding {enc}: {e_read}")
-
-            if jd_df is None:
-                logger.error(f"Failed to read {JOB_DESCRIPTION_CSV} with all attempted encodings or required columns not found.")
-                db_manager.add_log("MainPipeline", "ERROR", f"Failed to read/parse JD CSV: {JOB_DESCRIPTION_CSV}")
-                db_manager.close()
-                return
-
-        if jd_df.empty:
-            logger.warning(f"Job description CSV ({JOB_DESCRIPTION_CSV}) is empty. No JDs to process.")
-            db_manager.add_log("MainPipeline", "WARNING", "JD CSV is empty.")
-            db_manager.close()
-            return
+        agents = build_agents(ollama_client, db_manager, resume=resume)
 
-        if jd_text_col_to_use not in jd_df.columns:
-            logger.error(f"Job description text column ('{jd_text_col_to_use}') not found in {JOB_DESCRIPTION_CSV} after attempting to read.")
-            db_manager.add_log("MainPipeline", "ERROR", f"Final check: '{jd_text_col_to_use}' column missing in JD CSV.")
-            db_manager.close()
+        job_descriptions = load_job_descriptions(db_manager)
+        if not job_descriptions:
             return
 
         # Replace the single JD processing with iteration over all JDs
-        for index, jd_series in jd_df.iterrows():
-            logger.info(f"Processing Job Description {index + 1} of {len(jd_df)}")
-            
-            jd_raw_text = str(jd_series[jd_text_col_to_use])
-            jd_title_from_csv = str(jd_series.get(jd_title_col_to_use, 'N/A Job Title'))
-
-            logger.info(f"Processing Job Description: {jd_title_from_csv if jd_title_from_csv != 'N/A Job Title' else f'JD #{index + 1}'}")
-
-            summarization_result = jd_summarizer.summarize_jd(jd_raw_text, source_file=f"{JOB_DESCRIPTION_CSV} (row {index})")
-
-            if not summarization_result:
-                logger.error(f"Failed to summarize job description #{index + 1}. Skipping to next JD.")
-                db_manager.add_log("MainPipeline", "ERROR", f"JD summarization failed for row {index}")
-                continue
+        for position, jd in enumerate(job_descriptions, start=1):
+            logger.info(f"Processing Job Description {position} of {len(job_descriptions)}")
+            process_job_description(agents, db_manager, jd, label=f"JD #{position}")
+            logger.info(f"Completed processing JD #{position}\n")
 
-            current_jd_id, jd_summary = summarization_result
-            job_title_from_summary = jd_summary.get("job_title", jd_title_from_csv)
-            logger.info(f"Job Description (ID: {current_jd_id}) summarized successfully: {job_title_from_summary}")
-
-            # Process resumes for this JD
-            logger.info(f"Starting resume processing for JD ID: {current_jd_id}")
-            resume_matcher.process_resumes_for_jd(current_jd_id, jd_summary)
-            logger.info(f"Resume matching completed for JD ID: {current_jd_id}")
-
-            # Shortlist candidates for this JD
-            logger.info(f"Starting shortlisting for JD ID: {current_jd_id}")
-            shortlister.shortlist_candidates(current_jd_id)
-            logger.info(f"Shortlisting completed for JD ID: {current_jd_id}")
-
-            # Schedule interviews for this JD
-            logger.info(f"Starting interview scheduling for JD ID: {current_jd_id}")
-            scheduler.schedule_interviews(current_jd_id, job_title=job_title_from_summary)
-            logger.info(f"Interview scheduling process completed for JD ID: {current_jd_id}")
-
-            # Display results for this JD
-            logger.info(f"Displaying final candidate statuses for JD ID: {current_jd_id}")
-            final_candidates = db_manager.get_all_candidates_for_jd(current_jd_id)
-            if final_candidates:
-                logger.info(f"{'='*20} Final Candidate Statuses for JD ID: {current_jd_id} ({job_title_from_summary}) {'='*20}")
-                for cand_data in final_candidates:
-                    cand_id, cand_name, cand_email, cand_score, cand_status, _, _ = cand_data[:7]
-                    logger.info(f"  - Name: {cand_name}, Email: {cand_email}, Score: {cand_score if cand_score is None else f'{cand_score:.4f}'}, Status: {cand_status}")
-                logger.info(f"{'='*70}")
-            else:
-                logger.info(f"No candidates processed or found for JD ID: {current_jd_id}")
-
-            logger.info(f"Completed processing JD #{index + 1}\n")
-
-        logger.info(f"Completed processing all {len(jd_df)} job descriptions")
+        logger.info(f"Completed processing all {len(job_descriptions)} job descriptions")
 
     except Exception as e:
         logger.error(f"An unexpected error occurred in the main pipeline: {e}", exc_info=True)
@@ -192,7 +185,374 @@ def run_pipeline():
         if db_manager:
             db_manager.close()
             logger.info("Database connection closed.")
+        log_ollama_stats(ollama_client)
         logger.info("🏁 Recruitment Automation Pipeline Finished 🏁")
 
+
+def run_rescore(jd_ids: Optional[List[int]] = None):
+    """
+    Recomputes scores and shortlists for stored candidates (all open JDs, or `jd_ids`) after a change to
+    SHORTLIST_THRESHOLD, the embedding text templates or the embedding model. Uses the stored JD summaries and
+    extracted resume JSON: no resume is parsed and no completion is requested; only embedding inputs without a
+    stored vector are sent to Ollama. Interviews are not scheduled; run the pipeline with --resume for that.
+    """
+    logger.info("🚀 Starting rescore from stored extractions 🚀")
+    create_tables()
+    try:
+        ollama_client = OllamaClient()
+    except ConnectionError as e:
+        logger.error(f"CRITICAL: Could not connect to Ollama (needed for embeddings). Rescore cannot proceed. {e}")
+        return
+
+    db_manager = open_db_manager()
+    started = time.monotonic()
+    rescored_count = 0
+    try:
+        agents = build_agents(ollama_client, db_manager)
+        open_jds = [(jd_id, summary) for jd_id, summary in db_manager.get_open_job_descriptions()
+                    if not jd_ids or jd_id in jd_ids]
+        if not open_jds:
+            logger.warning("No summarized JDs to rescore. Run the pipeline first.")
+            return
+        for jd_id, jd_summary in open_jds:
+            jd_context = agents.resume_matcher.build_jd_context(jd_id, jd_summary)
+            if jd_context is None:
+                continue
+            rescored_count += agents.resume_matcher.rescore_candidates_for_jd(jd_context)
+            agents.shortlister.shortlist_candidates(jd_id)
+            log_candidate_statuses(db_manager, jd_id, jd_summary.get("job_title", "N/A"))
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during rescoring: {e}", exc_info=True)
+        db_manager.add_log("MainPipeline", "CRITICAL", f"Rescore failed: {e}")
+    finally:
+        db_manager.close()
+        log_ollama_stats(ollama_client)
+        logger.info(f"🏁 Rescore finished: {rescored_count} candidates in {time.monotonic() - started:.2f}s 🏁")
+
+
+def run_schedule(jd_ids: Optional[List[int]] = None):
+    """
+    Books interview slots for every shortlisted candidate of the open JDs (or `jd_ids`) in one allocation,
+    best score first across JDs, and sends the invitations. Needs no Ollama.
+    """
+    logger.info("🚀 Starting interview scheduling 🚀")
+    create_tables()
+    db_manager = DBManager()
+    try:
+        jds = [(jd_id, summary.get("job_title", "the Position")) for jd_id, summary in db_manager.get_open_job_descriptions()
+               if not jd_ids or jd_id in jd_ids]
+        if not jds:
+            logger.warning("No summarized JDs to schedule interviews for. Run the pipeline first.")
+            return
+        invited = InterviewSchedulerAgent(db_manager).schedule_all_interviews(jds)
+        logger.info(f"🏁 Interview scheduling finished: {invited} invitations sent for {len(jds)} JDs 🏁")
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during interview scheduling: {e}", exc_info=True)
+        db_manager.add_log("MainPipeline", "CRITICAL", f"Interview scheduling failed: {e}")
+    finally:
+        db_manager.close()
+
+
+def run_maintenance(retention_days: int, vacuum_pages: int, vacuum: bool = True):
+    """Log retention and rollups, compression of older payload rows and incremental VACUUM; reports space reclaimed."""
+    logger.info("🚀 Starting database maintenance 🚀")
+    create_tables()
+    db_manager = DBManager()
+    try:
+        DBMaintenance(db_manager).run(retention_days, vacuum_pages=vacuum_pages, vacuum=vacuum)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during database maintenance: {e}", exc_info=True)
+    finally:
+        db_manager.close()
+
+
+def run_plan(resume: bool = False, as_json: bool = False):
+    """
+    Dry run: reports how many resume parses, LLM completions, embeddings, DB writes and emails `run` (with
+    --resume if set) would do, and an estimated wall time from recorded call latencies. Ollama is not called.
+    """
+    if not os.path.exists(JOB_DESCRIPTION_CSV):
+        logger.error(f"Job description CSV file not found: {JOB_DESCRIPTION_CSV}. Nothing to plan.")
+        return
+    # The database is only read. When `run` would still create or migrate the schema, the plan works on an
+    # in-memory copy with that done, and the changes are reported instead of applied.
+    schema_changes = pending_schema_changes()
+    scratch = None
+    if schema_changes:
+        scratch = sqlite3.connect(PLAN_SCRATCH_DB, uri=True)
+        if os.path.exists(DB_PATH):
+            source = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+            source.backup(scratch)
+            source.close()
+        create_tables(scratch)
+    db_manager = DBManager(PLAN_SCRATCH_DB) if scratch else DBManager(read_only=True)
+    planner = RunPlanner(db_manager, resume=resume)
+    try:
+        job_descriptions = load_job_descriptions(db_manager) or []
+        plan = planner.plan(job_descriptions)
+        plan["schema_changes"] = schema_changes
+        print(json.dumps(plan, indent=2) if as_json else format_plan(plan))
+        logger.info(f"Plan: {plan['completions']} completions, {plan['embeddings']} embeddings, {plan['parses']} parses, "
+                    f"{plan['db_writes']} DB writes, {plan['emails']} emails; estimated {plan['estimated_wall_seconds']:.0f}s")
+    finally:
+        planner.close()
+        db_manager.close()
+        if scratch:
+            scratch.close()
+
+
+def run_export(path: str, file_format: Optional[str] = None, jd_ids: Optional[List[int]] = None, status: Optional[str] = None,
+               include_skill_list: bool = False, skill_columns: Optional[List[str]] = None, top_skills: int = 0,
+               batch_rows: int = EXPORT_BATCH_ROWS):
+    """Streams match results (JD, candidate, scores, status) to Parquet or CSV in batches of `batch_rows`."""
+    create_tables()
+    db_manager = DBManager()
+    started = time.monotonic()
+    try:
+        report = ResultsExporter(db_manager, batch_rows=batch_rows).export(
+            path, file_format=file_format, jd_ids=jd_ids, status=status, include_skill_list=include_skill_list,
+            skill_columns=skill_columns or [], top_skills=top_skills)
+        logger.info(f"🏁 Export finished: {report['rows']} rows to {path} in {time.monotonic() - started:.2f}s 🏁")
+    except Exception as e:
+        logger.error(f"Export to {path} failed: {e}", exc_info=not isinstance(e, RuntimeError))
+    finally:
+        db_manager.close()
+
+
+def enqueue_job_descriptions() -> int:
+    """Loads the JD CSV into the work_queue table for worker processes. Rows already queued are skipped."""
+    create_tables()
+    db_manager = DBManager()
+    try:
+        job_descriptions = load_job_descriptions(db_manager)
+        if not job_descriptions:
+            return 0
+        added = db_manager.enqueue_work_items(job_descriptions)
+        logger.info(f"Work queue status: {db_manager.get_work_queue_counts()}")
+        return added
+    finally:
+        db_manager.close()
+
+
+def run_worker(worker_id: Optional[str] = None, wait: bool = False, resume: bool = False, log_queue: Optional[Any] = None):
+    """
+    Worker mode: repeatedly leases a JD from the work_queue and runs the full per-JD pipeline on it.
+    Exits when the queue is drained, unless `wait` is set (then it keeps polling).
+    Worker processes started by run_workers send their log records to the parent over `log_queue`.
+    """
+    if log_queue is not None:
+        setup_logging(log_queue)
+    worker_id = worker_id or default_worker_id()
+    logger.info(f"🚀 Starting worker {worker_id} 🚀")
+    create_tables()
+
+    try:
+        ollama_client = OllamaClient()
+    except ConnectionError as e:
+        logger.error(f"CRITICAL: Worker {worker_id} could not connect to Ollama. {e}")
+        return
+
+    db_manager = open_db_manager()
+    processed_count = 0
+    try:
+        agents = build_agents(ollama_client, db_manager, resume=resume)
+        while True:
+            item = db_manager.claim_work_item(worker_id, WORK_QUEUE_LEASE_SECONDS, WORK_QUEUE_MAX_ATTEMPTS)
+            if item is None:
+                if not wait:
+                    logger.info(f"Worker {worker_id}: work queue drained.")
+                    break
+                time.sleep(WORK_QUEUE_POLL_SECONDS)
+                continue
+
+            jd = {"raw_text": item["raw_text"], "title": item["title"] or "N/A Job Title", "source_file": item["source_file"]}
+            try:
+                with LeaseHeartbeat(item["id"], worker_id, WORK_QUEUE_LEASE_SECONDS, WORK_QUEUE_HEARTBEAT_SECONDS, db_manager.db_path) as heartbeat:
+                    jd_id = process_job_description(agents, db_manager, jd, label=f"work item {item['id']}")
+                if heartbeat.lost.is_set():
+                    logger.warning(f"Worker {worker_id} finished work item {item['id']} after losing its lease; another worker may redo it.")
+                if jd_id is None:
+                    db_manager.fail_work_item(item["id"], worker_id, "JD summarization failed", WORK_QUEUE_MAX_ATTEMPTS)
+                else:
+                    db_manager.complete_work_item(item["id"], worker_id, jd_id)
+                    processed_count += 1
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed on work item {item['id']}: {e}", exc_info=True)
+                db_manager.fail_work_item(item["id"], worker_id, str(e), WORK_QUEUE_MAX_ATTEMPTS)
+    finally:
+        db_manager.close()
+        log_ollama_stats(ollama_client)
+        logger.info(f"🏁 Worker {worker_id} finished. Processed {processed_count} JDs 🏁")
+
+
+def run_workers(process_count: int, wait: bool = False, resume: bool = False):
+    """Starts `process_count` local worker processes sharing the same database and work queue."""
+    if process_count <= 1:
+        run_worker(wait=wait, resume=resume)
+        return
+    # One process writes (and rotates) LOG_FILE; workers only enqueue their records
+    log_queue = multiprocessing.Queue()
+    log_forwarder = forward_logs(log_queue)
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(default_worker_id(str(i)), wait, resume, log_queue), name=f"worker-{i}")
+        for i in range(process_count)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    log_forwarder.stop()
+    logger.info(f"All {process_count} worker processes exited.")
+
+
+def run_daemon(force_polling: bool = False):
+    """
+    Long-running intake mode: watches RESUMES_DIR and scores each new resume once against every JD in the
+    database, keeping the Ollama session, JD embeddings, skill vocabulary and embedding store warm in memory.
+    """
+    logger.info("🚀 Starting resume intake daemon 🚀")
+    create_tables()
+    try:
+        ollama_client = OllamaClient()
+    except ConnectionError as e:
+        logger.error(f"CRITICAL: Could not connect to Ollama. Daemon cannot start. {e}")
+        return
+
+    db_manager = DBManager()
+    latency = LatencyTracker()
+    watcher = FolderWatcher(RESUMES_DIR, DAEMON_DEBOUNCE_SECONDS, DAEMON_POLL_SECONDS,
+                            file_filter=is_resume_file, force_polling=force_polling)
+    try:
+        # The daemon always skips (JD, resume) pairs that were already matched
+        agents = build_agents(ollama_client, db_manager, resume=True)
+        jd_contexts = agents.resume_matcher.refresh_jd_contexts({})
+        jd_contexts_loaded_at = time.time()
+        logger.info(f"Loaded {len(jd_contexts)} open JDs into memory.")
+        if not jd_contexts:
+            logger.warning("No summarized JDs in the database yet. Run the pipeline (or worker mode) first; the daemon will pick them up.")
+
+        for resume_file_path, first_seen in watcher.watch():
+            if time.time() - jd_contexts_loaded_at > DAEMON_JD_REFRESH_SECONDS:
+                agents.resume_matcher.refresh_jd_contexts(jd_contexts)
+                jd_contexts_loaded_at = time.time()
+
+            started = time.time()
+            try:
+                scores = agents.resume_matcher.process_resume_for_jds(resume_file_path, list(jd_contexts.values()))
+            except Exception as e:
+                logger.error(f"Failed to process {resume_file_path}: {e}", exc_info=True)
+                db_manager.add_log("IntakeDaemon", "ERROR", f"Failed to process {resume_file_path}: {e}")
+                continue
+            finished = time.time()
+            if not scores:
+                continue
+
+            latency.record(finished - first_seen)
+            best_jd_id, best_score = max(scores.items(), key=lambda item: item[1])
+            logger.info(f"Scored {os.path.basename(resume_file_path)} against {len(scores)} JDs in {finished - started:.2f}s "
+                        f"(drop to score: {finished - first_seen:.2f}s). Best: JD {best_jd_id} ({best_score:.4f})")
+            logger.info(f"Drop-to-score latency: {latency.format_summary()}")
+            db_manager.add_log("IntakeDaemon", "INFO", f"Scored {resume_file_path} against {len(scores)} JDs, drop to score {finished - first_seen:.2f}s")
+    except KeyboardInterrupt:
+        logger.info("Daemon interrupted.")
+    finally:
+        watcher.stop()
+        db_manager.close()
+        logger.info(f"🏁 Resume intake daemon stopped. Drop-to-score latency: {latency.format_summary()} 🏁")
+
+
+def run_service(host: str, port: int, max_concurrency: int):
+    """Serves resume scoring over HTTP with warm JD contexts (see utils/scoring_service.py for the routes)."""
+    logger.info("🚀 Starting scoring service 🚀")
+    create_tables()
+    try:
+        ollama_client = OllamaClient()
+    except ConnectionError as e:
+        logger.error(f"CRITICAL: Could not connect to Ollama. Service cannot start. {e}")
+        return
+
+    service = ScoringService(ollama_client, max_concurrency=max_concurrency)
+    service.warm_up()
+    server = make_server(service, host, port)
+    logger.info(f"Scoring service listening on http://{host}:{port} (max {max_concurrency} concurrent requests)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Service interrupted.")
+    finally:
+        server.server_close()
+        service.close()
+        for endpoint, tracker in service.latency.items():
+            logger.info(f"Latency {endpoint}: {tracker.format_summary()}")
+        logger.info("🏁 Scoring service stopped. 🏁")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Multi-agent recruitment automation pipeline")
+    subparsers = parser.add_subparsers(dest="command")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip stages that completed in an earlier run (JD summaries, extractions, matches, shortlists, invitations)")
+    subparsers.add_parser("run", help="Process every JD in the CSV sequentially (default)")
+    subparsers.add_parser("enqueue", help="Load the JD CSV into the work queue for worker processes")
+    worker_parser = subparsers.add_parser("worker", help="Lease JDs from the work queue and process them")
+    worker_parser.add_argument("--processes", type=int, default=1, help="Number of local worker processes to start")
+    worker_parser.add_argument("--worker-id", default=None, help="Worker id (defaults to host-pid); only used with --processes 1")
+    worker_parser.add_argument("--enqueue", action="store_true", help="Enqueue the JD CSV before starting the workers")
+    worker_parser.add_argument("--wait", action="store_true", help="Keep polling for new work instead of exiting when the queue is empty")
+    daemon_parser = subparsers.add_parser("daemon", help="Watch RESUMES_DIR and score new resumes against all JDs as they arrive")
+    daemon_parser.add_argument("--poll", action="store_true", help="Use directory polling instead of inotify")
+    rescore_parser = subparsers.add_parser("rescore", help="Recompute scores and shortlists from stored extractions (no LLM extraction)")
+    rescore_parser.add_argument("--jd-id", type=int, action="append", dest="jd_ids", help="Only rescore this JD (repeatable)")
+    schedule_parser = subparsers.add_parser("schedule", help="Book interview slots for all shortlisted candidates and send invitations")
+    schedule_parser.add_argument("--jd-id", type=int, action="append", dest="jd_ids", help="Only schedule this JD (repeatable)")
+    maintain_parser = subparsers.add_parser("maintain", help="Roll up old logs, compress older payloads and VACUUM; reports space reclaimed")
+    maintain_parser.add_argument("--log-retention-days", type=int, default=LOG_RETENTION_DAYS, help="Keep individual log rows this many days")
+    maintain_parser.add_argument("--vacuum-pages", type=int, default=DB_VACUUM_PAGES, help="Free pages to return per run (0 = all)")
+    maintain_parser.add_argument("--no-vacuum", action="store_true", help="Skip the VACUUM step")
+    plan_parser = subparsers.add_parser("plan", help="Dry run: count the parses, LLM calls, DB writes and emails a run would do and estimate its time")
+    plan_parser.add_argument("--json", action="store_true", dest="as_json", help="Print the plan as JSON")
+    export_parser = subparsers.add_parser("export", help="Stream match results to Parquet or CSV in batches")
+    export_parser.add_argument("path", help="Output file: .parquet (needs pyarrow), .csv or .csv.gz")
+    export_parser.add_argument("--format", choices=("parquet", "csv"), default=None, dest="file_format", help="Override the format implied by the extension")
+    export_parser.add_argument("--jd-id", type=int, action="append", dest="jd_ids", help="Only export this JD (repeatable)")
+    export_parser.add_argument("--status", default=None, help="Only export matches with this status, e.g. shortlisted")
+    export_parser.add_argument("--skills", action="store_true", help="Add a 'skills' column with the resume's skills joined by ';'")
+    export_parser.add_argument("--skill-columns", default="", help="Comma-separated skills to add as 0/1 skill_<name> columns")
+    export_parser.add_argument("--top-skills", type=int, default=0, help="Also add 0/1 columns for the N most common skills")
+    export_parser.add_argument("--batch-rows", type=int, default=EXPORT_BATCH_ROWS, help="Rows fetched and written per batch")
+    serve_parser = subparsers.add_parser("serve", help="Run the local HTTP scoring service")
+    serve_parser.add_argument("--host", default=SERVICE_HOST)
+    serve_parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    serve_parser.add_argument("--max-concurrency", type=int, default=SERVICE_MAX_CONCURRENCY)
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    args = parse_args()
+    if args.command == "enqueue":
+        enqueue_job_descriptions()
+    elif args.command == "worker":
+        if args.enqueue:
+            enqueue_job_descriptions()
+        if args.processes <= 1:
+            run_worker(args.worker_id, wait=args.wait, resume=args.resume)
+        else:
+            run_workers(args.processes, wait=args.wait, resume=args.resume)
+    elif args.command == "daemon":
+        run_daemon(force_polling=args.poll)
+    elif args.command == "rescore":
+        run_rescore(args.jd_ids)
+    elif args.command == "schedule":
+        run_schedule(args.jd_ids)
+    elif args.command == "maintain":
+        run_maintenance(args.log_retention_days, args.vacuum_pages, vacuum=not args.no_vacuum)
+    elif args.command == "plan":
+        run_plan(resume=args.resume, as_json=args.as_json)
+    elif args.command == "export":
+        run_export(args.path, args.file_format, args.jd_ids, args.status, include_skill_list=args.skills,
+                   skill_columns=[skill for skill in args.skill_columns.split(",") if skill.strip()],
+                   top_skills=args.top_skills, batch_rows=args.batch_rows)
+    elif args.command == "serve":
+        run_service(args.host, args.port, args.max_concurrency)
+    else:
+        run_pipeline(resume=args.resume)
@@ -1,48 +1,349 @@
+import os
+import json
 import sqlite3
 import logging
-from config import DB_PATH
+from typing import List, Optional
+from config import DB_PATH, DB_JOURNAL_MODE
+from utils.hashing import resume_content_hash
+from utils.resume_index import index_resume, education_level
+from utils.compression import unpack_text
 
 logger = logging.getLogger(__name__)
 
-def create_tables():
-    conn = None
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> bool:
+    # CREATE TABLE IF NOT EXISTS does not touch existing tables, so new columns are added here
+    existing_columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in existing_columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Added column '{column}' to table '{table}'.")
+        return True
+    return False
+
+def _migrate_candidates_table(conn: sqlite3.Connection):
+    """
+    One-time move of the old per-(JD, email) candidates table into resumes + matches. Match ids are the
+    old candidate ids, so checkpoints and logs that mention candidate ids stay valid. The old table is
+    kept as candidates_legacy and can be dropped once the migration has been checked.
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-checked under the write lock in case another process migrated first
+        row = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'candidates'").fetchone()
+        if not row or row[0] != 'table':
+            conn.rollback()
+            return
+        _add_column_if_missing(cursor, "candidates", "skill_coverage_score", "REAL")
+        rows = cursor.execute("""
+        SELECT id, job_description_id, candidate_name, email, phone, resume_file_path, extracted_resume_json,
+               match_score, skill_coverage_score, status, interview_datetime, notes, created_at, updated_at
+        FROM candidates
+        ORDER BY updated_at, id
+        """).fetchall()
+
+        content_hashes = {}
+        for (candidate_id, jd_id, name, email, phone, path, extracted_json, match_score, skill_coverage,
+             status, interview_datetime, notes, created_at, updated_at) in rows:
+            if path not in content_hashes:
+                content_hashes[path] = resume_content_hash(path)
+            content_hash = content_hashes[path]
+            # Rows are visited oldest first, so the most recent extraction wins
+            cursor.execute("""
+            INSERT INTO resumes (content_hash, candidate_name, email, phone, resume_file_path, extracted_resume_json,
+                                 created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (content_hash, email) DO UPDATE SET
+                candidate_name = excluded.candidate_name, phone = COALESCE(excluded.phone, phone),
+                resume_file_path = excluded.resume_file_path,
+                extracted_resume_json = COALESCE(excluded.extracted_resume_json, extracted_resume_json),
+                updated_at = excluded.updated_at
+            """, (content_hash, name, email, phone, path, extracted_json, created_at, updated_at))
+            resume_id = cursor.execute(
+                "SELECT id FROM resumes WHERE content_hash = ? AND email IS ? ORDER BY id DESC LIMIT 1",
+                (content_hash, email)
+            ).fetchone()[0]
+            cursor.execute("""
+            INSERT INTO matches (id, job_description_id, resume_id, match_score, skill_coverage_score, status,
+                                 interview_datetime, notes, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (candidate_id, jd_id, resume_id, match_score, skill_coverage, status, interview_datetime, notes,
+                  created_at, updated_at))
+
+        cursor.execute("ALTER TABLE candidates RENAME TO candidates_legacy")
+        conn.commit()
+        resume_count = cursor.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+        logger.info(f"Migrated {len(rows)} candidate rows into {resume_count} resumes and {len(rows)} matches. "
+                    f"Old rows kept in 'candidates_legacy'.")
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+def _create_search_tables(cursor: sqlite3.Cursor) -> bool:
+    """Creates the resume search tables. Returns False if this SQLite build has no FTS5 (skill search still works)."""
+    # Resume Skills Table - normalized skills per resume, indexed by skill for boolean skill queries
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resume_skills (
+        resume_id INTEGER NOT NULL,
+        skill TEXT NOT NULL, -- normalized (lowercase, aliases resolved), see utils/skills.py
+        raw_skill TEXT, -- as extracted
+        PRIMARY KEY (resume_id, skill),
+        FOREIGN KEY (resume_id) REFERENCES resumes (id)
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resume_skills_skill ON resume_skills (skill, resume_id)")
+
+    # Resume Education Table - one row per extracted education entry
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resume_education (
+        resume_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        entry TEXT NOT NULL,
+        level INTEGER, -- degree level of the entry (0 school .. 4 doctorate), NULL if none is recognised
+        PRIMARY KEY (resume_id, position),
+        FOREIGN KEY (resume_id) REFERENCES resumes (id)
+    )
+    """)
+
+    if _add_column_if_missing(cursor, "resume_education", "level", "INTEGER"):
+        rows = cursor.execute("SELECT resume_id, position, entry FROM resume_education").fetchall()
+        cursor.executemany("UPDATE resume_education SET level = ? WHERE resume_id = ? AND position = ?",
+                           [(education_level(entry), resume_id, position) for resume_id, position, entry in rows])
+
+    # Resume Experience Table - experience summary plus the years figure parsed from it
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resume_experience (
+        resume_id INTEGER PRIMARY KEY,
+        summary TEXT,
+        years REAL,
+        FOREIGN KEY (resume_id) REFERENCES resumes (id)
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resume_experience_years ON resume_experience (years)")
+
+    # Full-text index over the parsed resume fields; rowid is resumes.id
+    try:
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS resume_fts USING fts5(
+            candidate_name, skills, experience, education, projects,
+            tokenize = "unicode61 tokenchars '+#'"
+        )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 is not available in this SQLite build ({e}); full-text resume search is disabled.")
+        return False
+    logger.info("Resume search tables checked/created successfully.")
+    return True
+
+def _backfill_resume_index(conn: sqlite3.Connection, fts_enabled: bool):
+    # Resumes stored before the search tables existed (or by the candidates migration) have no experience row yet
+    cursor = conn.cursor()
+    rows = cursor.execute("""
+    SELECT id, extracted_resume_json FROM resumes
+    WHERE extracted_resume_json IS NOT NULL AND id NOT IN (SELECT resume_id FROM resume_experience)
+    """).fetchall()
+    if not rows:
+        return
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for resume_id, extracted_json in rows:
+            try:
+                resume_data = json.loads(unpack_text(extracted_json))
+            except json.JSONDecodeError as e:
+                logger.error(f"Skipping search indexing of resume ID {resume_id}, invalid JSON: {e}")
+                continue
+            index_resume(cursor, resume_id, resume_data if isinstance(resume_data, dict) else None, fts_enabled)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    logger.info(f"Indexed {len(rows)} existing resumes for skill/full-text search.")
+
+def create_tables(conn: Optional[sqlite3.Connection] = None):
+    # With `conn` (e.g. the in-memory copy `plan` works on) the schema is created there and the caller closes it
+    own_connection = conn is None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        if own_connection:
+            conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
+        # Only takes effect on a new DB; `python main.py maintain` switches existing ones (needs one full VACUUM)
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL lets worker processes read while another one writes; the setting is persistent per DB file
+        cursor.execute(f"PRAGMA journal_mode={DB_JOURNAL_MODE}")
 
         # Job Descriptions Table
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS job_descriptions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             source_file TEXT, -- e.g., path to the CSV row or original JD file
-            raw_text TEXT NOT NULL,
+            raw_text TEXT NOT NULL, -- plain text, or a compressed BLOB (utils/compression.py)
             summary_json TEXT, -- JSON string of skills, experience, etc.
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         """)
         logger.info("Table 'job_descriptions' checked/created successfully.")
 
-        # Candidates Table
+        # Resumes Table - one row per unique resume file (content hash) and candidate email
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS candidates (
+        CREATE TABLE IF NOT EXISTS resumes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            job_description_id INTEGER,
+            content_hash TEXT NOT NULL, -- sha256 of the resume file
             candidate_name TEXT,
             email TEXT,
             phone TEXT,
             resume_file_path TEXT NOT NULL,
-            extracted_resume_json TEXT, -- JSON string of extracted info
+            extracted_resume_json TEXT, -- JSON string of extracted info (or compressed BLOB), stored once regardless of JD count
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP,
+            UNIQUE (content_hash, email)
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_resumes_email ON resumes (email)")
+        logger.info("Table 'resumes' checked/created successfully.")
+
+        # Matches Table - slim per-(JD, resume) scoring state; ids are the candidate ids used by the agents
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS matches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_description_id INTEGER NOT NULL,
+            resume_id INTEGER NOT NULL,
             match_score REAL,
+            skill_coverage_score REAL, -- mean best-match similarity of JD required skills vs resume skills
+            semantic_score REAL, -- hybrid score components (see utils/hybrid_scorer.py); match_score combines them
+            skill_overlap_score REAL,
+            experience_score REAL,
+            education_score REAL,
             status TEXT CHECK(status IN ('parsed', 'summarized', 'matched', 'shortlisted', 'invited', 'rejected', 'error')), -- extended statuses
             interview_datetime TIMESTAMP,
             notes TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP,
             FOREIGN KEY (job_description_id) REFERENCES job_descriptions (id),
-            UNIQUE (job_description_id, email) -- A candidate is unique per job posting by email
+            FOREIGN KEY (resume_id) REFERENCES resumes (id),
+            UNIQUE (job_description_id, resume_id)
+        )
+        """)
+        for column in ("semantic_score", "skill_overlap_score", "experience_score", "education_score"):
+            _add_column_if_missing(cursor, "matches", column, "REAL")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_jd_score ON matches (job_description_id, match_score DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_resume ON matches (resume_id)")
+        logger.info("Table 'matches' checked/created successfully.")
+
+        # Databases created before the resumes/matches split still have a candidates table
+        row = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'candidates'").fetchone()
+        if row and row[0] == 'table':
+            _migrate_candidates_table(conn)
+
+        # Candidates View - the old per-(JD, email) row shape, read by existing queries and reports.
+        # New columns are appended at the end; a view from an older version is recreated to pick them up.
+        view_columns = {row[1] for row in cursor.execute("PRAGMA table_info(candidates)").fetchall()}
+        if view_columns and "education_score" not in view_columns:
+            cursor.execute("DROP VIEW IF EXISTS candidates")
+        cursor.execute("""
+        CREATE VIEW IF NOT EXISTS candidates AS
+        SELECT m.id, m.job_description_id, r.candidate_name, r.email, r.phone, r.resume_file_path,
+               r.extracted_resume_json, m.match_score, m.skill_coverage_score, m.status, m.interview_datetime,
+               m.notes, m.created_at, m.updated_at, m.resume_id, m.semantic_score, m.skill_overlap_score,
+               m.experience_score, m.education_score
+        FROM matches m
+        JOIN resumes r ON r.id = m.resume_id
+        """)
+        logger.info("View 'candidates' checked/created successfully.")
+
+        fts_enabled = _create_search_tables(cursor)
+        _backfill_resume_index(conn, fts_enabled)
+
+        # Skill Vocabulary Table - one embedding per normalized skill string and embedding model
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS skill_vocabulary (
+            skill TEXT NOT NULL, -- normalized skill string
+            model TEXT NOT NULL, -- embedding model the vector was produced with
+            embedding BLOB NOT NULL, -- float32 vector, L2-normalized
+            dimensions INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (skill, model)
         )
         """)
-        logger.info("Table 'candidates' checked/created successfully.")
+        logger.info("Table 'skill_vocabulary' checked/created successfully.")
+
+        # Interview Bookings Table - one row per (interview, interviewer); add_interview_bookings rejects
+        # intervals overlapping an interviewer's existing bookings, also across worker processes
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS interview_bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            interviewer TEXT NOT NULL,
+            slot_start TIMESTAMP NOT NULL, -- ISO minutes, e.g. 2026-11-02T09:45 (copied to matches.interview_datetime)
+            slot_end TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (match_id) REFERENCES matches (id),
+            UNIQUE (match_id, interviewer),
+            UNIQUE (interviewer, slot_start)
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_interview_bookings_end ON interview_bookings (slot_end)")
+        logger.info("Table 'interview_bookings' checked/created successfully.")
+
+        # Resume Signatures Tables - MinHash signatures of parsed resume text and their LSH band buckets
+        # (utils/near_duplicates.py); near-duplicates point at the first resume of their cluster
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resume_signatures (
+            content_hash TEXT PRIMARY KEY, -- sha256 of the resume file
+            resume_file_path TEXT NOT NULL,
+            signature BLOB NOT NULL, -- uint32 MinHash values
+            duplicate_of TEXT, -- content_hash of the cluster representative; NULL for representatives
+            similarity REAL, -- estimated Jaccard similarity to the representative
+            email TEXT, -- contact details found by utils/resume_heuristics.py; different people are never linked
+            phone TEXT, -- digits only
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        _add_column_if_missing(cursor, "resume_signatures", "email", "TEXT")
+        _add_column_if_missing(cursor, "resume_signatures", "phone", "TEXT")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resume_lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            PRIMARY KEY (band, bucket, content_hash)
+        ) WITHOUT ROWID
+        """)
+        logger.info("Tables 'resume_signatures' and 'resume_lsh_buckets' checked/created successfully.")
+
+        # Work Queue Table - JD work items claimed by worker processes under an expiring lease
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS work_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_file TEXT NOT NULL, -- e.g., "data/job_descriptions.csv (row 3)"
+            job_title TEXT,
+            raw_text TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'leased', 'done', 'failed')),
+            lease_owner TEXT, -- worker id holding the lease
+            lease_expires_at REAL, -- unix time; an expired lease makes the item claimable again
+            heartbeat_at REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            job_description_id INTEGER, -- set when the item completes
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP,
+            FOREIGN KEY (job_description_id) REFERENCES job_descriptions (id),
+            UNIQUE (source_file, raw_text)
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_work_queue_status ON work_queue (status, lease_expires_at)")
+        logger.info("Table 'work_queue' checked/created successfully.")
+
+        # Pipeline Checkpoints Table - durable record of completed (JD, resume, stage) work for --resume runs
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+            stage TEXT NOT NULL, -- 'jd_summary', 'resume_extract', 'resume_match', 'shortlist', 'schedule'
+            jd_key TEXT NOT NULL DEFAULT '', -- JD text hash or JD ID; '' for JD-independent stages
+            resume_key TEXT NOT NULL DEFAULT '', -- resume file content hash; '' for JD-level stages
+            result_json TEXT, -- stage output needed to skip it next time
+            updated_at TIMESTAMP,
+            PRIMARY KEY (stage, jd_key, resume_key)
+        )
+        """)
+        logger.info("Table 'pipeline_checkpoints' checked/created successfully.")
 
         # Logs Table
         cursor.execute("""
@@ -54,17 +355,73 @@ def create_tables():
             message TEXT
         )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp)")
         logger.info("Table 'logs' checked/created successfully.")
 
+        # Log Rollups Table - per day/agent/level counts of log rows removed by retention (python main.py maintain)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS log_rollups (
+            day TEXT NOT NULL, -- YYYY-MM-DD
+            agent_name TEXT NOT NULL DEFAULT '',
+            level TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            first_timestamp TIMESTAMP,
+            last_timestamp TIMESTAMP,
+            PRIMARY KEY (day, agent_name, level)
+        )
+        """)
+        logger.info("Table 'log_rollups' checked/created successfully.")
+
         conn.commit()
-        logger.info(f"Database schema setup/verified in {DB_PATH}")
+        if own_connection:
+            logger.info(f"Database schema setup/verified in {DB_PATH}")
 
     except sqlite3.Error as e:
-        logger.error(f"Error creating tables in {DB_PATH}: {e}")
+        logger.error(f"Error creating tables in {DB_PATH if own_connection else 'the given connection'}: {e}")
+        if not own_connection:
+            raise
     finally:
-        if conn:
+        if conn and own_connection:
             conn.close()
 
+def pending_schema_changes(db_path: str = DB_PATH) -> List[str]:
+    """
+    What create_tables() would still create or migrate in `db_path`, found without writing to it: the schema
+    is built in an in-memory database and compared with the file opened read-only. [] when it is current.
+    """
+    if not os.path.exists(db_path):
+        return [f"create the database {db_path}"]
+    expected = sqlite3.connect(":memory:")
+    actual = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        logger.disabled = True  # the per-table "checked/created" lines are about the scratch schema
+        try:
+            create_tables(expected)
+        finally:
+            logger.disabled = False
+        existing = dict(actual.execute("SELECT name, type FROM sqlite_master").fetchall())
+        changes = []
+        if existing.get("candidates") == "table":
+            changes.append("migrate the old candidates table into resumes and matches")
+        objects = expected.execute("SELECT name, type, sql FROM sqlite_master WHERE type IN ('table', 'view', 'index') "
+                                   "AND name NOT LIKE 'sqlite_%' ORDER BY rowid").fetchall()
+        # FTS5 shadow tables come and go with their virtual table
+        virtual = [name for name, _, sql in objects if (sql or "").upper().startswith("CREATE VIRTUAL TABLE")]
+        for name, kind, _ in objects:
+            if any(name.startswith(f"{table}_") for table in virtual):
+                continue
+            if name not in existing:
+                changes.append(f"create {kind} {name}")
+            elif existing[name] == kind and kind != "index":
+                columns = {row[1] for row in actual.execute(f"PRAGMA table_info({name})")}
+                missing = [row[1] for row in expected.execute(f"PRAGMA table_info({name})") if row[1] not in columns]
+                if missing:
+                    changes.append(f"{'recreate' if kind == 'view' else 'add columns to'} {kind} {name} ({', '.join(missing)})")
+        return changes
+    finally:
+        expected.close()
+        actual.close()
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     create_tables()
\ No newline at end of file
@@ -0,0 +1,127 @@
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+from utils.latency import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Call outcomes reported to AdaptiveLimiter.release
+OUTCOME_OK = "ok"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_OVERLOAD = "overload"  # 5xx / connection refused: the server is struggling
+OUTCOME_IGNORED = "ignored"  # 4xx etc.: says nothing about server load
+
+BASELINE_RESET_SECONDS = 600.0  # the no-load baseline is re-estimated this often, in case the model got slower
+LATENCY_SMOOTHING = 0.2  # EWMA weight of the newest sample
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for calls to a shared backend (TCP-congestion-control style).
+    Every healthy response raises the limit by 1/limit, so it grows by about one per round of `limit`
+    calls. A timeout, an overload error, or smoothed latency above `latency_tolerance` x the no-load
+    baseline cuts the limit by `backoff`, at most once per round so one burst of slow replies counts once.
+    The baseline is the lowest latency seen (under load every sample is slow, so an average would creep
+    up with the load it is meant to detect); it is replaced by the latest window's minimum every
+    BASELINE_RESET_SECONDS.
+    """
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int, max_limit: int,
+                 latency_tolerance: float = 2.0, backoff: float = 0.7):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._baseline: Optional[float] = None
+        self._window_min: Optional[float] = None
+        self._window_started = time.monotonic()
+        self._smoothed: Optional[float] = None
+        self._last_decrease = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.timeouts = 0
+        self.overloads = 0
+        self.queue_wait = LatencyTracker()  # time spent waiting for a slot on our side
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> float:
+        """Blocks until a slot is free. Returns the monotonic start time to pass back to release()."""
+        requested = time.monotonic()
+        with self._condition:
+            self._waiting += 1
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._waiting -= 1
+            self._in_flight += 1
+        started = time.monotonic()
+        self.queue_wait.record(started - requested)
+        return started
+
+    def release(self, started: float, outcome: str = OUTCOME_OK):
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            self._in_flight -= 1
+            if outcome == OUTCOME_OK:
+                self._on_success(latency, now, started)
+            elif outcome in (OUTCOME_TIMEOUT, OUTCOME_OVERLOAD):
+                if outcome == OUTCOME_TIMEOUT:
+                    self.timeouts += 1
+                else:
+                    self.overloads += 1
+                self._decrease(now, started, f"{outcome} after {latency:.2f}s")
+            self._condition.notify_all()
+
+    def _on_success(self, latency: float, now: float, started: float):
+        if self._window_min is None or latency < self._window_min:
+            self._window_min = latency
+        if now - self._window_started > BASELINE_RESET_SECONDS:
+            self._baseline = self._window_min
+            self._window_min = None
+            self._window_started = now
+        elif self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        self._smoothed = latency if self._smoothed is None else self._smoothed + LATENCY_SMOOTHING * (latency - self._smoothed)
+
+        if self._smoothed > self._baseline * self.latency_tolerance:
+            self._decrease(now, started, f"latency {self._smoothed:.2f}s vs baseline {self._baseline:.2f}s")
+        elif self._limit < self.max_limit and self._in_flight + 1 >= int(self._limit):
+            # Only grow while the current limit is actually being used
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self.increases += 1
+
+    def _decrease(self, now: float, started: float, reason: str):
+        # Replies to calls issued before the last cut reflect the old limit; do not cut again for them
+        if started < self._last_decrease:
+            return
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        self._last_decrease = now
+        self.decreases += 1
+        if self.limit != previous:
+            logger.info(f"Ollama {self.name} concurrency limit {previous} -> {self.limit} ({reason})")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "baseline_latency": self._baseline,
+                "smoothed_latency": self._smoothed,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "timeouts": self.timeouts,
+                "overloads": self.overloads,
+                "queue_wait_seconds": self.queue_wait.summary(),
+            }
@@ -0,0 +1,71 @@
+import json
+import logging
+from typing import Optional, Dict, Any, Tuple, Iterator
+
+from utils.compression import unpack_text
+
+logger = logging.getLogger(__name__)
+
+# Every column of the candidates view (matches joined with resumes), in view order
+CANDIDATE_COLUMNS = (
+    "id", "job_description_id", "candidate_name", "email", "phone", "resume_file_path", "extracted_resume_json",
+    "match_score", "skill_coverage_score", "status", "interview_datetime", "notes", "created_at", "updated_at",
+    "resume_id", "semantic_score", "skill_overlap_score", "experience_score", "education_score"
+)
+# What listings (shortlisting, status displays, the scoring service) actually need
+CANDIDATE_SUMMARY_COLUMNS = ("id", "candidate_name", "email", "match_score", "skill_coverage_score", "status")
+
+_UNSET = object()
+
+
+class CandidateRecord:
+    """
+    Lightweight row from the candidates table. Columns are available as attributes (record.email) or by
+    position (record[2]); `resume_data` decodes extracted_resume_json on first access only. Compressed
+    payload columns (see utils/compression.py) are returned as text.
+    """
+    __slots__ = ("_index", "_values", "_resume_data")
+
+    def __init__(self, index: Dict[str, int], values: Tuple[Any, ...]):
+        self._index = index  # column name -> position, shared by every record of a query
+        self._values = values
+        self._resume_data = _UNSET
+
+    @staticmethod
+    def index_for(columns: Tuple[str, ...]) -> Dict[str, int]:
+        return {column: position for position, column in enumerate(columns)}
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return unpack_text(self._values[self._index[name]])
+        except KeyError:
+            raise AttributeError(f"Column '{name}' was not selected for this CandidateRecord") from None
+
+    def __getitem__(self, position: int) -> Any:
+        return unpack_text(self._values[position])
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (unpack_text(value) for value in self._values)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{column}={self._values[position]!r}" for column, position in self._index.items()
+                           if column != "extracted_resume_json")
+        return f"CandidateRecord({fields})"
+
+    @property
+    def resume_data(self) -> Optional[Dict[str, Any]]:
+        if self._resume_data is _UNSET:
+            raw_json = self.extracted_resume_json
+            try:
+                self._resume_data = json.loads(raw_json) if raw_json else None
+            except json.JSONDecodeError as e:
+                candidate_id = self._values[self._index["id"]] if "id" in self._index else None
+                logger.error(f"Failed to parse extracted_resume_json for candidate ID {candidate_id}: {e}")
+                self._resume_data = None
+        return self._resume_data
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {column: unpack_text(self._values[position]) for column, position in self._index.items()}
@@ -0,0 +1,44 @@
+import logging
+from typing import Optional, Any
+
+from utils.db_manager import DBManager
+from utils.hashing import text_hash, file_hash # re-exported for existing callers
+
+logger = logging.getLogger(__name__)
+
+# Stage names recorded in pipeline_checkpoints
+STAGE_JD_SUMMARY = "jd_summary"          # key: JD text hash
+STAGE_RESUME_EXTRACT = "resume_extract"  # key: resume file hash (JD-independent)
+STAGE_RESUME_MATCH = "resume_match"      # key: JD ID + resume file hash
+STAGE_SHORTLIST = "shortlist"            # key: JD ID
+STAGE_SCHEDULE = "schedule"              # key: JD ID
+
+
+class CheckpointManager:
+    """
+    Records completed pipeline stages and, when `resume` is set, returns their stored results so the
+    stage can be skipped. Checkpoints are always written; they are only read in resume mode.
+    """
+
+    def __init__(self, db_manager: DBManager, resume: bool = False):
+        self.db_manager = db_manager
+        self.resume = resume
+        self.hits = 0
+
+    def get(self, stage: str, jd_key: str = "", resume_key: str = "") -> Optional[Any]:
+        if not self.resume:
+            return None
+        result = self.db_manager.get_checkpoint(stage, jd_key, resume_key)
+        if result is not None:
+            self.hits += 1
+            logger.debug(f"Checkpoint hit: {stage} (jd={jd_key or '-'}, resume={resume_key[:12] or '-'})")
+        return result
+
+    def is_done(self, stage: str, jd_key: str = "", resume_key: str = "") -> bool:
+        return self.get(stage, jd_key, resume_key) is not None
+
+    def save(self, stage: str, result: Any = None, jd_key: str = "", resume_key: str = ""):
+        self.db_manager.save_checkpoint(stage, result if result is not None else {}, jd_key, resume_key)
+
+    def clear(self, stage: str, jd_key: str = "", resume_key: str = ""):
+        self.db_manager.delete_checkpoint(stage, jd_key, resume_key)
@@ -0,0 +1,61 @@
+import zlib
+import logging
+from typing import Optional, Union
+
+from config import DB_COMPRESSION, DB_COMPRESSION_MIN_BYTES
+
+try:
+    import zstandard  # optional: DB_COMPRESSION=zstd
+except ImportError:
+    zstandard = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Compressed values are stored as BLOBs starting with a format marker; TEXT values are uncompressed
+# (rows written before compression existed, or too small to be worth it) and are returned unchanged.
+ZLIB_MARKER = b"z1:"
+ZSTD_MARKER = b"zs:"
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+_warned_zstd_missing = False
+
+
+def _algorithm() -> str:
+    global _warned_zstd_missing
+    algorithm = DB_COMPRESSION.lower()
+    if algorithm == "zstd" and zstandard is None:
+        if not _warned_zstd_missing:
+            logger.warning("DB_COMPRESSION=zstd but the zstandard package is not installed; using zlib.")
+            _warned_zstd_missing = True
+        return "zlib"
+    return algorithm
+
+
+def pack_text(text: Optional[str]) -> Union[str, bytes, None]:
+    """Value to store for a large text/JSON column: compressed BLOB if that saves space, else the text itself."""
+    algorithm = _algorithm()
+    if text is None or algorithm == "none":
+        return text
+    raw = text.encode("utf-8")
+    if len(raw) < DB_COMPRESSION_MIN_BYTES:
+        return text
+    if algorithm == "zstd":
+        packed = ZSTD_MARKER + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        packed = ZLIB_MARKER + zlib.compress(raw, ZLIB_LEVEL)
+    return packed if len(packed) < len(raw) else text
+
+
+def unpack_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """Inverse of pack_text; also accepts plain TEXT values from older rows."""
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    value = bytes(value)
+    if value.startswith(ZLIB_MARKER):
+        return zlib.decompress(value[len(ZLIB_MARKER):]).decode("utf-8")
+    if value.startswith(ZSTD_MARKER):
+        if zstandard is None:
+            raise RuntimeError("This value is zstd-compressed; install the zstandard package to read it.")
+        return zstandard.ZstdDecompressor().decompress(value[len(ZSTD_MARKER):]).decode("utf-8")
+    return value.decode("utf-8")
@@ -0,0 +1,127 @@
+import os
+import logging
+from datetime import date, timedelta
+from typing import Dict, Any, List, Tuple
+
+from utils.db_manager import DBManager
+from utils.compression import pack_text
+from config import DB_COMPRESSION, DB_COMPRESSION_MIN_BYTES
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+COMPRESS_PAGE_ROWS = 500
+# (table, column) pairs DBManager stores through pack_text
+COMPRESSED_COLUMNS = (("job_descriptions", "raw_text"), ("resumes", "extracted_resume_json"))
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class DBMaintenance:
+    """
+    Keeps the SQLite file from growing forever:
+      - logs older than the retention period are folded into log_rollups (count per day/agent/level) and deleted;
+      - payload columns written before compression was enabled are compressed in place;
+      - free pages are returned to the file system with incremental VACUUM.
+    Each step reports what it did; run() adds the file size before and after.
+    """
+
+    def __init__(self, db_manager: DBManager):
+        self.db_manager = db_manager
+
+    def file_size(self) -> int:
+        """Bytes on disk: the DB file plus its WAL."""
+        path = self.db_manager.db_path
+        return sum(os.path.getsize(candidate) for candidate in (path, f"{path}-wal") if os.path.exists(candidate))
+
+    def _pragma(self, name: str) -> int:
+        return self.db_manager.fetch_one(f"PRAGMA {name}")[0]
+
+    def roll_up_logs(self, retention_days: int) -> Dict[str, Any]:
+        """Moves log rows dated before today - retention_days into per-day rollups."""
+        cutoff = (date.today() - timedelta(days=retention_days)).isoformat()
+
+        def _roll_up(cursor) -> Tuple[int, int]:
+            cursor.execute("""
+            INSERT INTO log_rollups (day, agent_name, level, count, first_timestamp, last_timestamp)
+            SELECT date(timestamp), COALESCE(agent_name, ''), COALESCE(level, ''), COUNT(*), MIN(timestamp), MAX(timestamp)
+            FROM logs WHERE timestamp < ?
+            GROUP BY date(timestamp), COALESCE(agent_name, ''), COALESCE(level, '')
+            ON CONFLICT (day, agent_name, level) DO UPDATE SET
+                count = count + excluded.count,
+                first_timestamp = MIN(first_timestamp, excluded.first_timestamp),
+                last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+            """, (cutoff,))
+            rollup_rows = cursor.rowcount
+            deleted = cursor.execute("DELETE FROM logs WHERE timestamp < ?", (cutoff,)).rowcount
+            return deleted, rollup_rows
+
+        deleted, rollup_rows = self.db_manager.run_in_transaction(_roll_up)
+        logger.info(f"Log retention: {deleted} log rows before {cutoff} rolled up into {rollup_rows} day/agent/level rows.")
+        return {"log_rows_deleted": deleted, "log_rollup_rows": rollup_rows, "log_cutoff": cutoff}
+
+    def compress_payloads(self) -> Dict[str, Any]:
+        """Compresses plain-text payloads large enough to be worth it (rows from before compression, or another setting)."""
+        if DB_COMPRESSION.lower() == "none":
+            return {"payloads_compressed": 0, "payload_bytes_saved": 0}
+        compressed, bytes_saved = 0, 0
+        for table, column in COMPRESSED_COLUMNS:
+            last_id = 0
+            while True:
+                rows = self.db_manager.fetch_all(f"""
+                SELECT id, {column} FROM {table}
+                WHERE id > ? AND typeof({column}) = 'text' AND length(CAST({column} AS BLOB)) >= ?
+                ORDER BY id LIMIT ?
+                """, (last_id, DB_COMPRESSION_MIN_BYTES, COMPRESS_PAGE_ROWS))
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                updates: List[Tuple[bytes, int]] = []
+                for row_id, text in rows:
+                    packed = pack_text(text)
+                    if isinstance(packed, bytes):
+                        updates.append((packed, row_id))
+                        bytes_saved += len(text.encode("utf-8")) - len(packed)
+                if updates:
+                    self.db_manager.run_in_transaction(
+                        lambda cursor: cursor.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates))
+                    compressed += len(updates)
+        logger.info(f"Payload compression: {compressed} values compressed, {bytes_saved / MB:.2f}MB saved.")
+        return {"payloads_compressed": compressed, "payload_bytes_saved": bytes_saved}
+
+    def vacuum(self, max_pages: int = 0) -> Dict[str, Any]:
+        """Returns up to max_pages (0 = all) free pages to the file system; truncates the WAL afterwards."""
+        conn = self.db_manager.conn
+        if conn.in_transaction:
+            conn.commit()
+        page_size = self._pragma("page_size")
+        free_before = self._pragma("freelist_count")
+        if self._pragma("auto_vacuum") != AUTO_VACUUM_INCREMENTAL:
+            # Switching an existing DB to incremental mode needs one full VACUUM (rewrites the file; takes a write lock)
+            logger.warning("Database is not in incremental auto_vacuum mode; running a one-time full VACUUM to switch it.")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            # executescript steps the pragma to completion; execute() would free a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({max_pages});" if max_pages > 0 else "PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        free_after = self._pragma("freelist_count")
+        pages_freed = free_before - free_after
+        logger.info(f"Vacuum: {pages_freed} free pages ({pages_freed * page_size / MB:.2f}MB) returned, {free_after} left.")
+        return {"pages_freed": pages_freed, "free_pages_left": free_after}
+
+    def run(self, retention_days: int, vacuum_pages: int = 0, vacuum: bool = True) -> Dict[str, Any]:
+        size_before = self.file_size()
+        report: Dict[str, Any] = {"size_before": size_before}
+        report.update(self.roll_up_logs(retention_days))
+        report.update(self.compress_payloads())
+        if vacuum:
+            report.update(self.vacuum(vacuum_pages))
+        report["size_after"] = self.file_size()
+        report["reclaimed_bytes"] = size_before - report["size_after"]
+        message = (f"Maintenance reclaimed {report['reclaimed_bytes'] / MB:.2f}MB "
+                   f"({size_before / MB:.2f}MB -> {report['size_after'] / MB:.2f}MB): "
+                   f"{report['log_rows_deleted']} log rows rolled up, {report['payloads_compressed']} payloads compressed"
+                   + (f", {report['pages_freed']} pages vacuumed" if vacuum else ""))
+        logger.info(message)
+        self.db_manager.add_log("DBMaintenance", "INFO", message)
+        return report
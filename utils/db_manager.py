@@ -1,22 +1,38 @@
 import sqlite3
 import json
+import time
 import logging
 from datetime import datetime
-from config import DB_PATH
-from typing import Optional, Union, List, Any # Import necessary types
+from config import DB_PATH, DB_BUSY_TIMEOUT_MS
+from typing import Optional, Union, List, Any, Callable, Dict, Iterator, Sequence, Tuple # Import necessary types
+from utils.hashing import resume_content_hash
+from utils.resume_index import index_resume
+from utils.skills import normalize_skills
+from utils.candidate_record import CandidateRecord, CANDIDATE_COLUMNS, CANDIDATE_SUMMARY_COLUMNS
+from utils.hybrid_scorer import SCORE_COMPONENT_COLUMNS
+from utils.compression import pack_text, unpack_text
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 500 # Rows fetched per round trip by the streaming iterators
+
 class DBManager:
-    def __init__(self, db_path=DB_PATH):
+    def __init__(self, db_path=DB_PATH, read_only: bool = False):
+        # read_only opens the file with mode=ro (used by `plan`); "file:" URIs are passed through as-is
         self.db_path = db_path
+        self.read_only = read_only
         self.conn: Optional[sqlite3.Connection] = None
         self.cursor: Optional[sqlite3.Cursor] = None
+        self._fts_enabled: Optional[bool] = None
         self._connect()
 
     def _connect(self):
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            if self.read_only:
+                self.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+            else:
+                self.conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000, uri=self.db_path.startswith("file:"))
+            self.conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
             self.cursor = self.conn.cursor()
             logger.info(f"Successfully connected to database: {self.db_path}")
         except sqlite3.Error as e:
@@ -67,13 +83,34 @@ class DBManager:
             raise
         return [] # Should not be reached
 
+    def run_in_transaction(self, fn: Callable[[sqlite3.Cursor], Any]) -> Any:
+        """
+        Runs fn(cursor) inside a BEGIN IMMEDIATE transaction, so reads and writes in fn are atomic
+        with respect to other connections/processes. Commits on success, rolls back on error.
+        """
+        if not self.conn:
+            logger.error("Database not connected. Cannot run transaction.")
+            return None
+        if self.conn.in_transaction:
+            self.conn.commit()
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            result = fn(cursor)
+            self.conn.commit()
+            return result
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logger.error(f"Transaction failed and was rolled back: {e}")
+            raise
+
     # --- Job Description Methods ---
     def add_job_description(self, raw_text: str, summary_json: dict, source_file: Optional[str] = None) -> Optional[int]:
         query = """
         INSERT INTO job_descriptions (raw_text, summary_json, source_file, created_at)
         VALUES (?, ?, ?, ?)
         """
-        params = (raw_text, json.dumps(summary_json), source_file, datetime.now().isoformat())
+        params = (pack_text(raw_text), json.dumps(summary_json), source_file, datetime.now().isoformat())
         cursor = self.execute_query(query, params)
         if cursor:
             logger.info(f"Added job description from {source_file or 'raw text'} with ID: {cursor.lastrowid}")
@@ -88,54 +125,93 @@ class DBManager:
                 # Unpack and potentially transform elements
                 # summary_json is at index 2
                 parsed_summary = json.loads(row[2]) if row[2] else {}
-                return (row[0], row[1], parsed_summary, row[3], row[4])
+                return (row[0], unpack_text(row[1]), parsed_summary, row[3], row[4])
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse summary_json for JD ID {jd_id}: {e}")
                 # Return row with raw JSON string or handle error as appropriate
-                return (row[0], row[1], row[2], row[3], row[4]) # Or None
+                return (row[0], unpack_text(row[1]), row[2], row[3], row[4]) # Or None
         return None
 
+    def get_open_job_descriptions(self) -> List[tuple]:
+        """Latest row per distinct JD text, as (id, parsed summary dict)."""
+        # Deduplicated on the unpacked text: the same JD may be stored plain in older rows and compressed in newer ones
+        latest: Dict[str, Tuple[int, str]] = {}
+        for jd_id, raw_text, summary_json in self.fetch_all(
+                "SELECT id, raw_text, summary_json FROM job_descriptions WHERE summary_json IS NOT NULL ORDER BY id"):
+            latest[unpack_text(raw_text)] = (jd_id, summary_json)
+        job_descriptions = []
+        for jd_id, summary_json in sorted(latest.values()):
+            try:
+                job_descriptions.append((jd_id, json.loads(summary_json)))
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse summary_json for JD ID {jd_id}: {e}")
+        return job_descriptions
+
     # --- Candidate Methods ---
     def add_or_update_candidate(self, job_description_id: int, candidate_name: str, email: str,
                                 resume_file_path: str, extracted_resume_json: Optional[dict] = None,
                                 match_score: Optional[float] = None, status: str = 'parsed',
-                                phone: Optional[str] = None, notes: Optional[str] = None) -> Optional[int]:
+                                phone: Optional[str] = None, notes: Optional[str] = None,
+                                content_hash: Optional[str] = None) -> Optional[int]:
+        """
+        Upserts the resume (shared by every JD) and the (JD, resume) match, and returns the match id, which
+        is the candidate id used everywhere else. A candidate is still unique per JD by email: a new resume
+        file for the same email replaces the resume the existing match points at.
+        """
+        if not self.conn:
+            logger.error("Database not connected. Cannot add or update candidate.")
+            return None
+
         now = datetime.now().isoformat()
+        content_hash = content_hash or resume_content_hash(resume_file_path)
+        extracted_json = pack_text(json.dumps(extracted_resume_json)) if extracted_resume_json else None
 
-        existing_candidate = self.fetch_one(
-            "SELECT id FROM candidates WHERE email = ? AND job_description_id = ?",
-            (email, job_description_id)
-        )
+        def _upsert(cursor: sqlite3.Cursor) -> Tuple[int, bool]:
+            # The WHERE clause skips rewriting the resume row when nothing changed (the usual case for JD 2..N)
+            cursor.execute("""
+            INSERT INTO resumes (content_hash, candidate_name, email, phone, resume_file_path, extracted_resume_json,
+                                 created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (content_hash, email) DO UPDATE SET
+                candidate_name = excluded.candidate_name, resume_file_path = excluded.resume_file_path,
+                extracted_resume_json = excluded.extracted_resume_json, phone = COALESCE(excluded.phone, phone),
+                updated_at = excluded.updated_at
+            WHERE candidate_name IS NOT excluded.candidate_name OR resume_file_path IS NOT excluded.resume_file_path
+               OR extracted_resume_json IS NOT excluded.extracted_resume_json
+               OR (excluded.phone IS NOT NULL AND phone IS NOT excluded.phone)
+            """, (content_hash, candidate_name, email, phone, resume_file_path, extracted_json, now, now))
+            resume_changed = cursor.rowcount > 0
+            resume_id = cursor.execute(
+                "SELECT id FROM resumes WHERE content_hash = ? AND email IS ? ORDER BY id DESC LIMIT 1",
+                (content_hash, email)
+            ).fetchone()[0]
+            if resume_changed:
+                index_resume(cursor, resume_id, extracted_resume_json, self.fts_enabled)
 
-        candidate_id: Optional[int] = None
+            existing_match = cursor.execute("""
+            SELECT m.id FROM matches m JOIN resumes r ON r.id = m.resume_id
+            WHERE m.job_description_id = ? AND r.email = ?
+            """, (job_description_id, email)).fetchone()
+            if existing_match:
+                cursor.execute("""
+                UPDATE matches
+                SET resume_id = ?, match_score = COALESCE(?, match_score), status = COALESCE(?, status),
+                    notes = COALESCE(?, notes), updated_at = ?
+                WHERE id = ?
+                """, (resume_id, match_score, status, notes, now, existing_match[0]))
+                return existing_match[0], False
+            cursor.execute("""
+            INSERT INTO matches (job_description_id, resume_id, match_score, status, notes, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (job_description_id, resume_id, match_score, status, notes, now, now))
+            return cursor.lastrowid, True
 
-        if existing_candidate:
-            candidate_id = existing_candidate[0]
-            query = """
-            UPDATE candidates
-            SET candidate_name = ?, resume_file_path = ?, extracted_resume_json = ?,
-                match_score = COALESCE(?, match_score), status = COALESCE(?, status),
-                phone = COALESCE(?, phone), notes = COALESCE(?, notes), updated_at = ?
-            WHERE id = ?
-            """
-            params = (candidate_name, resume_file_path,
-                      json.dumps(extracted_resume_json) if extracted_resume_json else None,
-                      match_score, status, phone, notes, now, candidate_id)
-            self.execute_query(query, params)
-            logger.info(f"Updated candidate {candidate_name} ({email}) with ID: {candidate_id} for JD {job_description_id}")
-        else:
-            query = """
-            INSERT INTO candidates (job_description_id, candidate_name, email, phone, resume_file_path,
-                                   extracted_resume_json, match_score, status, notes, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            params = (job_description_id, candidate_name, email, phone, resume_file_path,
-                      json.dumps(extracted_resume_json) if extracted_resume_json else None,
-                      match_score, status, notes, now, now)
-            cursor = self.execute_query(query, params)
-            if cursor:
-                candidate_id = cursor.lastrowid
-                logger.info(f"Added candidate {candidate_name} ({email}) with ID: {candidate_id} for JD {job_description_id}")
+        try:
+            candidate_id, created = self.run_in_transaction(_upsert)
+        except sqlite3.Error as e:
+            logger.error(f"Error adding/updating candidate {candidate_name} ({email}) for JD {job_description_id}: {e}")
+            raise
+        logger.info(f"{'Added' if created else 'Updated'} candidate {candidate_name} ({email}) with ID: {candidate_id} for JD {job_description_id}")
         return candidate_id
 
 
@@ -150,21 +226,25 @@ class DBManager:
         if row:
             try:
                 # extracted_resume_json is at index 6
-                parsed_resume_json = json.loads(row[6]) if row[6] else None
+                parsed_resume_json = json.loads(unpack_text(row[6])) if row[6] else None
                 return (*row[:6], parsed_resume_json, *row[7:])
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse extracted_resume_json for candidate email {email}, JD ID {job_description_id}: {e}")
                 return (*row[:6], row[6], *row[7:]) # Or None
         return None
 
-    def update_candidate_score_and_status(self, candidate_id: int, match_score: float, status: str):
-        query = "UPDATE candidates SET match_score = ?, status = ?, updated_at = ? WHERE id = ?"
-        params = (match_score, status, datetime.now().isoformat(), candidate_id)
+    def update_candidate_score_and_status(self, candidate_id: int, match_score: float, status: str,
+                                          components: Optional[Dict[str, Optional[float]]] = None):
+        # components: score component columns (see SCORE_COMPONENT_COLUMNS) written alongside the final score
+        components = self._checked_components(components)
+        assignments = "".join(f", {column} = ?" for column in components)
+        query = f"UPDATE matches SET match_score = ?, status = ?, updated_at = ?{assignments} WHERE id = ?"
+        params = (match_score, status, datetime.now().isoformat(), *components.values(), candidate_id)
         self.execute_query(query, params)
         logger.info(f"Updated candidate ID {candidate_id} score to {match_score}, status to {status}")
 
     def update_candidate_status(self, candidate_id: int, status: str, interview_datetime: Optional[str] = None):
-        query = "UPDATE candidates SET status = ?, updated_at = ?"
+        query = "UPDATE matches SET status = ?, updated_at = ?"
         params_list: List[Any] = [status, datetime.now().isoformat()]
 
         if interview_datetime:
@@ -177,6 +257,13 @@ class DBManager:
         self.execute_query(query, tuple(params_list))
         logger.info(f"Updated candidate ID {candidate_id} status to {status}" + (f" and interview time to {interview_datetime}" if interview_datetime else ""))
 
+    def get_match_scores(self, candidate_ids: Sequence[int]) -> Dict[int, Optional[float]]:
+        """Current match_score per candidate id (ids without a row are left out)."""
+        if not candidate_ids:
+            return {}
+        query = f"SELECT id, match_score FROM candidates WHERE id IN ({','.join('?' * len(candidate_ids))})"
+        return dict(self.fetch_all(query, tuple(candidate_ids)))
+
     def get_candidates_by_status_for_jd(self, job_description_id: int, status: str) -> List[tuple]:
         query = """
         SELECT id, candidate_name, email, match_score, resume_file_path
@@ -185,28 +272,424 @@ class DBManager:
         """
         return self.fetch_all(query, (job_description_id, status))
 
-    def get_all_candidates_for_jd(self, job_description_id: int) -> List[tuple]:
+    def get_all_candidates_for_jd(self, job_description_id: int) -> List[CandidateRecord]:
+        # Records expose id, candidate_name, email, match_score, status, resume_file_path, extracted_resume_json,
+        # skill_coverage_score (same positions as before); use record.resume_data for the decoded JSON
+        columns = ("id", "candidate_name", "email", "match_score", "status", "resume_file_path",
+                   "extracted_resume_json", "skill_coverage_score")
+        return list(self.iter_candidates_for_jd(job_description_id, columns=columns))
+
+    def iter_candidates_for_jd(self, job_description_id: int, columns: Sequence[str] = CANDIDATE_SUMMARY_COLUMNS,
+                               status: Optional[str] = None, limit: Optional[int] = None,
+                               page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[CandidateRecord]:
+        """
+        Streams candidates for a JD (best match first) as CandidateRecords holding only `columns`.
+        Rows are fetched `page_size` at a time on a dedicated cursor, and JSON is only decoded if a
+        caller reads record.resume_data. Do not write to matches/resumes while iterating.
+        """
+        columns = tuple(columns)
+        unknown = [column for column in columns if column not in CANDIDATE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown candidate columns: {unknown}")
+        if not self.conn:
+            logger.error("Database not connected. Cannot iterate candidates.")
+            return
+
+        query = f"SELECT {', '.join(columns)} FROM candidates WHERE job_description_id = ?"
+        params: List[Any] = [job_description_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY match_score DESC, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        index = CandidateRecord.index_for(columns)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, tuple(params))
+            while True:
+                page = cursor.fetchmany(page_size)
+                if not page:
+                    break
+                for row in page:
+                    yield CandidateRecord(index, row)
+        except sqlite3.Error as e:
+            logger.error(f"Error iterating candidates for JD ID {job_description_id}: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    def count_candidates_for_jd(self, job_description_id: int, status: Optional[str] = None) -> int:
+        query = "SELECT COUNT(*) FROM candidates WHERE job_description_id = ?"
+        params: List[Any] = [job_description_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        row = self.fetch_one(query, tuple(params))
+        return row[0] if row else 0
+
+    def update_candidates_status(self, candidate_ids: List[int], status: str):
+        """Sets the same status on many candidates in one transaction."""
+        if not candidate_ids:
+            return
+        now = datetime.now().isoformat()
+
+        def _update(cursor: sqlite3.Cursor):
+            cursor.executemany("UPDATE matches SET status = ?, updated_at = ? WHERE id = ?",
+                               [(status, now, candidate_id) for candidate_id in candidate_ids])
+
+        self.run_in_transaction(_update)
+        logger.info(f"Updated {len(candidate_ids)} candidates to status {status}")
+
+    @staticmethod
+    def _checked_components(components: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        components = components or {}
+        unknown = [column for column in components if column not in SCORE_COMPONENT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown score component columns: {unknown}")
+        return components
+
+    def update_candidate_scores(self, candidate_ids: List[int], match_scores: List[float],
+                                components: Optional[Dict[str, List[Optional[float]]]] = None):
+        """
+        Writes recomputed scores (and their component columns) for many candidates in one transaction.
+        Candidates that were 'summarized', 'matched' or 'shortlisted' become 'matched' so shortlisting can be
+        re-run; later statuses are kept.
+        """
+        if not candidate_ids:
+            return
+        now = datetime.now().isoformat()
+        components = self._checked_components(components)
+        assignments = "".join(f", {column} = ?" for column in components)
+        rows = list(zip(match_scores, [now] * len(candidate_ids), *components.values(), candidate_ids))
+
+        def _update(cursor: sqlite3.Cursor):
+            cursor.executemany(f"""
+                UPDATE matches SET match_score = ?, updated_at = ?{assignments},
+                    status = CASE WHEN status IN ('summarized', 'matched', 'shortlisted') THEN 'matched' ELSE status END
+                WHERE id = ?
+            """, rows)
+
+        self.run_in_transaction(_update)
+        logger.info(f"Updated scores of {len(candidate_ids)} candidates")
+
+    # --- Interview Booking Methods ---
+    def get_interview_bookings(self, ending_after: str) -> List[tuple]:
+        """(match_id, resume_id, interviewer, slot_start, slot_end) of bookings that end after `ending_after`."""
         query = """
-        SELECT id, candidate_name, email, match_score, status, resume_file_path, extracted_resume_json
-        FROM candidates
-        WHERE job_description_id = ?
-        ORDER BY match_score DESC
+        SELECT b.match_id, m.resume_id, b.interviewer, b.slot_start, b.slot_end
+        FROM interview_bookings b
+        JOIN matches m ON m.id = b.match_id
+        WHERE b.slot_end > ?
+        ORDER BY b.match_id, b.interviewer
         """
-        rows = self.fetch_all(query, (job_description_id,))
-        processed_rows = []
-        for row in rows:
-            try:
-                # extracted_resume_json is at index 6
-                parsed_resume_json = json.loads(row[6]) if row[6] else None
-                processed_rows.append((*row[:6], parsed_resume_json, *row[7:])) # row[7:] would be empty here based on SELECT
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse extracted_resume_json for candidate ID {row[0]} in get_all_candidates_for_jd: {e}")
-                processed_rows.append((*row[:6], row[6], *row[7:])) # Return with raw JSON
-        return processed_rows
+        return self.fetch_all(query, (ending_after,))
+
+    def add_interview_bookings(self, bookings: List[Tuple[int, Sequence[str], str, str]]) -> List[int]:
+        """
+        Stores (match_id, interviewers, slot_start, slot_end) bookings and copies slot_start to
+        matches.interview_datetime, in one transaction. A booking that overlaps one of an interviewer's
+        existing bookings (e.g. made by another process first) is skipped as a whole; returns the match
+        ids of those conflicting bookings.
+        """
+        if not bookings:
+            return []
+        now = datetime.now().isoformat()
 
+        def _book(cursor: sqlite3.Cursor) -> List[int]:
+            conflicts = []
+            for match_id, interviewers, slot_start, slot_end in bookings:
+                # Slots are cut from each availability window's start, so overlaps need not share a slot_start
+                if any(cursor.execute("SELECT 1 FROM interview_bookings WHERE interviewer = ? AND slot_start < ? AND slot_end > ? LIMIT 1",
+                                      (interviewer, slot_end, slot_start)).fetchone() for interviewer in interviewers):
+                    conflicts.append(match_id)
+                    continue
+                cursor.execute("SAVEPOINT booking")
+                try:
+                    cursor.executemany(
+                        "INSERT INTO interview_bookings (match_id, interviewer, slot_start, slot_end) VALUES (?, ?, ?, ?)",
+                        [(match_id, interviewer, slot_start, slot_end) for interviewer in interviewers]
+                    )
+                    cursor.execute("UPDATE matches SET interview_datetime = ?, updated_at = ? WHERE id = ?",
+                                   (slot_start, now, match_id))
+                except sqlite3.IntegrityError:
+                    cursor.execute("ROLLBACK TO SAVEPOINT booking")
+                    conflicts.append(match_id)
+                cursor.execute("RELEASE SAVEPOINT booking")
+            return conflicts
+
+        conflicts = self.run_in_transaction(_book)
+        logger.info(f"Stored {len(bookings) - len(conflicts)} interview bookings ({len(conflicts)} slot conflicts)")
+        return conflicts
+
+    def get_match_features(self, job_description_id: int, required_skills: Sequence[str],
+                           candidate_ids: Optional[Sequence[int]] = None) -> Dict[int, Tuple[int, Optional[float], Optional[int]]]:
+        """
+        (required skills held, experience years, highest education level) per candidate of a JD, read from the
+        resume search index in one query; `required_skills` must be normalized. Unknown values are None.
+        """
+        skill_filter = ",".join("?" * len(required_skills))
+        query = f"""
+        SELECT m.id,
+               {f"(SELECT COUNT(*) FROM resume_skills s WHERE s.resume_id = m.resume_id AND s.skill IN ({skill_filter}))" if required_skills else "0"},
+               e.years,
+               (SELECT MAX(d.level) FROM resume_education d WHERE d.resume_id = m.resume_id)
+        FROM matches m
+        LEFT JOIN resume_experience e ON e.resume_id = m.resume_id
+        WHERE m.job_description_id = ?
+        """
+        params: List[Any] = [*required_skills, job_description_id]
+        if candidate_ids is not None:
+            query += f" AND m.id IN ({','.join('?' * len(candidate_ids))})"
+            params.extend(candidate_ids)
+        return {row[0]: tuple(row[1:]) for row in self.fetch_all(query, tuple(params))}
+
+    # --- Resume Search Methods ---
+    @property
+    def fts_enabled(self) -> bool:
+        if self._fts_enabled is None:
+            self._fts_enabled = self.fetch_one("SELECT 1 FROM sqlite_master WHERE name = 'resume_fts'") is not None
+        return self._fts_enabled
+
+    def search_resumes(self, all_skills: Optional[List[str]] = None, any_skills: Optional[List[str]] = None,
+                       exclude_skills: Optional[List[str]] = None, text_query: Optional[str] = None,
+                       min_experience_years: Optional[float] = None, job_description_id: Optional[int] = None,
+                       limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Searches the resume pool using the indexed skill, experience and FTS5 tables (no JSON decoding).
+          all_skills / any_skills / exclude_skills: skill names, normalized like extracted skills ("k8s" -> "kubernetes")
+          text_query: FTS5 query over name, skills, experience, education and projects, e.g. 'kafka OR "event sourcing"'
+          job_description_id: only resumes matched against this JD (their match score is returned too)
+        Results are ranked by number of any_skills hits, then full-text relevance, then match score.
+        """
+        all_skills, any_skills, exclude_skills = (normalize_skills(skills or []) for skills in (all_skills, any_skills, exclude_skills))
+        select = ["r.id AS resume_id", "r.candidate_name", "r.email", "r.resume_file_path", "e.years AS experience_years"]
+        joins = ["LEFT JOIN resume_experience e ON e.resume_id = r.id"]
+        conditions: List[str] = []
+        order_by: List[str] = []
+        join_params: List[Any] = []
+        params: List[Any] = []
+
+        if any_skills:
+            select.append("hits.skill_hits")
+            joins.append(f"""
+            JOIN (SELECT resume_id, COUNT(*) AS skill_hits FROM resume_skills
+                  WHERE skill IN ({', '.join('?' * len(any_skills))}) GROUP BY resume_id) hits ON hits.resume_id = r.id""")
+            join_params.extend(any_skills)
+            order_by.append("hits.skill_hits DESC")
+        if text_query:
+            if not self.fts_enabled:
+                raise ValueError("Full-text search needs SQLite FTS5, which this build does not provide")
+            select.append("bm25(resume_fts) AS text_rank")
+            joins.append("JOIN resume_fts ON resume_fts.rowid = r.id")
+            conditions.append("resume_fts MATCH ?")
+            params.append(text_query)
+            order_by.append("text_rank")
+        if job_description_id is not None:
+            select.append("m.id AS candidate_id")
+            select.append("m.match_score")
+            joins.append("JOIN matches m ON m.resume_id = r.id AND m.job_description_id = ?")
+            join_params.append(job_description_id)
+            order_by.append("m.match_score DESC")
+        if all_skills:
+            conditions.append(f"""r.id IN (SELECT resume_id FROM resume_skills WHERE skill IN ({', '.join('?' * len(all_skills))})
+                                  GROUP BY resume_id HAVING COUNT(*) = ?)""")
+            params.extend(all_skills)
+            params.append(len(all_skills))
+        if exclude_skills:
+            conditions.append(f"r.id NOT IN (SELECT resume_id FROM resume_skills WHERE skill IN ({', '.join('?' * len(exclude_skills))}))")
+            params.extend(exclude_skills)
+        if min_experience_years is not None:
+            conditions.append("e.years >= ?")
+            params.append(min_experience_years)
+
+        query = f"SELECT {', '.join(select)} FROM resumes r {' '.join(joins)}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(order_by + ["r.id"]) + " LIMIT ?"
+        params.append(limit)
+
+        cursor = self.conn.cursor() if self.conn else None
+        if cursor is None:
+            logger.error("Database not connected. Cannot search resumes.")
+            return []
+        try:
+            cursor.execute(query, tuple(join_params + params))
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error searching resumes: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    # --- Skill Vocabulary Methods ---
+    def get_skill_embeddings(self, model: str) -> List[tuple]:
+        # Returns (skill, embedding_blob) pairs; blobs are float32 vectors
+        return self.fetch_all("SELECT skill, embedding FROM skill_vocabulary WHERE model = ?", (model,))
+
+    def add_skill_embeddings(self, model: str, rows: List[tuple]):
+        # rows: (skill, embedding_blob, dimensions)
+        if not self.conn:
+            logger.error("Database not connected. Cannot add skill embeddings.")
+            return
+        query = """
+        INSERT OR IGNORE INTO skill_vocabulary (skill, model, embedding, dimensions, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """
+        now = datetime.now().isoformat()
+        try:
+            self.run_in_transaction(lambda cursor: cursor.executemany(query, [(skill, model, blob, dims, now) for skill, blob, dims in rows]))
+        except sqlite3.Error as e:
+            logger.error(f"Error adding {len(rows)} skill embeddings for model {model}: {e}")
+            raise
+
+    # --- Work Queue Methods ---
+    def enqueue_work_items(self, job_descriptions: List[Dict[str, Any]]) -> int:
+        # job_descriptions: dicts with source_file, title, raw_text (as returned by utils.jd_loader)
+        query = """
+        INSERT OR IGNORE INTO work_queue (source_file, job_title, raw_text, status, created_at, updated_at)
+        VALUES (?, ?, ?, 'pending', ?, ?)
+        """
+        now = datetime.now().isoformat()
+        params = [(jd["source_file"], jd.get("title"), jd["raw_text"], now, now) for jd in job_descriptions]
+
+        def _enqueue(cursor: sqlite3.Cursor) -> int:
+            cursor.executemany(query, params)
+            return cursor.rowcount
+
+        added = self.run_in_transaction(_enqueue) or 0
+        logger.info(f"Enqueued {added} new JD work items ({len(job_descriptions) - added} already queued)")
+        return added
+
+    def claim_work_item(self, worker_id: str, lease_seconds: int, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """Atomically leases the oldest pending (or lease-expired) work item to worker_id."""
+        def _claim(cursor: sqlite3.Cursor) -> Optional[Dict[str, Any]]:
+            now = time.time()
+            # Items whose last lease expired after max_attempts tries are given up on
+            cursor.execute("""
+            UPDATE work_queue SET status = 'failed', last_error = COALESCE(last_error, 'Lease expired too many times'), updated_at = ?
+            WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?
+            """, (datetime.now().isoformat(), now, max_attempts))
+            cursor.execute("""
+            SELECT id, source_file, job_title, raw_text, attempts FROM work_queue
+            WHERE status = 'pending' OR (status = 'leased' AND lease_expires_at < ?)
+            ORDER BY id LIMIT 1
+            """, (now,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute("""
+            UPDATE work_queue SET status = 'leased', lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?,
+                                  attempts = attempts + 1, updated_at = ?
+            WHERE id = ?
+            """, (worker_id, now + lease_seconds, now, datetime.now().isoformat(), row[0]))
+            return {"id": row[0], "source_file": row[1], "title": row[2], "raw_text": row[3], "attempts": row[4] + 1}
+
+        item = self.run_in_transaction(_claim)
+        if item:
+            logger.info(f"Worker {worker_id} leased work item {item['id']} ({item['source_file']}), attempt {item['attempts']}")
+        return item
+
+    def renew_work_item_lease(self, item_id: int, worker_id: str, lease_seconds: int) -> bool:
+        """Heartbeat: extends the lease. Returns False if the lease was lost to another worker."""
+        now = time.time()
+        cursor = self.execute_query("""
+        UPDATE work_queue SET lease_expires_at = ?, heartbeat_at = ?
+        WHERE id = ? AND lease_owner = ? AND status = 'leased'
+        """, (now + lease_seconds, now, item_id, worker_id))
+        return bool(cursor and cursor.rowcount)
+
+    def complete_work_item(self, item_id: int, worker_id: str, job_description_id: Optional[int]):
+        self.execute_query("""
+        UPDATE work_queue SET status = 'done', job_description_id = ?, lease_expires_at = NULL, updated_at = ?
+        WHERE id = ? AND lease_owner = ?
+        """, (job_description_id, datetime.now().isoformat(), item_id, worker_id))
+        logger.info(f"Worker {worker_id} completed work item {item_id} (JD ID: {job_description_id})")
+
+    def fail_work_item(self, item_id: int, worker_id: str, error: str, max_attempts: int):
+        # Back to 'pending' for another try unless the attempts are used up
+        self.execute_query("""
+        UPDATE work_queue SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                              last_error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+        WHERE id = ? AND lease_owner = ?
+        """, (max_attempts, error[:1000], datetime.now().isoformat(), item_id, worker_id))
+        logger.warning(f"Worker {worker_id} failed work item {item_id}: {error}")
+
+    def get_work_queue_counts(self) -> Dict[str, int]:
+        return dict(self.fetch_all("SELECT status, COUNT(*) FROM work_queue GROUP BY status"))
+
+    # --- Resume Signature Methods ---
+    def get_resume_signature(self, content_hash: str) -> Optional[tuple]:
+        # (content_hash, resume_file_path, signature, duplicate_of, similarity)
+        return self.fetch_one("""
+        SELECT content_hash, resume_file_path, signature, duplicate_of, similarity
+        FROM resume_signatures WHERE content_hash = ?
+        """, (content_hash,))
+
+    def get_lsh_candidates(self, buckets: List[int]) -> List[tuple]:
+        """Resumes sharing at least one LSH band bucket: (content_hash, resume_file_path, signature, duplicate_of, email, phone)."""
+        values = ", ".join("(?, ?)" for _ in buckets)
+        params = tuple(value for band, bucket in enumerate(buckets) for value in (band, bucket))
+        return self.fetch_all(f"""
+        SELECT s.content_hash, s.resume_file_path, s.signature, s.duplicate_of, s.email, s.phone
+        FROM resume_signatures s
+        WHERE s.content_hash IN (
+            SELECT b.content_hash FROM resume_lsh_buckets b WHERE (b.band, b.bucket) IN (VALUES {values})
+        )
+        """, params)
+
+    def add_resume_signature(self, content_hash: str, resume_file_path: str, signature: bytes, buckets: List[int],
+                             duplicate_of: Optional[str] = None, similarity: Optional[float] = None,
+                             email: Optional[str] = None, phone: Optional[str] = None):
+        def _add(cursor: sqlite3.Cursor):
+            cursor.execute("""
+            INSERT OR REPLACE INTO resume_signatures (content_hash, resume_file_path, signature, duplicate_of, similarity,
+                                                      email, phone, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (content_hash, resume_file_path, signature, duplicate_of, similarity, email, phone, datetime.now().isoformat()))
+            cursor.executemany("INSERT OR IGNORE INTO resume_lsh_buckets (band, bucket, content_hash) VALUES (?, ?, ?)",
+                               [(band, bucket, content_hash) for band, bucket in enumerate(buckets)])
+
+        self.run_in_transaction(_add)
+
+    def update_resume_signature_path(self, content_hash: str, resume_file_path: str):
+        self.execute_query("UPDATE resume_signatures SET resume_file_path = ? WHERE content_hash = ?",
+                           (resume_file_path, content_hash))
+
+    # --- Checkpoint Methods ---
+    def get_checkpoint(self, stage: str, jd_key: str = "", resume_key: str = "") -> Optional[Any]:
+        row = self.fetch_one(
+            "SELECT result_json FROM pipeline_checkpoints WHERE stage = ? AND jd_key = ? AND resume_key = ?",
+            (stage, jd_key, resume_key)
+        )
+        if not row:
+            return None
+        try:
+            return json.loads(row[0]) if row[0] else {}
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse checkpoint {stage} ({jd_key}, {resume_key}): {e}")
+            return None
+
+    def save_checkpoint(self, stage: str, result: Any, jd_key: str = "", resume_key: str = ""):
+        query = """
+        INSERT OR REPLACE INTO pipeline_checkpoints (stage, jd_key, resume_key, result_json, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        """
+        self.execute_query(query, (stage, jd_key, resume_key, json.dumps(result), datetime.now().isoformat()))
+
+    def delete_checkpoint(self, stage: str, jd_key: str = "", resume_key: str = ""):
+        self.execute_query(
+            "DELETE FROM pipeline_checkpoints WHERE stage = ? AND jd_key = ? AND resume_key = ?",
+            (stage, jd_key, resume_key)
+        )
 
     # --- Log Methods ---
     def add_log(self, agent_name: str, level: str, message: str):
+        if self.read_only:
+            return  # read-only connections (plan mode) record no log rows
         query = "INSERT INTO logs (timestamp, agent_name, level, message) VALUES (?, ?, ?, ?)"
         params = (datetime.now().isoformat(), agent_name, level, message)
         self.execute_query(query, params)
\ No newline at end of file
@@ -0,0 +1,241 @@
+import time
+import queue
+import sqlite3
+import asyncio
+import logging
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Optional, List, Any, Callable, Dict, NamedTuple
+
+from utils.db_manager import DBManager
+from utils.latency import LatencyTracker
+from config import DB_PATH, DB_BUSY_TIMEOUT_MS, DB_JOURNAL_MODE, DB_POOL_MAX_BATCH, DB_POOL_BATCH_WAIT_MS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteResult(NamedTuple):
+    # Stands in for the cursor DBManager.execute_query used to return (callers read lastrowid/rowcount)
+    lastrowid: Optional[int]
+    rowcount: int
+
+
+class _WriteOp(NamedTuple):
+    fn: Callable[[sqlite3.Cursor], Any]
+    future: Future
+    submitted_at: float
+
+
+class ThreadSafeDBManager(DBManager):
+    """
+    DBManager that can be shared by many threads. Reads run in parallel, each thread on its own
+    connection (WAL lets them proceed while a write is in progress). All writes (execute_query,
+    run_in_transaction and everything built on them) go through one writer thread. It groups queued
+    writes into a single BEGIN IMMEDIATE transaction, with a SAVEPOINT per write so a failing write
+    only affects its own caller. Callers block until their write is committed, so read-your-writes holds.
+    From asyncio code use `await db.run_async(db.method, *args)` so the event loop is not blocked.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, max_batch: int = DB_POOL_MAX_BATCH,
+                 batch_wait_ms: float = DB_POOL_BATCH_WAIT_MS):
+        # The base class connection/cursor attributes are replaced by per-thread properties below
+        self.db_path = db_path
+        self.read_only = False
+        self._fts_enabled: Optional[bool] = None
+        self.max_batch = max_batch
+        self.batch_wait_seconds = batch_wait_ms / 1000
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+
+        self._metrics_lock = threading.Lock()
+        self.write_latency = LatencyTracker()  # submit -> commit, as seen by the caller
+        self.lock_wait = LatencyTracker()  # time to acquire the SQLite write lock per batch
+        self._counters = {"writes": 0, "failed_writes": 0, "batches": 0, "failed_batches": 0,
+                          "max_batch_size": 0, "max_queue_depth": 0}
+
+        self._writer_cursor: Optional[sqlite3.Cursor] = None
+        writer_ready = threading.Event()
+        self._writer_error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._writer_loop, args=(writer_ready,), name="db-writer", daemon=True)
+        self._writer.start()
+        writer_ready.wait()
+        if self._writer_error:
+            raise self._writer_error
+        logger.info(f"Thread-safe DB manager ready for {self.db_path} (max batch {max_batch}, batch wait {batch_wait_ms}ms)")
+
+    # --- Per-thread read connections ---
+    def _open_connection(self) -> sqlite3.Connection:
+        # check_same_thread=False only so close() can close every reader; each is used by its owner thread alone
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        return conn
+
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        if self._closed:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            self._local.cursor = conn.cursor()
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    @property
+    def cursor(self) -> Optional[sqlite3.Cursor]:
+        return self._local.cursor if self.conn is not None else None
+
+    def close(self):
+        if self._closed:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._closed = True
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        logger.info(f"Thread-safe DB manager closed: {self.db_path}. {self.format_metrics()}")
+
+    # --- Writes ---
+    def _submit(self, fn: Callable[[sqlite3.Cursor], Any]) -> Any:
+        if threading.current_thread() is self._writer:
+            # A write issued from inside another write (e.g. a transaction callback) joins its transaction
+            return fn(self._writer_cursor)
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot write through a closed ThreadSafeDBManager")
+        future: Future = Future()
+        self._queue.put(_WriteOp(fn, future, time.monotonic()))
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self._counters["max_queue_depth"] = max(self._counters["max_queue_depth"], depth)
+        return future.result()
+
+    def execute_query(self, query: str, params: Optional[tuple] = None) -> Optional[WriteResult]:
+        def _execute(cursor: sqlite3.Cursor) -> WriteResult:
+            cursor.execute(query, params or ())
+            return WriteResult(cursor.lastrowid, cursor.rowcount)
+
+        try:
+            return self._submit(_execute)
+        except sqlite3.Error as e:
+            logger.error(f"Error executing query: {query} with params {params}. Error: {e}")
+            raise
+
+    def run_in_transaction(self, fn: Callable[[sqlite3.Cursor], Any]) -> Any:
+        try:
+            return self._submit(fn)
+        except sqlite3.Error as e:
+            logger.error(f"Transaction failed and was rolled back: {e}")
+            raise
+
+    async def run_async(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs a (blocking) DB call on the default executor so async tasks can use this manager."""
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+    def _writer_loop(self, ready: threading.Event):
+        try:
+            # Autocommit mode: transactions are opened and closed explicitly per batch
+            conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+            conn.execute(f"PRAGMA journal_mode={DB_JOURNAL_MODE}")
+            self._writer_cursor = conn.cursor()
+        except sqlite3.Error as e:
+            logger.error(f"Error opening writer connection to {self.db_path}: {e}")
+            self._writer_error = e
+            ready.set()
+            return
+        ready.set()
+
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                # Give concurrent writers a moment to join this transaction
+                deadline = time.monotonic() + self.batch_wait_seconds
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._run_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _run_batch(self, conn: sqlite3.Connection, batch: List[_WriteOp]):
+        cursor = self._writer_cursor
+        outcomes = []
+        try:
+            lock_started = time.monotonic()
+            cursor.execute("BEGIN IMMEDIATE")
+            self.lock_wait.record(time.monotonic() - lock_started)
+            for op in batch:
+                cursor.execute("SAVEPOINT write_op")
+                try:
+                    outcomes.append((op, op.fn(cursor), None))
+                    cursor.execute("RELEASE write_op")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write_op")
+                    cursor.execute("RELEASE write_op")
+                    outcomes.append((op, None, e))
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            # BEGIN/COMMIT failed (e.g. another process held the lock past busy_timeout): nothing was written
+            if conn.in_transaction:
+                conn.rollback()
+            logger.error(f"Write batch of {len(batch)} failed and was rolled back: {e}")
+            with self._metrics_lock:
+                self._counters["failed_batches"] += 1
+                self._counters["failed_writes"] += len(batch)
+            for op in batch:
+                op.future.set_exception(e)
+            return
+
+        finished = time.monotonic()
+        with self._metrics_lock:
+            self._counters["batches"] += 1
+            self._counters["writes"] += len(batch)
+            self._counters["failed_writes"] += sum(1 for _, _, error in outcomes if error)
+            self._counters["max_batch_size"] = max(self._counters["max_batch_size"], len(batch))
+        for op, result, error in outcomes:
+            self.write_latency.record(finished - op.submitted_at)
+            if error:
+                op.future.set_exception(error)
+            else:
+                op.future.set_result(result)
+
+    # --- Metrics ---
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            counters = dict(self._counters)
+        with self._readers_lock:
+            reader_connections = len(self._readers)
+        counters["avg_batch_size"] = counters["writes"] / counters["batches"] if counters["batches"] else None
+        counters["queue_depth"] = self._queue.qsize()
+        counters["reader_connections"] = reader_connections
+        counters["write_latency_seconds"] = self.write_latency.summary()
+        counters["lock_wait_seconds"] = self.lock_wait.summary()
+        return counters
+
+    def format_metrics(self) -> str:
+        metrics = self.metrics()
+        avg_batch = f"{metrics['avg_batch_size']:.1f}" if metrics["avg_batch_size"] else "n/a"
+        return (f"writes={metrics['writes']} batches={metrics['batches']} avg_batch={avg_batch} "
+                f"max_queue_depth={metrics['max_queue_depth']} failed_writes={metrics['failed_writes']} "
+                f"readers={metrics['reader_connections']} write latency {self.write_latency.format_summary()}, "
+                f"lock wait {self.lock_wait.format_summary()}")
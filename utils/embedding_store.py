@@ -0,0 +1,224 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Sequence, Tuple
+
+try:
+    import fcntl  # POSIX only; used so several worker processes can append safely
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+INT8_MAX = 127.0
+DEFAULT_BLOCK_ROWS = 65536
+
+
+def embedding_key(text: str) -> str:
+    """Content-addressed id for an embedding input string."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingMatrixStore:
+    """
+    Append-only matrix of L2-normalized embeddings kept in contiguous files:
+      meta.json    - dtype, dimensions, committed row count and ids.txt length
+      vectors.bin  - row-major matrix (float32, float16 or int8)
+      scales.bin   - float32 per-row scale (int8 only)
+      ids.txt      - one id per line, line N is row N
+    Readers memory-map vectors.bin, so scoring a query against the whole pool streams it from
+    the page cache block by block instead of loading it into RAM.
+    """
+
+    def __init__(self, directory: str, dimensions: Optional[int] = None, dtype: Optional[str] = None):
+        if dtype is not None and dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported embedding store dtype '{dtype}'. Use one of {SUPPORTED_DTYPES}.")
+        self.directory = directory
+        self._requested_dtype = dtype
+        self.dtype = dtype or "float16"
+        self.dimensions = dimensions
+        self.count = 0
+        self._ids_bytes = 0
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._memmap: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        os.makedirs(directory, exist_ok=True)
+        self._load_meta()
+
+    # --- File layout ---
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_meta(self):
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if self._requested_dtype and meta["dtype"] != self._requested_dtype:
+            logger.warning(f"Embedding store {self.directory} uses dtype {meta['dtype']}; ignoring requested {self._requested_dtype}")
+        self.dtype = meta["dtype"]
+        self.dimensions = meta["dimensions"]
+        self.count = meta["count"]
+        self._ids_bytes = meta["ids_bytes"]
+        with open(self._path("ids.txt"), "rb") as f:
+            # Bytes past `ids_bytes` belong to an append that never committed its meta.json
+            self._ids = f.read(self._ids_bytes).decode("utf-8").splitlines()
+        self._positions = {row_id: position for position, row_id in enumerate(self._ids)}
+        self._memmap = None
+        self._scales = None
+
+    def _write_meta(self):
+        temp_path = self._path("meta.json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "dimensions": self.dimensions, "count": self.count,
+                       "ids_bytes": self._ids_bytes}, f)
+        os.replace(temp_path, self._path("meta.json"))
+
+    @staticmethod
+    def _write_at(path: str, offset: int, data: bytes) -> int:
+        # Overwrites anything an interrupted append left past the committed offset
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()
+        return offset + len(data)
+
+    @contextmanager
+    def _append_lock(self):
+        with self._lock, open(self._path(".lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- Quantization ---
+    def _quantize(self, matrix: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == "int8":
+            scales = np.abs(matrix).max(axis=1) / INT8_MAX
+            scales[scales == 0] = 1.0
+            quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+            return quantized, scales.astype(np.float32)
+        return matrix.astype(self.dtype), None
+
+    # --- Public API ---
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, row_id: str) -> bool:
+        return row_id in self._positions
+
+    def refresh(self):
+        """Picks up rows appended by other processes since this store was opened."""
+        with self._lock:
+            self._load_meta()
+
+    def append(self, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> int:
+        """Appends new rows (ids already stored are skipped). Returns the number of rows written."""
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+        with self._append_lock():
+            self._load_meta()  # Another process may have appended since we last looked
+            new_ids: List[str] = []
+            new_rows: List[Sequence[float]] = []
+            pending = set()
+            for row_id, vector in zip(ids, vectors):
+                if row_id in self._positions or row_id in pending or "\n" in row_id:
+                    continue
+                pending.add(row_id)
+                new_ids.append(row_id)
+                new_rows.append(vector)
+            if not new_ids:
+                return 0
+
+            matrix = np.asarray(new_rows, dtype=np.float32)
+            if self.dimensions is None:
+                self.dimensions = matrix.shape[1]
+            if matrix.ndim != 2 or matrix.shape[1] != self.dimensions:
+                raise ValueError(f"Expected vectors of dimension {self.dimensions}, got shape {matrix.shape}")
+            norms = np.linalg.norm(matrix, axis=1)
+            norms[norms == 0] = 1.0
+            quantized, scales = self._quantize(matrix / norms[:, None])
+
+            # Data first, meta.json last: a crash mid-append leaves the committed rows intact
+            self._write_at(self._path("vectors.bin"), self.count * self.dimensions * quantized.itemsize, quantized.tobytes())
+            if scales is not None:
+                self._write_at(self._path("scales.bin"), self.count * scales.itemsize, scales.tobytes())
+            self._ids_bytes = self._write_at(self._path("ids.txt"), self._ids_bytes,
+                                             "".join(f"{row_id}\n" for row_id in new_ids).encode("utf-8"))
+
+            for row_id in new_ids:
+                self._positions[row_id] = len(self._ids)
+                self._ids.append(row_id)
+            self.count += len(new_ids)
+            self._write_meta()
+            self._memmap = None
+            self._scales = None
+        logger.debug(f"Appended {len(new_ids)} embeddings to {self.directory} (rows: {self.count})")
+        return len(new_ids)
+
+    def matrix(self) -> np.ndarray:
+        """Zero-copy, read-only view of the stored (quantized) matrix."""
+        if self.count == 0:
+            return np.zeros((0, self.dimensions or 0), dtype=self.dtype)
+        if self._memmap is None:
+            self._memmap = np.memmap(self._path("vectors.bin"), dtype=self.dtype, mode="r",
+                                     shape=(self.count, self.dimensions))
+        return self._memmap
+
+    def scales(self) -> Optional[np.ndarray]:
+        if self.dtype != "int8" or self.count == 0:
+            return None
+        if self._scales is None:
+            self._scales = np.memmap(self._path("scales.bin"), dtype=np.float32, mode="r", shape=(self.count,))
+        return self._scales
+
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    def get(self, row_id: str) -> Optional[np.ndarray]:
+        """Dequantized float32 vector for `row_id` (unit length), or None."""
+        position = self._positions.get(row_id)
+        if position is None:
+            return None
+        vector = np.asarray(self.matrix()[position], dtype=np.float32)
+        scales = self.scales()
+        return vector * scales[position] if scales is not None else vector
+
+    def position(self, row_id: str) -> Optional[int]:
+        return self._positions.get(row_id)
+
+    def scores(self, query: Sequence[float], rows: Optional[Sequence[int]] = None,
+               block_rows: int = DEFAULT_BLOCK_ROWS) -> np.ndarray:
+        """
+        Cosine similarity of `query` against every stored row (or only the row positions in `rows`, in that
+        order), computed block by block over the memory map.
+        """
+        positions = np.arange(self.count) if rows is None else np.asarray(rows, dtype=np.int64)
+        query_vector = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if positions.size == 0 or norm == 0:
+            return np.zeros(positions.size, dtype=np.float32)
+        query_vector /= norm
+        matrix = self.matrix()
+        scales = self.scales()
+        result = np.empty(positions.size, dtype=np.float32)
+        for start in range(0, positions.size, block_rows):
+            block_positions = positions[start:start + block_rows]
+            # A contiguous slice of the memory map when scoring the whole pool, a gather otherwise
+            block = matrix[start:start + block_rows] if rows is None else matrix[block_positions]
+            block_scores = block.astype(np.float32) @ query_vector
+            if scales is not None:
+                block_scores *= scales[block_positions]
+            result[start:start + block_rows] = block_scores
+        return result
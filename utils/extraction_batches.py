@@ -0,0 +1,72 @@
+import json
+import logging
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+from utils.text_compactor import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+BATCH_RESULTS_KEY = "resumes"
+
+
+class BatchItem(NamedTuple):
+    key: str  # caller's key, e.g. the resume file path
+    resume_id: str  # short id the LLM echoes back ("r1", "r2", ...)
+    text: str  # compacted resume text placed in the prompt
+    fields: List[str]  # fields the LLM is asked for
+
+
+def pack_batches(items: Sequence[BatchItem], token_budget: int, max_items: int) -> List[List[BatchItem]]:
+    """
+    Greedily groups items in order so each batch's resume text stays within token_budget and max_items.
+    An item larger than the budget on its own gets a batch to itself.
+    """
+    batches: List[List[BatchItem]] = []
+    current: List[BatchItem] = []
+    current_tokens = 0
+    for item in items:
+        tokens = estimate_tokens(item.text)
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(response: Any, expected_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-resume results from a batched extraction response, keyed by resume id. Accepts the requested
+    {"resumes": [{"resume_id": ...}, ...]} shape as well as a bare list or an object keyed by resume id;
+    entries that are not objects or carry an unknown id are dropped (the caller retries what is missing).
+    """
+    if isinstance(response, str):
+        try:
+            response = json.loads(response)
+        except json.JSONDecodeError:
+            return {}
+    entries: Any = response
+    if isinstance(response, dict):
+        if isinstance(response.get(BATCH_RESULTS_KEY), (list, dict)):
+            entries = response[BATCH_RESULTS_KEY]
+        elif not any(resume_id in response for resume_id in expected_ids):
+            # Some models rename the wrapper key; take the only list in the object
+            lists = [value for value in response.values() if isinstance(value, list)]
+            entries = lists[0] if len(lists) == 1 else []
+
+    results: Dict[str, Dict[str, Any]] = {}
+    expected = set(expected_ids)
+    if isinstance(entries, dict):
+        for resume_id, entry in entries.items():
+            if resume_id in expected and isinstance(entry, dict):
+                results[resume_id] = entry
+    elif isinstance(entries, list):
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            resume_id = str(entry.get("resume_id", ""))
+            if resume_id in expected and resume_id not in results:
+                results[resume_id] = {key: value for key, value in entry.items() if key != "resume_id"}
+    return results
@@ -0,0 +1,102 @@
+"""
+Compares batched resume extraction (RESUME_EXTRACTION_BATCH_SIZE > 1) with one prompt per resume on a folder
+of CVs: wall time, Ollama completion requests, and how often the batched result agrees with the single-resume
+result (name, email, skills). The LLM response cache is bypassed so both passes do real generations.
+
+    python -m utils.extraction_benchmark --resumes-dir data/CVs --batch-sizes 2,4,8
+"""
+import os
+import time
+import argparse
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.ollama_client import OllamaClient
+from utils.db_manager import DBManager
+from utils.ollama_pool import ENDPOINT_GENERATE
+from utils.file_parser import parse_resume, extract_document_metadata
+from agents.resume_matcher_agent import ResumeMatcherAgent, is_resume_file
+from config import RESUMES_DIR, RESUME_BATCH_TOKEN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+
+def _completion_requests(client: OllamaClient) -> int:
+    return client.response_metrics()["endpoints"][ENDPOINT_GENERATE]["ollama_requests"]
+
+
+def _skill_set(data: Optional[Dict[str, Any]]) -> set:
+    return {str(skill).strip().lower() for skill in (data or {}).get("skills") or [] if str(skill).strip()}
+
+
+def compare(reference: Dict[str, Optional[Dict[str, Any]]], candidate: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, float]:
+    """Agreement of candidate extractions with the reference (single-resume) extractions."""
+    keys = [key for key, data in reference.items() if data]
+    if not keys:
+        return {"name_match": 0.0, "email_match": 0.0, "skills_jaccard": 0.0, "failed": float(len(candidate))}
+    name_match = email_match = jaccard = 0.0
+    for key in keys:
+        expected, actual = reference[key], candidate.get(key) or {}
+        name_match += str(expected.get("candidate_name", "")).strip().lower() == str(actual.get("candidate_name", "")).strip().lower()
+        email_match += str(expected.get("email", "")).lower() == str(actual.get("email", "")).lower()
+        expected_skills, actual_skills = _skill_set(expected), _skill_set(actual)
+        union = expected_skills | actual_skills
+        jaccard += len(expected_skills & actual_skills) / len(union) if union else 1.0
+    return {"name_match": name_match / len(keys), "email_match": email_match / len(keys),
+            "skills_jaccard": jaccard / len(keys), "failed": float(sum(1 for data in candidate.values() if not data))}
+
+
+def load_resumes(resumes_dir: str, limit: Optional[int]) -> List[Tuple[str, str, Optional[Dict[str, Any]]]]:
+    resumes = []
+    for filename in sorted(os.listdir(resumes_dir)):
+        if not is_resume_file(filename):
+            continue
+        path = os.path.join(resumes_dir, filename)
+        text = parse_resume(path)
+        if text:
+            resumes.append((path, text, extract_document_metadata(path)))
+        if limit and len(resumes) >= limit:
+            break
+    return resumes
+
+
+def run_benchmark(resumes_dir: str, batch_sizes: List[int], token_budget: int, limit: Optional[int]) -> List[Dict[str, Any]]:
+    client = OllamaClient()
+    client.cache = None  # measure generations, not cache hits
+    agent = ResumeMatcherAgent(client, DBManager())
+    resumes = load_resumes(resumes_dir, limit)
+    if not resumes:
+        raise SystemExit(f"No parseable resumes in {resumes_dir}")
+
+    rows = []
+    requests_before, started = _completion_requests(client), time.perf_counter()
+    reference = {path: agent._extract_structured_resume_data(text, os.path.basename(path), metadata)
+                 for path, text, metadata in resumes}
+    rows.append({"mode": "single", "seconds": time.perf_counter() - started,
+                 "requests": _completion_requests(client) - requests_before, **compare(reference, reference)})
+
+    for batch_size in batch_sizes:
+        requests_before, started = _completion_requests(client), time.perf_counter()
+        batched = agent.extract_resumes_batched(resumes, batch_size=batch_size, token_budget=token_budget)
+        rows.append({"mode": f"batch={batch_size}", "seconds": time.perf_counter() - started,
+                     "requests": _completion_requests(client) - requests_before, **compare(reference, batched)})
+
+    print(f"\n{len(resumes)} resumes from {resumes_dir} (token budget {token_budget} per batched prompt)")
+    print(f"{'mode':<10} {'seconds':>8} {'resumes/s':>9} {'requests':>8} {'name':>6} {'email':>6} {'skills':>6} {'failed':>6}")
+    for row in rows:
+        print(f"{row['mode']:<10} {row['seconds']:>8.2f} {len(resumes) / row['seconds']:>9.2f} {row['requests']:>8} "
+              f"{row['name_match']:>6.0%} {row['email_match']:>6.0%} {row['skills_jaccard']:>6.2f} {int(row['failed']):>6}")
+    client.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched against single-resume extraction")
+    parser.add_argument("--resumes-dir", default=RESUMES_DIR)
+    parser.add_argument("--batch-sizes", default="2,4,8", help="Comma-separated batch sizes to compare")
+    parser.add_argument("--token-budget", type=int, default=RESUME_BATCH_TOKEN_BUDGET, help="Resume text tokens per batched prompt")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many resumes")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    run_benchmark(args.resumes_dir, [int(size) for size in args.batch_sizes.split(",") if size.strip()],
+                  args.token_budget, args.limit)
@@ -2,10 +2,12 @@ import PyPDF2 # Keep PyPDF2, as it's generally lighter if it works for your PDFs
 from docx import Document
 import logging
 import os
-from typing import Optional # Import Optional
+from typing import Optional, Dict, Any # Import Optional
 
 logger = logging.getLogger(__name__)
 
+PAGE_BREAK = "\f"  # Appended after each PDF page, so running headers/footers can be told apart from content
+
 def extract_text_from_pdf(file_path: str) -> Optional[str]: # Changed here
     try:
         with open(file_path, 'rb') as file:
@@ -21,11 +23,11 @@ def extract_text_from_pdf(file_path: str) -> Optional[str]: # Changed here
             if hasattr(reader, 'pages'): # PyPDF2 3.0.0+
                 for page_num in range(len(reader.pages)):
                     page = reader.pages[page_num]
-                    text += page.extract_text() or "" # Ensure None is handled
+                    text += (page.extract_text() or "") + PAGE_BREAK # Ensure None is handled; keep page boundaries
             elif hasattr(reader, 'getNumPages'): # Older PyPDF2
                 for page_num in range(reader.getNumPages()):
                     page = reader.getPage(page_num)
-                    text += page.extractText() or "" # Ensure None is handled
+                    text += (page.extractText() or "") + PAGE_BREAK # Ensure None is handled; keep page boundaries
             else:
                 logger.error(f"Unsupported PyPDF2 version or invalid PDF object for {file_path}")
                 return None
@@ -61,6 +63,26 @@ def extract_text_from_docx(file_path: str) -> Optional[str]: # Changed here
         logger.error(f"Error extracting text from DOCX {file_path}: {e}", exc_info=True)
         return None
 
+def extract_document_metadata(file_path: str) -> Dict[str, Any]:
+    """Returns document properties (author, title) when the file carries them, else an empty dict."""
+    _, extension = os.path.splitext(file_path)
+    extension = extension.lower()
+    metadata: Dict[str, Any] = {}
+    try:
+        if extension == '.pdf':
+            with open(file_path, 'rb') as file:
+                reader = PyPDF2.PdfReader(file)
+                info = reader.metadata or {}
+                metadata["author"] = getattr(info, "author", None) or info.get("/Author")
+                metadata["title"] = getattr(info, "title", None) or info.get("/Title")
+        elif extension == '.docx':
+            properties = Document(file_path).core_properties
+            metadata["author"] = properties.author
+            metadata["title"] = properties.title
+    except Exception as e:
+        logger.debug(f"Could not read document metadata from {file_path}: {e}")
+    return {key: value for key, value in metadata.items() if value}
+
 def parse_resume(file_path: str) -> Optional[str]: # Changed here
     _, extension = os.path.splitext(file_path)
     extension = extension.lower()
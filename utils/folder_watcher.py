@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from typing import Optional, Dict, Iterator, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+_READ_SIZE = 64 * 1024
+
+
+class _InotifyBackend:
+    """Linux inotify through ctypes; yields file names as they are created/written/moved in."""
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if self._libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+
+    def read_changes(self, timeout: float) -> Iterator[str]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return
+            raise
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if name:
+                yield os.fsdecode(name)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingBackend:
+    """Portable fallback: diffs (size, mtime) snapshots of the directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._snapshot: Dict[str, Tuple[int, float]] = {}
+
+    def read_changes(self, timeout: float) -> Iterator[str]:
+        time.sleep(timeout)
+        snapshot: Dict[str, Tuple[int, float]] = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            logger.warning(f"Watched directory disappeared: {self.directory}")
+        for name, signature in snapshot.items():
+            if self._snapshot.get(name) != signature:
+                yield name
+        self._snapshot = snapshot
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """
+    Watches a directory and yields paths of files that are complete: a file is only reported once its
+    size and mtime have not changed for `debounce_seconds`, so partially copied uploads are not picked up.
+    Uses inotify on Linux and falls back to polling elsewhere (or when `force_polling` is set).
+    Files already present at start are reported too (callers skip the ones they have processed).
+    """
+
+    def __init__(self, directory: str, debounce_seconds: float = 2.0, poll_interval: float = 1.0,
+                 file_filter: Optional[Callable[[str], bool]] = None, force_polling: bool = False):
+        self.directory = directory
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.file_filter = file_filter or (lambda name: True)
+        self._pending: Dict[str, Tuple[Tuple[int, float], float, float]] = {}  # name -> (signature, last change, first seen)
+        self._stop = threading.Event()
+        self.backend_name = "polling"
+        self._backend = None
+        if not force_polling:
+            try:
+                self._backend = _InotifyBackend(directory)
+                self.backend_name = "inotify"
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify unavailable ({e}); falling back to polling {directory}")
+        if self._backend is None:
+            self._backend = _PollingBackend(directory)
+        logger.info(f"Watching {directory} for new files using {self.backend_name} (debounce {debounce_seconds}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _signature(self, name: str) -> Optional[Tuple[int, float]]:
+        try:
+            stat = os.stat(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def _note_change(self, name: str, now: float):
+        if not self.file_filter(name):
+            return
+        signature = self._signature(name)
+        if signature is None:
+            self._pending.pop(name, None)
+            return
+        _, _, first_seen = self._pending.get(name, (None, now, now))
+        self._pending[name] = (signature, now, first_seen)
+
+    def _ready_files(self, now: float) -> Iterator[Tuple[str, float]]:
+        for name, (signature, last_change, first_seen) in list(self._pending.items()):
+            if now - last_change < self.debounce_seconds:
+                continue
+            current = self._signature(name)
+            if current is None:
+                del self._pending[name]
+            elif current != signature:
+                # Still being written; inotify may have coalesced the events
+                self._pending[name] = (current, now, first_seen)
+            elif current[0] > 0:
+                del self._pending[name]
+                yield name, first_seen
+
+    def watch(self) -> Iterator[Tuple[str, float]]:
+        """Yields (file_path, first_seen_time) for each complete file until stop() is called."""
+        now = time.time()
+        for entry in sorted(os.listdir(self.directory)):
+            self._note_change(entry, now)
+        try:
+            while not self._stop.is_set():
+                timeout = min(self.poll_interval, self.debounce_seconds) if self._pending else self.poll_interval
+                for name in self._backend.read_changes(timeout):
+                    self._note_change(name, time.time())
+                for name, first_seen in self._ready_files(time.time()):
+                    yield os.path.join(self.directory, name), first_seen
+        finally:
+            self._backend.close()
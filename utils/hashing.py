@@ -0,0 +1,33 @@
+import os
+import hashlib
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(file_path: str) -> Optional[str]:
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except OSError as e:
+        logger.error(f"Could not hash file {file_path}: {e}")
+        return None
+    return digest.hexdigest()
+
+
+def resume_content_hash(resume_file_path: str) -> str:
+    # Resumes are identified by file content; files that can no longer be read fall back to their path
+    if os.path.isfile(resume_file_path):
+        digest = file_hash(resume_file_path)
+        if digest:
+            return digest
+    return text_hash(f"path:{resume_file_path}")
@@ -0,0 +1,128 @@
+import re
+import logging
+from typing import Optional, Dict, List, Any, Sequence, Tuple
+
+import numpy as np
+
+from utils.skills import normalize_skills
+from utils.resume_index import education_level
+from config import SCORE_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# Feature name -> matches column holding its per-candidate value
+SCORE_FEATURES = ("semantic", "skill_coverage", "skill_overlap", "experience", "education")
+SCORE_COMPONENT_COLUMNS = tuple(f"{feature}_score" for feature in SCORE_FEATURES)
+
+UNKNOWN_FEATURE_SCORE = 0.5  # candidate-side value could not be extracted: neither rewarded nor penalized
+NOT_INDEXED = (0, None, None)  # get_match_features row for a candidate missing from the search index
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parses "semantic=0.5,experience=0.1,..." into {feature: weight}; unknown features are ignored."""
+    weights: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in SCORE_FEATURES:
+            logger.error(f"Ignoring weight for unknown score feature '{name}'. Known features: {', '.join(SCORE_FEATURES)}")
+            continue
+        try:
+            weights[name] = float(value)
+        except ValueError:
+            logger.error(f"Ignoring invalid weight '{part.strip()}' in SCORE_WEIGHTS")
+    return weights
+
+
+def parse_required_years(value: Any) -> Optional[float]:
+    """Minimum years from a JD requirement: 5, "3-5 years", "5+ years". None when nothing numeric is given."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    numbers = [float(number) for number in NUMBER_PATTERN.findall(str(value or ""))]
+    return min(numbers) if numbers else None
+
+
+class HybridScorer:
+    """
+    Combines per-candidate features into the final match score:
+      semantic        cosine similarity of the JD and resume embeddings, clipped to 0..1
+      skill_coverage  best embedding match per required skill, averaged (SkillVocabulary)
+      skill_overlap   share of the JD's required skills found verbatim (after normalization) in the resume
+      experience      candidate years / required years, capped at 1
+      education       (candidate level + 1) / (required level + 1), capped at 1
+    The candidate side of skill_overlap, experience and education comes from the resume search index
+    (DBManager.get_match_features, one SQL query per JD), so no per-resume parsing happens at scoring time.
+    Every feature is computed for a whole batch of candidates as one NumPy column. The score is the weighted
+    mean of the features available for the JD (a JD without required skills, for example, has no overlap
+    feature), so weights need not sum to 1.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = weights if weights is not None else parse_weights(SCORE_WEIGHTS)
+        if not any(weight > 0 for weight in self.weights.values()):
+            logger.warning("No positive SCORE_WEIGHTS; falling back to semantic similarity only.")
+            self.weights = {"semantic": 1.0}
+
+    def jd_requirements(self, jd_summary: Dict[str, Any]) -> Dict[str, Any]:
+        """The JD side of every feature, computed once per JD."""
+        return {
+            "skills": normalize_skills(jd_summary.get("required_skills", []) or []),
+            "min_years": parse_required_years(jd_summary.get("experience_years")),
+            "education_level": education_level(jd_summary.get("education_level")),
+        }
+
+    def features(self, requirements: Dict[str, Any], indexed: Sequence[Tuple[int, Optional[float], Optional[int]]],
+                 semantic: np.ndarray, skill_coverage: Optional[np.ndarray] = None) -> Dict[str, Optional[np.ndarray]]:
+        """
+        Feature columns (one value per candidate) for one JD; None marks a feature this JD cannot provide.
+        `indexed` holds (required skills held, experience years, education level) per candidate, in order.
+        """
+        skill_hits, years, levels = (np.array(column, dtype=np.float64) for column in zip(*indexed)) if indexed \
+            else (np.zeros(0),) * 3
+        return {
+            "semantic": np.clip(np.asarray(semantic, dtype=np.float32), 0.0, 1.0),
+            "skill_coverage": None if skill_coverage is None else np.asarray(skill_coverage, dtype=np.float32),
+            "skill_overlap": self._skill_overlap(requirements["skills"], skill_hits),
+            "experience": self._experience(requirements["min_years"], years),
+            "education": self._education(requirements["education_level"], levels),
+        }
+
+    def combine(self, features: Dict[str, Optional[np.ndarray]]) -> np.ndarray:
+        names = [name for name, weight in self.weights.items() if weight > 0 and features.get(name) is not None]
+        if not names:
+            return np.asarray(features["semantic"], dtype=np.float32)
+        weights = np.array([self.weights[name] for name in names], dtype=np.float32)
+        # features x candidates, weighted column sums
+        stacked = np.vstack([features[name] for name in names])
+        return (weights @ stacked) / weights.sum()
+
+    @staticmethod
+    def _skill_overlap(required_skills: List[str], skill_hits: np.ndarray) -> Optional[np.ndarray]:
+        if not required_skills:
+            return None
+        return (skill_hits / len(required_skills)).astype(np.float32)
+
+    @staticmethod
+    def _experience(min_years: Optional[float], years: np.ndarray) -> Optional[np.ndarray]:
+        # Unknown values arrive as NaN (NULL in the index)
+        if not min_years:
+            return None
+        scores = np.clip(years / min_years, 0.0, 1.0)
+        return np.where(np.isnan(years), UNKNOWN_FEATURE_SCORE, scores).astype(np.float32)
+
+    @staticmethod
+    def _education(required_level: Optional[int], levels: np.ndarray) -> Optional[np.ndarray]:
+        if required_level is None:
+            return None
+        scores = np.clip((levels + 1) / (required_level + 1), 0.0, 1.0)
+        return np.where(np.isnan(levels), UNKNOWN_FEATURE_SCORE, scores).astype(np.float32)
+
+    @staticmethod
+    def components(features: Dict[str, Optional[np.ndarray]]) -> Dict[str, List[Optional[float]]]:
+        """Per-candidate column values for storing; unavailable features are stored as NULL."""
+        size = len(features["semantic"])
+        return {f"{name}_score": (values.tolist() if values is not None else [None] * size)
+                for name, values in features.items()}
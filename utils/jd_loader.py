@@ -0,0 +1,98 @@
+import os
+import logging
+import pandas as pd
+from typing import Optional, List, Dict, Any
+
+from utils.db_manager import DBManager
+from config import JOB_DESCRIPTION_CSV
+
+logger = logging.getLogger(__name__)
+
+EXPECTED_JD_TEXT_COLUMN = "Job Description"  # <--- Your column name for JD text
+EXPECTED_JD_TITLE_COLUMN = "Job Title"      # <--- Your column name for JD title (optional)
+# --- Fallback column names if the above are not found (used by dummy data) ---
+FALLBACK_JD_TEXT_COLUMN = "job_description_text"
+FALLBACK_JD_TITLE_COLUMN = "job_title"
+
+
+def load_job_descriptions(db_manager: DBManager, csv_path: str = JOB_DESCRIPTION_CSV) -> Optional[List[Dict[str, Any]]]:
+    """
+    Reads the JD CSV and returns one dict per row with keys: row_index, title, raw_text, source_file.
+    Returns None when the CSV cannot be read (the reason is logged to the DB).
+    """
+    logger.info(f"Loading job descriptions from: {csv_path}")
+    jd_df: Optional[pd.DataFrame] = None # Ensure jd_df is defined for the scope
+
+    # Determine which column names to primarily use
+    jd_text_col_to_use = EXPECTED_JD_TEXT_COLUMN
+    jd_title_col_to_use = EXPECTED_JD_TITLE_COLUMN
+
+    if not os.path.exists(csv_path):
+        logger.error(f"Job description CSV file not found: {csv_path}")
+        db_manager.add_log("MainPipeline", "ERROR", f"JD CSV file not found: {csv_path}")
+        logger.info(f"Creating a dummy {csv_path} for demonstration.")
+        # Use fallback names for dummy data generation
+        dummy_jd_data = {FALLBACK_JD_TITLE_COLUMN: ['Senior Python Developer'],
+                         FALLBACK_JD_TEXT_COLUMN: ['We need a skilled Python developer with 5+ years experience in Django, Flask, and REST APIs. Must have a BS in Computer Science. Responsibilities include developing new features, maintaining existing code, and collaborating with the team. Strong problem-solving skills required.']}
+        pd.DataFrame(dummy_jd_data).to_csv(csv_path, index=False, encoding='utf-8')
+        logger.info(f"Dummy {csv_path} created. Please replace with your actual data.")
+        # For dummy data, we know the column names
+        jd_text_col_to_use = FALLBACK_JD_TEXT_COLUMN
+        jd_title_col_to_use = FALLBACK_JD_TITLE_COLUMN
+        jd_df = pd.read_csv(csv_path, encoding='utf-8')
+    else:
+        encodings_to_try = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
+        for enc in encodings_to_try:
+            try:
+                temp_df = pd.read_csv(csv_path, encoding=enc)
+                # Check if primary expected columns exist
+                if EXPECTED_JD_TEXT_COLUMN in temp_df.columns:
+                    jd_text_col_to_use = EXPECTED_JD_TEXT_COLUMN
+                    if EXPECTED_JD_TITLE_COLUMN in temp_df.columns:
+                        jd_title_col_to_use = EXPECTED_JD_TITLE_COLUMN
+                    else: # Use fallback for title if primary title not found
+                        jd_title_col_to_use = FALLBACK_JD_TITLE_COLUMN
+                    jd_df = temp_df
+                    logger.info(f"Successfully read {csv_path} with encoding: {enc} using columns: '{jd_text_col_to_use}', '{jd_title_col_to_use}' (optional)")
+                    break
+                # Check if fallback text column exists (e.g., user named it like the dummy)
+                elif FALLBACK_JD_TEXT_COLUMN in temp_df.columns:
+                    jd_text_col_to_use = FALLBACK_JD_TEXT_COLUMN
+                    if FALLBACK_JD_TITLE_COLUMN in temp_df.columns:
+                         jd_title_col_to_use = FALLBACK_JD_TITLE_COLUMN
+                    else: # Use primary for title if fallback title not found but primary was defined
+                         jd_title_col_to_use = EXPECTED_JD_TITLE_COLUMN
+                    jd_df = temp_df
+                    logger.info(f"Successfully read {csv_path} with encoding: {enc} using columns: '{jd_text_col_to_use}', '{jd_title_col_to_use}' (optional)")
+                    break
+                else:
+                    logger.warning(f"Neither '{EXPECTED_JD_TEXT_COLUMN}' nor '{FALLBACK_JD_TEXT_COLUMN}' found in {csv_path} with encoding {enc}. Trying next encoding or checking columns.")
+            except UnicodeDecodeError:
+                logger.warning(f"Failed to read {csv_path} with encoding {enc}. Trying next...")
+            except Exception as e_read:
+                logger.error(f"Error reading {csv_path} with encoding {enc}: {e_read}")
+
+        if jd_df is None:
+            logger.error(f"Failed to read {csv_path} with all attempted encodings or required columns not found.")
+            db_manager.add_log("MainPipeline", "ERROR", f"Failed to read/parse JD CSV: {csv_path}")
+            return None
+
+    if jd_df.empty:
+        logger.warning(f"Job description CSV ({csv_path}) is empty. No JDs to process.")
+        db_manager.add_log("MainPipeline", "WARNING", "JD CSV is empty.")
+        return []
+
+    if jd_text_col_to_use not in jd_df.columns:
+        logger.error(f"Job description text column ('{jd_text_col_to_use}') not found in {csv_path} after attempting to read.")
+        db_manager.add_log("MainPipeline", "ERROR", f"Final check: '{jd_text_col_to_use}' column missing in JD CSV.")
+        return None
+
+    job_descriptions: List[Dict[str, Any]] = []
+    for index, jd_series in jd_df.iterrows():
+        job_descriptions.append({
+            "row_index": int(index),
+            "title": str(jd_series.get(jd_title_col_to_use, 'N/A Job Title')),
+            "raw_text": str(jd_series[jd_text_col_to_use]),
+            "source_file": f"{csv_path} (row {index})",
+        })
+    return job_descriptions
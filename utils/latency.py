@@ -0,0 +1,43 @@
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+DEFAULT_WINDOW_SIZE = 1000
+
+
+class LatencyTracker:
+    """Thread-safe rolling window of latencies (seconds) with percentile reporting."""
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        self._samples: deque = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, percent: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            return float(np.percentile(np.fromiter(self._samples, dtype=float), percent))
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=float)
+            count = self.count
+        if samples.size == 0:
+            return {"count": count, "p50": None, "p95": None, "p99": None, "max": None}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {"count": count, "p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(samples.max())}
+
+    def format_summary(self) -> str:
+        stats = self.summary()
+        if stats["p50"] is None:
+            return "no samples"
+        return (f"n={stats['count']} p50={stats['p50']:.3f}s p95={stats['p95']:.3f}s "
+                f"p99={stats['p99']:.3f}s max={stats['max']:.3f}s")
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, Callable, List
+
+from config import DB_BUSY_TIMEOUT_MS
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+EVICTION_TARGET = 0.9  # evict down to this fraction of the size limit, so eviction does not run on every store
+
+
+def request_key(endpoint: str, payload: Dict[str, Any]) -> str:
+    """Cache key for an Ollama request: endpoint, model, options and prompt (the whole payload, minus streaming)."""
+    keyed = {name: value for name, value in payload.items() if name != "stream"}
+    canonical = json.dumps({"endpoint": endpoint, "payload": keyed}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Collapses identical concurrent calls: the first caller runs the call, the others wait for its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+
+    def run(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of Ollama responses in its own SQLite file (shared by worker processes, safe to delete).
+    Entries expire `ttl_seconds` after they were stored (0 = never). When the stored responses exceed
+    `max_bytes`, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self.conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                model TEXT,
+                response TEXT NOT NULL, -- JSON-encoded response value
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                latency_seconds REAL -- how long the Ollama call took
+            )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used_at)")
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(llm_cache)")}
+            if "latency_seconds" not in columns:
+                self.conn.execute("ALTER TABLE llm_cache ADD COLUMN latency_seconds REAL")
+        self._purge_expired()
+        self._total_bytes = self._stored_bytes()
+        logger.info(f"LLM response cache at {path}: {self._total_bytes / MB:.1f}MB stored, limit {max_bytes / MB:.0f}MB")
+
+    def _stored_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    def _purge_expired(self):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock, self.conn:
+            removed = self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)).rowcount
+        if removed:
+            logger.info(f"LLM response cache: removed {removed} expired entries.")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            try:
+                row = self.conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                if self.ttl_seconds > 0 and row[1] < now - self.ttl_seconds:
+                    with self.conn:
+                        self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self.expired += 1
+                    self.misses += 1
+                    return None
+                with self.conn:
+                    self.conn.execute("UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+                self.hits += 1
+                return json.loads(row[0])
+            except sqlite3.Error as e:
+                # The cache is an optimization: a locked or broken cache file must not fail the call
+                logger.warning(f"LLM response cache read failed: {e}")
+                self.misses += 1
+                return None
+
+    def put(self, key: str, endpoint: str, model: Optional[str], response: Any, latency_seconds: Optional[float] = None):
+        encoded = json.dumps(response, ensure_ascii=False)
+        size = len(encoded.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            try:
+                with self.conn:
+                    previous = self.conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, endpoint, model, response, size, created_at, last_used_at, latency_seconds) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, endpoint, model, encoded, size, now, now, latency_seconds)
+                    )
+                self.stores += 1
+                self._total_bytes += size - (previous[0] if previous else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM response cache write failed: {e}")
+
+    def _evict(self):
+        # Other processes write to the same file, so re-read the real total before evicting
+        self._total_bytes = self._stored_bytes()
+        excess = self._total_bytes - int(self.max_bytes * EVICTION_TARGET)
+        if excess <= 0:
+            return
+        freed, keys = 0, []
+        for key, size in self.conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used_at"):
+            keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        with self.conn:
+            self.conn.executemany("DELETE FROM llm_cache WHERE key = ?", keys)
+        self.evictions += len(keys)
+        self._total_bytes -= freed
+        logger.debug(f"LLM response cache: evicted {len(keys)} least recently used entries ({freed / MB:.1f}MB).")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "expired": self.expired,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "stored_bytes": self._total_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class LLMCacheReader:
+    """
+    Read-only view of a cache file for planning: lookups do not count as hits, refresh recency or purge
+    anything, and a missing file reads as an empty cache.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.conn: Optional[sqlite3.Connection] = None
+        if os.path.exists(path):
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        if self.conn is None:
+            return None
+        try:
+            row = self.conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM response cache read failed: {e}")
+            return None
+        if row is None or (self.ttl_seconds > 0 and row[1] < time.time() - self.ttl_seconds):
+            return None
+        return json.loads(row[0])
+
+    def latencies(self, endpoint: str, model: str, limit: int = 1000) -> List[float]:
+        """Latencies (seconds) of the most recent calls stored for endpoint and model."""
+        if self.conn is None:
+            return []
+        try:
+            return [row[0] for row in self.conn.execute(
+                "SELECT latency_seconds FROM llm_cache WHERE endpoint = ? AND model = ? AND latency_seconds IS NOT NULL "
+                "ORDER BY created_at DESC LIMIT ?", (endpoint, model, limit))]
+        except sqlite3.Error:
+            return []  # cache file written before latencies were recorded
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
@@ -0,0 +1,184 @@
+import os
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from config import LOG_FILE, LOG_LEVEL, LOG_FORMAT, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_SAMPLING
+
+logger = logging.getLogger(__name__)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_exception_formatter = logging.Formatter()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, process, thread (+ exc when there is a traceback)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _Rule:
+    """Keeps a fraction of records (`0.1`) or at most N per second (`20/s`) for one logger prefix."""
+
+    def __init__(self, spec: str):
+        self.lock = threading.Lock()
+        self.dropped = 0
+        if spec.endswith("/s"):
+            self.per_second: Optional[float] = float(spec[:-2])
+            self.tokens = self.per_second
+            self.refilled_at = time.monotonic()
+        else:
+            self.per_second = None
+            self.fraction = min(1.0, max(0.0, float(spec)))
+            self.credit = 1.0  # the first record always passes
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.per_second is not None:
+                now = time.monotonic()
+                self.tokens = min(self.per_second, self.tokens + (now - self.refilled_at) * self.per_second)
+                self.refilled_at = now
+                allowed = self.tokens >= 1.0
+                if allowed:
+                    self.tokens -= 1.0
+            else:
+                # Deterministic: every 1/fraction-th record passes
+                self.credit += self.fraction
+                allowed = self.credit >= 1.0
+                if allowed:
+                    self.credit -= 1.0
+            if not allowed:
+                self.dropped += 1
+            return allowed
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Samples or rate-limits INFO/DEBUG records per logger (the longest matching prefix in the rules wins);
+    WARNING and above always pass. Rules are parsed from "logger=0.1,other.logger=20/s".
+    """
+
+    def __init__(self, spec: str = LOG_SAMPLING):
+        super().__init__()
+        self.rules: Dict[str, _Rule] = {}
+        for part in spec.split(","):
+            if "=" not in part:
+                continue
+            name, rule = (item.strip() for item in part.split("=", 1))
+            try:
+                self.rules[name] = _Rule(rule)
+            except ValueError:
+                logger.warning(f"Ignoring invalid LOG_SAMPLING rule '{part.strip()}' (use logger=0.1 or logger=20/s)")
+        self._ordered = sorted(self.rules.items(), key=lambda item: len(item[0]), reverse=True)
+        self._by_logger: Dict[str, Optional[_Rule]] = {}
+
+    def _rule_for(self, name: str) -> Optional[_Rule]:
+        if name not in self._by_logger:
+            self._by_logger[name] = next((rule for prefix, rule in self._ordered
+                                          if name == prefix or name.startswith(prefix + ".")), None)
+        return self._by_logger[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self._ordered:
+            return True
+        rule = self._rule_for(record.name)
+        return rule is None or rule.allow()
+
+    def dropped(self) -> Dict[str, int]:
+        return {name: rule.dropped for name, rule in self.rules.items() if rule.dropped}
+
+
+class _PreparingQueueHandler(QueueHandler):
+    # Like QueueHandler.prepare, but keeps the traceback in exc_text (JSON lines put it in its own field)
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_sampling: Optional[SamplingFilter] = None
+_configured_pid: Optional[int] = None
+
+
+def _output_handlers(log_file: str, json_lines: bool) -> List[logging.Handler]:
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    # maxBytes=0 never rotates
+    file_handler = RotatingFileHandler(log_file, maxBytes=max(0, LOG_MAX_BYTES), backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    file_handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return [file_handler, console_handler]
+
+
+def setup_logging(log_queue: Optional[Any] = None, log_file: str = LOG_FILE) -> None:
+    """
+    Routes all logging through a queue so callers never wait on file or console I/O. In the main process a
+    QueueListener thread writes to the rotating LOG_FILE (text, or JSON lines with LOG_FORMAT=json) and the
+    console. Worker processes pass the multiprocessing queue from forward_logs() and only enqueue, so a
+    single process writes and rotates the file. Safe to call again (e.g. in a forked child): it replaces
+    the handlers inherited from the parent.
+    """
+    global _listener, _sampling, _configured_pid
+    if _configured_pid == os.getpid() and log_queue is None and _listener is not None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if _configured_pid == os.getpid() and _listener is not None:
+        _listener.stop()
+    _listener = None
+
+    _sampling = SamplingFilter()
+    if log_queue is None:
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, *_output_handlers(log_file, LOG_FORMAT.lower() == "json"),
+                                  respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    queue_handler = _PreparingQueueHandler(log_queue)
+    queue_handler.addFilter(_sampling)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))
+    _configured_pid = os.getpid()
+
+
+def forward_logs(log_queue: Any) -> QueueListener:
+    """Starts a listener that writes records from worker processes (put on `log_queue`) to this process's outputs."""
+    handlers = _listener.handlers if _listener is not None else tuple(_output_handlers(LOG_FILE, LOG_FORMAT.lower() == "json"))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def shutdown_logging() -> None:
+    """Reports sampled-out records and flushes the queue. Registered with atexit."""
+    global _listener
+    if _sampling is not None and _sampling.dropped():
+        summary = ", ".join(f"{name}: {count}" for name, count in sorted(_sampling.dropped().items()))
+        logger.warning(f"Log sampling dropped INFO/DEBUG records ({summary})")
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+        _listener = None
+
@@ -0,0 +1,148 @@
+import os
+import re
+import zlib
+import logging
+from typing import Optional, List, NamedTuple, Tuple
+
+import numpy as np
+
+from utils.db_manager import DBManager
+from utils.resume_heuristics import extract_email, extract_phone
+from config import NEAR_DUPLICATE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 estimated Jaccard share a bucket with high probability
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+MERSENNE_PRIME = np.uint64(4294967291)  # largest prime below 2**32, so signature values fit in uint32
+TOKEN_PATTERN = re.compile(r"[a-z0-9@+#]+")
+
+# Fixed permutation coefficients: signatures must stay comparable across runs and processes
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, int(MERSENNE_PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.randint(0, int(MERSENNE_PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """crc32 of every SHINGLE_WORDS-word window of the normalized text (case, punctuation and layout ignored)."""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) <= SHINGLE_WORDS:
+        shingles = {" ".join(tokens)} if tokens else set()
+    else:
+        shingles = {" ".join(tokens[i:i + SHINGLE_WORDS]) for i in range(len(tokens) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (uint32 x NUM_PERMUTATIONS), or None for text without words."""
+    hashes = shingle_hashes(text)
+    if hashes.size == 0:
+        return None
+    # permutations x shingles; a * x + b stays below 2**64 because a, b, x < 2**32
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % MERSENNE_PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One bucket id per LSH band (63-bit, so it fits an SQLite INTEGER)."""
+    bands = signature.reshape(LSH_BANDS, LSH_ROWS)
+    return [zlib.crc32(band.tobytes()) << 31 ^ zlib.adler32(band.tobytes()) for band in bands]
+
+
+def estimated_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets: share of matching signature values."""
+    return float(np.mean(first == second))
+
+
+def contact_details(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """(email, phone digits) found deterministically in the resume text."""
+    phone = extract_phone(text)
+    return extract_email(text), re.sub(r"\D", "", phone) if phone else None
+
+
+def same_person_possible(first: Tuple[Optional[str], Optional[str]], second: Tuple[Optional[str], Optional[str]]) -> bool:
+    """False when both resumes carry an email (or phone) and they differ: two people sharing a template."""
+    (first_email, first_phone), (second_email, second_phone) = first, second
+    if first_email and second_email and first_email != second_email:
+        return False
+    # Compare the last 9 digits so "+1 555 0100" and "555 0100" style variants of one number agree
+    if first_phone and second_phone and first_phone[-9:] != second_phone[-9:]:
+        return False
+    return True
+
+
+class DuplicateMatch(NamedTuple):
+    content_hash: str  # of the cluster representative
+    resume_file_path: str
+    similarity: float
+
+
+class NearDuplicateDetector:
+    """
+    Finds resumes that are near-duplicates of one already seen (the same CV as PDF and DOCX, or with small
+    edits). Signatures and LSH band buckets are stored in resume_signatures / resume_lsh_buckets, so
+    detection works across runs, the daemon and worker processes. The first resume of a cluster is its
+    representative and is the only one extracted and matched; later members are linked to it. Similar text
+    alone is not enough: resumes whose email or phone differ (two people using one template) are never linked.
+    """
+
+    def __init__(self, db_manager: DBManager, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.db_manager = db_manager
+        self.threshold = threshold
+        self.duplicates_found = 0
+
+    def lookup(self, content_hash: str, resume_file_path: str) -> Tuple[bool, Optional[DuplicateMatch]]:
+        """
+        Checks a file against what is already known, without parsing it. Returns (known, match): known is
+        False for content never seen; match is the representative for known duplicates, None for representatives.
+        """
+        row = self.db_manager.get_resume_signature(content_hash)
+        if row is None:
+            return False, None
+        _, stored_path, _, duplicate_of, similarity = row
+        if duplicate_of:
+            representative = self.db_manager.get_resume_signature(duplicate_of)
+            return True, DuplicateMatch(duplicate_of, representative[1] if representative else "", similarity or 1.0)
+        if stored_path != resume_file_path and os.path.exists(stored_path):
+            # Byte-identical copy of a representative under another name
+            return True, DuplicateMatch(content_hash, stored_path, 1.0)
+        if stored_path != resume_file_path:
+            self.db_manager.update_resume_signature_path(content_hash, resume_file_path)  # representative was renamed
+        return True, None
+
+    def check(self, content_hash: str, resume_file_path: str, text: str) -> Optional[DuplicateMatch]:
+        """Registers a newly parsed resume; returns the representative it duplicates, or None if it starts a new cluster."""
+        signature = minhash_signature(text)
+        if signature is None:
+            return None
+        buckets = band_buckets(signature)
+        contact = contact_details(text)
+        best: Optional[DuplicateMatch] = None
+        for candidate_hash, candidate_path, candidate_signature, duplicate_of, email, phone in self.db_manager.get_lsh_candidates(buckets):
+            if candidate_hash == content_hash:
+                continue
+            similarity = estimated_similarity(signature, np.frombuffer(candidate_signature, dtype=np.uint32))
+            if similarity >= self.threshold and not same_person_possible(contact, (email, phone)):
+                logger.info(f"{os.path.basename(resume_file_path)} is similar to {os.path.basename(candidate_path)} "
+                            f"(estimated similarity {similarity:.2f}) but has different contact details; keeping both.")
+                continue
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                representative_hash = duplicate_of or candidate_hash
+                if duplicate_of:
+                    representative = self.db_manager.get_resume_signature(duplicate_of)
+                    candidate_path = representative[1] if representative else candidate_path
+                best = DuplicateMatch(representative_hash, candidate_path, similarity)
+
+        self.db_manager.add_resume_signature(content_hash, resume_file_path, signature.tobytes(), buckets,
+                                             duplicate_of=best.content_hash if best else None,
+                                             similarity=best.similarity if best else None,
+                                             email=contact[0], phone=contact[1])
+        if best:
+            self.duplicates_found += 1
+            logger.info(f"{os.path.basename(resume_file_path)} is a near-duplicate of {os.path.basename(best.resume_file_path)} "
+                        f"(estimated similarity {best.similarity:.2f}); linking it instead of extracting it again.")
+            self.db_manager.add_log("ResumeMatcherAgent", "INFO", f"Near-duplicate resume {resume_file_path} linked to "
+                                    f"{best.resume_file_path} (similarity {best.similarity:.2f})")
+        return best
@@ -1,79 +1,241 @@
+import time
+import threading
 import requests
 import json
 import logging
-from config import OLLAMA_BASE_URL, OLLAMA_LLM_MODEL, OLLAMA_EMBEDDING_MODEL
+from collections import Counter
+from typing import Dict, Any, Optional, Callable
+from requests.adapters import HTTPAdapter
+from utils.adaptive_limiter import OUTCOME_OK, OUTCOME_TIMEOUT, OUTCOME_OVERLOAD, OUTCOME_IGNORED
+from utils.ollama_pool import OllamaBackendPool, ENDPOINT_GENERATE, ENDPOINT_EMBEDDINGS, split_urls
+from utils.llm_cache import LLMResponseCache, SingleFlight, request_key, MB
+from config import (
+    OLLAMA_BASE_URL, OLLAMA_LLM_MODEL, OLLAMA_EMBEDDING_MODEL, OLLAMA_TIMEOUT_SECONDS, OLLAMA_CONCURRENCY_MAX,
+    OLLAMA_GENERATE_URLS, OLLAMA_EMBEDDING_URLS, OLLAMA_CACHE_ENABLED, OLLAMA_CACHE_PATH, OLLAMA_CACHE_MAX_MB,
+    OLLAMA_CACHE_TTL_HOURS
+)
 
 logger = logging.getLogger(__name__)
 
+
+def completion_payload(prompt: str, model: str, format_json: bool = False) -> Dict[str, Any]:
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False
+    }
+    if format_json:
+        payload["format"] = "json"
+    return payload
+
+
+def embedding_payload(text: str, model: str) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "prompt": text
+    }
+
+
 class OllamaClient:
-    def __init__(self, base_url=OLLAMA_BASE_URL, llm_model=OLLAMA_LLM_MODEL, embedding_model=OLLAMA_EMBEDDING_MODEL):
-        self.base_url = base_url
+    def __init__(self, base_url=None, llm_model=OLLAMA_LLM_MODEL, embedding_model=OLLAMA_EMBEDDING_MODEL,
+                 generate_urls: Optional[str] = None, embedding_urls: Optional[str] = None):
+        # An explicit base_url pins both endpoints to that host; otherwise the OLLAMA_*_URLS settings apply
+        generate_urls = split_urls(generate_urls or base_url or OLLAMA_GENERATE_URLS)
+        embedding_urls = split_urls(embedding_urls or base_url or OLLAMA_EMBEDDING_URLS)
+        self.base_url = (generate_urls + embedding_urls + [OLLAMA_BASE_URL])[0]
         self.llm_model = llm_model
         self.embedding_model = embedding_model
+        # One keep-alive session for all calls, so long-running modes do not reconnect per request
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=OLLAMA_CONCURRENCY_MAX))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=OLLAMA_CONCURRENCY_MAX))
+        # Each host gets its own AIMD limit per endpoint (completions and embeddings have very different latencies)
+        self.pool = OllamaBackendPool(self.session, generate_urls, embedding_urls, llm_model, embedding_model)
         self._check_ollama_availability()
+        self.pool.start_health_checks()
+        # Identical prompts (duplicate CVs, repeated JD rows, empty-field embedding texts) are answered once
+        self.single_flight = SingleFlight()
+        self.cache: Optional[LLMResponseCache] = None
+        if OLLAMA_CACHE_ENABLED:
+            self.cache = LLMResponseCache(OLLAMA_CACHE_PATH, int(OLLAMA_CACHE_MAX_MB * MB), OLLAMA_CACHE_TTL_HOURS * 3600)
+        self._stats_lock = threading.Lock()
+        self._call_stats: Dict[str, Counter] = {endpoint: Counter(calls=0, cache_hits=0, ollama_requests=0)
+                                                for endpoint in (ENDPOINT_GENERATE, ENDPOINT_EMBEDDINGS)}
 
     def _check_ollama_availability(self):
+        urls = ", ".join(backend.url for backend in self.pool.backends)
+        healthy = self.pool.check_health()
+        if not healthy:
+            logger.error(f"Failed to connect to Ollama at {urls}. Ensure Ollama is running.")
+            raise ConnectionError(f"Failed to connect to Ollama at {urls}. Ensure Ollama is running.")
+        for endpoint in (ENDPOINT_GENERATE, ENDPOINT_EMBEDDINGS):
+            serving = [backend.url for backend in self.pool.backends if backend.healthy and endpoint in backend.endpoints]
+            if not serving:
+                raise ConnectionError(f"No Ollama host at {urls} can serve {endpoint} requests.")
+            logger.info(f"Ollama {endpoint} requests routed over: {', '.join(serving)}")
+        logger.info(f"Successfully connected to Ollama ({healthy} of {len(self.pool.backends)} hosts healthy)")
+
+    def _post(self, endpoint: str, payload: Dict[str, Any]) -> requests.Response:
+        """
+        POSTs to /api/<endpoint> on the least-loaded healthy host, within that host's adaptive concurrency
+        limit. Timeouts, connection errors and 5xx responses fail over to the next host; if every host fails,
+        the last 5xx response is returned (or the last error raised).
+        """
+        tried = set()
+        last_response: Optional[requests.Response] = None
+        last_error: Optional[requests.exceptions.RequestException] = None
+        while True:
+            backend = self.pool.choose(endpoint, tried)
+            if backend is None:
+                break
+            tried.add(backend.url)
+            limiter = backend.limiters.get(endpoint)
+            started = limiter.acquire() if limiter else time.monotonic()
+            outcome = OUTCOME_IGNORED
+            unreachable = False
+            try:
+                response = self.session.post(f"{backend.url}/api/{endpoint}", json=payload, timeout=OLLAMA_TIMEOUT_SECONDS)
+                if response.status_code >= 500:
+                    outcome = OUTCOME_OVERLOAD
+                    last_response = response
+                    logger.warning(f"Ollama {endpoint} on {backend.url} returned HTTP {response.status_code}; trying another host.")
+                    continue
+                if response.ok:
+                    outcome = OUTCOME_OK
+                return response
+            except requests.exceptions.Timeout as e:
+                outcome = OUTCOME_TIMEOUT
+                unreachable = True
+                last_error = e
+                logger.warning(f"Ollama {endpoint} on {backend.url} timed out; trying another host.")
+            except requests.exceptions.ConnectionError as e:
+                outcome = OUTCOME_OVERLOAD
+                unreachable = True
+                last_error = e
+                logger.warning(f"Ollama {endpoint} on {backend.url} unreachable; trying another host. Error: {e}")
+            finally:
+                if limiter:
+                    limiter.release(started, outcome)
+                self.pool.finish(backend, endpoint, time.monotonic() - started if outcome == OUTCOME_OK else None,
+                                 failed=unreachable)
+        if last_response is not None:
+            return last_response
+        if last_error is not None:
+            raise last_error
+        raise requests.exceptions.ConnectionError(f"No healthy Ollama host available for {endpoint} requests")
+
+    def concurrency_metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {f"{endpoint}@{backend.url}": limiter.metrics()
+                for backend in self.pool.backends for endpoint, limiter in backend.limiters.items()}
+
+    def backend_metrics(self) -> Dict[str, Dict[str, Any]]:
+        return self.pool.metrics()
+
+    def close(self):
+        self.pool.close()
+        self.session.close()
+        if self.cache:
+            self.cache.close()
+
+    # --- Response reuse ---
+    def _cached(self, endpoint: str, payload: Dict[str, Any], fetch: Callable[[], Any],
+                cacheable: Callable[[Any], bool] = bool) -> Any:
+        """
+        Returns the response for `payload`, calling `fetch` only if it is neither cached nor already in flight.
+        Identical concurrent calls share one request (single-flight); results passing `cacheable` are stored.
+        """
+        key = request_key(endpoint, payload)
+        self._count(endpoint, "calls")
+
+        def load() -> Any:
+            if self.cache:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self._count(endpoint, "cache_hits")
+                    return cached
+            self._count(endpoint, "ollama_requests")
+            started = time.monotonic()
+            result = fetch()
+            if self.cache and cacheable(result):
+                # The call's latency is kept with the response; `python main.py plan` estimates run times from it
+                self.cache.put(key, endpoint, payload.get("model"), result, latency_seconds=time.monotonic() - started)
+            return result
+
+        return self.single_flight.run(key, load)
+
+    def _count(self, endpoint: str, counter: str):
+        with self._stats_lock:
+            self._call_stats[endpoint][counter] += 1
+
+    def response_metrics(self) -> Dict[str, Any]:
+        """Per-endpoint reuse: calls answered from the cache, joined onto an identical in-flight call, or sent."""
+        with self._stats_lock:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self._call_stats.items()}
+        for stats in endpoints.values():
+            # Calls that neither hit the cache nor sent a request waited on an identical in-flight call
+            stats["coalesced"] = stats["calls"] - stats["cache_hits"] - stats["ollama_requests"]
+            stats["reuse_rate"] = (stats["calls"] - stats["ollama_requests"]) / stats["calls"] if stats["calls"] else None
+        return {"endpoints": endpoints, "cache": self.cache.metrics() if self.cache else None}
+
+    def _response_payload(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = self._post(endpoint, payload)
         try:
-            response = requests.get(self.base_url)
             response.raise_for_status()
-            logger.info(f"Successfully connected to Ollama at {self.base_url}")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to connect to Ollama at {self.base_url}. Ensure Ollama is running. Error: {e}")
-            raise ConnectionError(f"Failed to connect to Ollama at {self.base_url}. Ensure Ollama is running.")
+        except requests.exceptions.HTTPError:
+            logger.error(f"Response text: {response.text}")
+            raise
+        return response.json()
 
     def generate_completion(self, prompt: str, model: str = None, format_json: bool = False) -> str:
         model_to_use = model if model else self.llm_model
-        api_url = f"{self.base_url}/api/generate"
-        payload = {
-            "model": model_to_use,
-            "prompt": prompt,
-            "stream": False
-        }
-        if format_json:
-            payload["format"] = "json"
+        payload = completion_payload(prompt, model_to_use, format_json)
 
         logger.debug(f"Sending generation request to Ollama: {model_to_use}, prompt length: {len(prompt)}")
         try:
-            response = requests.post(api_url, json=payload)
-            response.raise_for_status()
-            response_data = response.json()
-            
-            # Handle potential JSON parsing issues if format_json=True
-            if format_json:
-                try:
-                    # The actual content is in response_data['response'], which is a string representation of JSON
-                    return json.loads(response_data.get("response", "{}"))
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse JSON response from Ollama: {e}. Response: {response_data.get('response')}")
-                    # Fallback or re-attempt could be implemented here
-                    # For now, return the raw string if parsing fails, or an empty dict
-                    return response_data.get("response", "{}") if isinstance(response_data.get("response"), str) else {}
-
-            return response_data.get("response", "")
+            response_text = self._cached(
+                ENDPOINT_GENERATE, payload,
+                lambda: self._response_payload(ENDPOINT_GENERATE, payload).get("response", ""),
+                # Malformed JSON is not cached, so the next call gets a fresh attempt
+                cacheable=_is_json if format_json else bool
+            )
         except requests.exceptions.RequestException as e:
             logger.error(f"Ollama API request failed: {e}")
-            logger.error(f"Response text: {response.text if 'response' in locals() else 'No response object'}")
             return "" # Or raise an exception
 
+        # Handle potential JSON parsing issues if format_json=True
+        if format_json:
+            try:
+                # The actual content is in response_data['response'], which is a string representation of JSON
+                return json.loads(response_text or "{}")
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse JSON response from Ollama: {e}. Response: {response_text}")
+                # Fallback or re-attempt could be implemented here
+                # For now, return the raw string if parsing fails, or an empty dict
+                return response_text if isinstance(response_text, str) else {}
+
+        return response_text
+
     def generate_embedding(self, text: str, model: str = None) -> list[float]:
         model_to_use = model if model else self.embedding_model
-        api_url = f"{self.base_url}/api/embeddings"
-        payload = {
-            "model": model_to_use,
-            "prompt": text
-        }
+        payload = embedding_payload(text, model_to_use)
         logger.debug(f"Sending embedding request to Ollama: {model_to_use}, text length: {len(text)}")
         try:
-            response = requests.post(api_url, json=payload)
-            response.raise_for_status()
-            response_data = response.json()
-            return response_data.get("embedding", [])
+            return self._cached(
+                ENDPOINT_EMBEDDINGS, payload,
+                lambda: self._response_payload(ENDPOINT_EMBEDDINGS, payload).get("embedding", [])
+            )
         except requests.exceptions.RequestException as e:
             logger.error(f"Ollama API embedding request failed: {e}")
-            logger.error(f"Response text: {response.text if 'response' in locals() else 'No response object'}")
-
             return [] # Or raise an exception
 
+
+def _is_json(text: Any) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except (TypeError, json.JSONDecodeError):
+        return False
+
 if __name__ == '__main__':
     # Basic test
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,198 @@
+import time
+import logging
+import threading
+from typing import Optional, Dict, List, Any, Iterable, Set
+
+import requests
+
+from utils.adaptive_limiter import AdaptiveLimiter
+from config import (
+    OLLAMA_ADAPTIVE_CONCURRENCY, OLLAMA_CONCURRENCY_INITIAL, OLLAMA_CONCURRENCY_MIN,
+    OLLAMA_CONCURRENCY_MAX, OLLAMA_LATENCY_TOLERANCE, OLLAMA_HEALTH_CHECK_SECONDS, OLLAMA_BACKEND_MAX_FAILURES,
+    OLLAMA_BACKEND_COOLDOWN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT_GENERATE = "generate"
+ENDPOINT_EMBEDDINGS = "embeddings"
+HEALTH_CHECK_TIMEOUT_SECONDS = 5.0
+LATENCY_SMOOTHING = 0.2
+
+
+def split_urls(value: str) -> List[str]:
+    return [url.strip().rstrip("/") for url in (value or "").split(",") if url.strip()]
+
+
+def _model_names(name: str) -> Set[str]:
+    # "llama3" and "llama3:latest" refer to the same model
+    return {name, name if ":" in name else f"{name}:latest"}
+
+
+class OllamaBackend:
+    """One Ollama host: the endpoints it is configured for, its health and per-endpoint load/latency."""
+
+    def __init__(self, url: str, endpoints: Iterable[str]):
+        self.url = url
+        self.configured_endpoints = set(endpoints)
+        self.endpoints = set(self.configured_endpoints)  # narrowed by the models the host actually has
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.outstanding: Dict[str, int] = {endpoint: 0 for endpoint in self.configured_endpoints}
+        self.latency: Dict[str, Optional[float]] = {endpoint: None for endpoint in self.configured_endpoints}
+        self.requests = 0
+        self.failures = 0
+        # AIMD limits are per host: one busy GPU box should not throttle the others
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+        if OLLAMA_ADAPTIVE_CONCURRENCY:
+            for endpoint in self.configured_endpoints:
+                self.limiters[endpoint] = AdaptiveLimiter(
+                    f"{endpoint}@{url}", OLLAMA_CONCURRENCY_INITIAL, OLLAMA_CONCURRENCY_MIN, OLLAMA_CONCURRENCY_MAX,
+                    latency_tolerance=OLLAMA_LATENCY_TOLERANCE
+                )
+
+    def available(self, endpoint: str, now: float) -> bool:
+        return endpoint in self.endpoints and (self.healthy or now >= self.down_until)
+
+    def cost(self, endpoint: str, default_latency: float) -> float:
+        """Routing cost: expected wait if this request joins the host's queue (least-outstanding, latency-weighted)."""
+        latency = self.latency[endpoint]
+        cost = (self.outstanding[endpoint] + 1) * (latency if latency is not None else default_latency)
+        limiter = self.limiters.get(endpoint)
+        if limiter and self.outstanding[endpoint] >= limiter.limit:
+            cost *= 2  # saturated: only chosen if every other host is worse
+        return cost
+
+
+class OllamaBackendPool:
+    """
+    Routes Ollama calls over several hosts. Completions and embeddings are routed separately; a host
+    only serves an endpoint if it is configured for it and (per /api/tags) has the model loaded.
+    Requests go to the available host with the lowest (outstanding + 1) x smoothed latency. After
+    OLLAMA_BACKEND_MAX_FAILURES consecutive timeouts or connection errors a host is taken out for a cooldown; a background
+    thread re-checks health and models every OLLAMA_HEALTH_CHECK_SECONDS.
+    """
+
+    def __init__(self, session: requests.Session, generate_urls: List[str], embedding_urls: List[str],
+                 llm_model: str, embedding_model: str):
+        self.session = session
+        self.models = {ENDPOINT_GENERATE: llm_model, ENDPOINT_EMBEDDINGS: embedding_model}
+        self.backends: List[OllamaBackend] = []
+        for url in dict.fromkeys(generate_urls + embedding_urls):
+            endpoints = ([ENDPOINT_GENERATE] if url in generate_urls else []) + ([ENDPOINT_EMBEDDINGS] if url in embedding_urls else [])
+            self.backends.append(OllamaBackend(url, endpoints))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    # --- Health checks ---
+    def _probe(self, backend: OllamaBackend) -> bool:
+        try:
+            response = self.session.get(f"{backend.url}/api/tags", timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Ollama backend {backend.url} failed health check: {e}")
+            return False
+        try:
+            available_models = {name for model in response.json().get("models", []) for name in _model_names(model.get("name", ""))}
+        except (ValueError, AttributeError):
+            available_models = None  # Not a tag listing (e.g. a proxy); assume the configured models are there
+        endpoints = set(backend.configured_endpoints)
+        if available_models is not None:
+            endpoints = {endpoint for endpoint in endpoints if _model_names(self.models[endpoint]) & available_models}
+            for endpoint in backend.configured_endpoints - endpoints:
+                logger.warning(f"Ollama backend {backend.url} does not have model {self.models[endpoint]}; not routing {endpoint} there.")
+        with self._lock:
+            backend.endpoints = endpoints
+            if not backend.healthy:
+                logger.info(f"Ollama backend {backend.url} is healthy again.")
+            backend.healthy = True
+            backend.consecutive_failures = 0
+        return True
+
+    def check_health(self) -> int:
+        """Probes every backend; returns how many are healthy."""
+        healthy = 0
+        for backend in self.backends:
+            if self._probe(backend):
+                healthy += 1
+            else:
+                self._mark_down(backend)
+        return healthy
+
+    def start_health_checks(self):
+        if self._health_thread is None and OLLAMA_HEALTH_CHECK_SECONDS > 0:
+            self._health_thread = threading.Thread(target=self._health_loop, name="ollama-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stop.wait(OLLAMA_HEALTH_CHECK_SECONDS):
+            self.check_health()
+
+    def close(self):
+        self._stop.set()
+
+    # --- Routing ---
+    def choose(self, endpoint: str, exclude: Set[str]) -> Optional[OllamaBackend]:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [backend for backend in self.backends
+                          if backend.url not in exclude and backend.available(endpoint, now)]
+            if not candidates:
+                # Every host is cooling down: trying one beats failing the call outright
+                candidates = [backend for backend in self.backends
+                              if backend.url not in exclude and endpoint in backend.endpoints]
+            if not candidates:
+                return None
+            # Hosts without a latency sample yet are assumed to be as fast as the fastest known one
+            known = [candidate.latency[endpoint] for candidate in candidates if candidate.latency[endpoint] is not None]
+            default_latency = min(known) if known else 1.0
+            backend = min(candidates, key=lambda candidate: candidate.cost(endpoint, default_latency))
+            backend.outstanding[endpoint] += 1
+            backend.requests += 1
+            return backend
+
+    def finish(self, backend: OllamaBackend, endpoint: str, latency: Optional[float], failed: bool):
+        """`failed` means unreachable or timed out; a busy (5xx) reply is load, which the AIMD limit handles."""
+        with self._lock:
+            backend.outstanding[endpoint] -= 1
+            if failed:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= OLLAMA_BACKEND_MAX_FAILURES:
+                    self._mark_down_locked(backend)
+                return
+            backend.consecutive_failures = 0
+            if not backend.healthy:
+                logger.info(f"Ollama backend {backend.url} is serving again.")
+                backend.healthy = True
+            if latency is not None:
+                previous = backend.latency[endpoint]
+                backend.latency[endpoint] = latency if previous is None else previous + LATENCY_SMOOTHING * (latency - previous)
+
+    def _mark_down(self, backend: OllamaBackend):
+        with self._lock:
+            self._mark_down_locked(backend)
+
+    def _mark_down_locked(self, backend: OllamaBackend):
+        if backend.healthy:
+            logger.warning(f"Ollama backend {backend.url} marked down for {OLLAMA_BACKEND_COOLDOWN_SECONDS}s "
+                           f"after {backend.consecutive_failures} consecutive failures.")
+        backend.healthy = False
+        backend.down_until = time.monotonic() + OLLAMA_BACKEND_COOLDOWN_SECONDS
+
+    # --- Metrics ---
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            backends = {backend.url: {
+                "healthy": backend.healthy,
+                "endpoints": sorted(backend.endpoints),
+                "requests": backend.requests,
+                "failures": backend.failures,
+                "outstanding": dict(backend.outstanding),
+                "latency": dict(backend.latency),
+            } for backend in self.backends}
+        for backend in self.backends:
+            backends[backend.url]["concurrency"] = {endpoint: limiter.metrics() for endpoint, limiter in backend.limiters.items()}
+        return backends
@@ -0,0 +1,129 @@
+"""
+Local stand-in for the Ollama HTTP API, for exercising the pipeline and the adaptive concurrency limiter
+without a GPU. Latency grows with the number of requests in flight, and requests beyond `--capacity`
+get HTTP 503, roughly like a shared Ollama box under load.
+
+    python -m utils.ollama_stub --port 11500 --base-latency 0.2 --per-request-latency 0.1 --capacity 8
+    OLLAMA_BASE_URL=http://127.0.0.1:11500 python main.py
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+EMBEDDING_DIMENSIONS = 64
+DEFAULT_MODELS = ("llama3:latest", "nomic-embed-text:latest")
+STUB_JD_SUMMARY = {
+    "job_title": "Software Engineer", "required_skills": ["Python", "SQL", "Docker"], "experience_years": "3",
+    "education_level": "Bachelor's", "responsibilities": ["Build and maintain services"]
+}
+STUB_RESUME = {
+    "candidate_name": "Unknown", "email": "unknown@example.com", "skills": ["Python", "SQL"],
+    "experience_summary": "4 years as a software engineer", "education": ["BSc Computer Science"], "projects": []
+}
+BATCH_ID_PATTERN = re.compile(r"^\s*\[(r\d+)\]\s*$", re.MULTILINE)
+
+
+class StubState:
+    def __init__(self, base_latency: float, per_request_latency: float, capacity: int, jitter: float,
+                 models: tuple = DEFAULT_MODELS):
+        self.base_latency = base_latency
+        self.per_request_latency = per_request_latency
+        self.capacity = capacity
+        self.jitter = jitter
+        self.models = models  # reported by /api/tags
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def enter(self) -> int:
+        with self.lock:
+            self.in_flight += 1
+            return self.in_flight
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+def stub_embedding(text: str) -> list:
+    # Deterministic per text, so identical inputs give identical vectors
+    rng = random.Random(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16))
+    return [rng.gauss(0.0, 1.0) for _ in range(EMBEDDING_DIMENSIONS)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state: StubState  # set by make_stub_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": name} for name in self.state.models]})
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"Ollama is running")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+        in_flight = self.state.enter()
+        try:
+            if in_flight > self.state.capacity:
+                self._send_json(503, {"error": "server busy"})
+                return
+            latency = self.state.base_latency + self.state.per_request_latency * (in_flight - 1)
+            time.sleep(max(0.0, latency * random.uniform(1 - self.state.jitter, 1 + self.state.jitter)))
+            if self.path == "/api/embeddings":
+                self._send_json(200, {"embedding": stub_embedding(body.get("prompt", ""))})
+            elif self.path == "/api/generate":
+                prompt = body.get("prompt", "")
+                batch_ids = BATCH_ID_PATTERN.findall(prompt)
+                if batch_ids:
+                    # Batched extraction prompt: one entry per resume id
+                    result = {"resumes": [{"resume_id": resume_id, **STUB_RESUME} for resume_id in batch_ids]}
+                elif "job description" in prompt.lower():
+                    result = STUB_JD_SUMMARY
+                else:
+                    result = STUB_RESUME
+                self._send_json(200, {"response": json.dumps(result)})
+            else:
+                self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+        finally:
+            self.state.leave()
+
+
+def make_stub_server(host: str, port: int, state: StubState) -> ThreadingHTTPServer:
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Ollama server with load-dependent latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--base-latency", type=float, default=0.2, help="Seconds per request with nothing else in flight")
+    parser.add_argument("--per-request-latency", type=float, default=0.1, help="Extra seconds per other in-flight request")
+    parser.add_argument("--capacity", type=int, default=8, help="Requests in flight beyond this get HTTP 503")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Random +/- fraction applied to each latency")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS),
+                        help="Comma-separated models listed by /api/tags (e.g. only the embedding model)")
+    args = parser.parse_args()
+    models = tuple(name.strip() for name in args.models.split(",") if name.strip())
+    stub_state = StubState(args.base_latency, args.per_request_latency, args.capacity, args.jitter, models)
+    print(f"Stub Ollama listening on http://{args.host}:{args.port}")
+    make_stub_server(args.host, args.port, stub_state).serve_forever()
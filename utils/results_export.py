@@ -0,0 +1,193 @@
+import os
+import re
+import csv
+import gzip
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.db_manager import DBManager
+from utils.skills import normalize_skills
+from config import EXPORT_BATCH_ROWS
+
+try:
+    import pyarrow as pa  # optional: Parquet export
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+SKILL_LIST_SEPARATOR = ";"
+# Symbols that tell skills apart ("c", "c++", "c#", ".net") get a fixed spelling in column names
+SKILL_NAME_SYMBOLS = {"+": "plus", "#": "sharp", ".": "dot"}
+# (column, SQL expression, Arrow type name) for every exported row; one row per (JD, resume) match
+EXPORT_COLUMNS: Tuple[Tuple[str, str, str], ...] = (
+    ("match_id", "m.id", "int64"),
+    ("jd_id", "m.job_description_id", "int64"),
+    ("job_title", "json_extract(j.summary_json, '$.job_title')", "string"),
+    ("resume_id", "r.id", "int64"),
+    ("candidate_name", "r.candidate_name", "string"),
+    ("email", "r.email", "string"),
+    ("phone", "r.phone", "string"),
+    ("resume_file_path", "r.resume_file_path", "string"),
+    ("experience_years", "e.years", "float64"),
+    ("match_score", "m.match_score", "float64"),
+    ("semantic_score", "m.semantic_score", "float64"),
+    ("skill_coverage_score", "m.skill_coverage_score", "float64"),
+    ("skill_overlap_score", "m.skill_overlap_score", "float64"),
+    ("experience_score", "m.experience_score", "float64"),
+    ("education_score", "m.education_score", "float64"),
+    ("status", "m.status", "string"),
+    ("interview_datetime", "m.interview_datetime", "string"),
+    ("created_at", "m.created_at", "string"),
+    ("updated_at", "m.updated_at", "string"),
+)
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+def skill_column_name(skill: str) -> str:
+    spelled = re.sub(r"[+#.]", lambda match: f"_{SKILL_NAME_SYMBOLS[match.group(0)]}_", skill.lower())
+    return "skill_" + (re.sub(r"[^a-z0-9]+", "_", spelled).strip("_") or "x")
+
+
+def skill_column_names(skills: Sequence[str]) -> List[str]:
+    """Unique column names for `skills`, in order; names that still collide get a numeric suffix."""
+    names: List[str] = []
+    used = {name for name, _, _ in EXPORT_COLUMNS} | {"skills"}
+    for skill in skills:
+        base = name = skill_column_name(skill)
+        suffix = 2
+        while name in used:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        used.add(name)
+        names.append(name)
+    return names
+
+
+class ResultsExporter:
+    """
+    Streams match results (JD, candidate, scores, status) out of SQLite in batches of `batch_rows`, so
+    exporting millions of rows never holds more than one batch in memory. Rows come in matches.id order
+    (a rowid scan, no sort). Optional skill data is flattened from resume_skills: a `skills` column with
+    the resume's normalized skills joined by ';', and/or one 0/1 column per requested skill.
+    """
+
+    def __init__(self, db_manager: DBManager, batch_rows: int = EXPORT_BATCH_ROWS):
+        self.db_manager = db_manager
+        self.batch_rows = max(1, batch_rows)
+
+    def top_skills(self, limit: int, jd_ids: Optional[Sequence[int]] = None) -> List[str]:
+        """The `limit` skills held by the most matched resumes (of `jd_ids`, if given)."""
+        query = "SELECT s.skill FROM resume_skills s"
+        params: List[Any] = []
+        if jd_ids:
+            query += f" WHERE s.resume_id IN (SELECT resume_id FROM matches WHERE job_description_id IN ({','.join('?' * len(jd_ids))}))"
+            params.extend(jd_ids)
+        query += " GROUP BY s.skill ORDER BY COUNT(*) DESC, s.skill LIMIT ?"
+        params.append(limit)
+        return [row[0] for row in self.db_manager.fetch_all(query, tuple(params))]
+
+    def columns(self, include_skill_list: bool = False, skill_columns: Sequence[str] = ()) -> List[Tuple[str, str]]:
+        """(name, Arrow type name) of the exported columns, in order."""
+        columns = [(name, arrow_type) for name, _, arrow_type in EXPORT_COLUMNS]
+        if include_skill_list:
+            columns.append(("skills", "string"))
+        columns.extend((name, "int8") for name in skill_column_names(skill_columns))
+        return columns
+
+    def iter_batches(self, jd_ids: Optional[Sequence[int]] = None, status: Optional[str] = None,
+                     include_skill_list: bool = False, skill_columns: Sequence[str] = ()) -> Iterator[List[tuple]]:
+        """Yields lists of up to batch_rows row tuples, in the order of columns()."""
+        select = [expression for _, expression, _ in EXPORT_COLUMNS]
+        params: List[Any] = []
+        if include_skill_list:
+            select.append(f"(SELECT group_concat(skill, '{SKILL_LIST_SEPARATOR}') FROM resume_skills WHERE resume_id = r.id)")
+        for skill in skill_columns:
+            # Primary key lookup on resume_skills (resume_id, skill)
+            select.append("EXISTS (SELECT 1 FROM resume_skills WHERE resume_id = r.id AND skill = ?)")
+            params.append(skill)
+        query = f"""
+        SELECT {', '.join(select)}
+        FROM matches m
+        JOIN resumes r ON r.id = m.resume_id
+        JOIN job_descriptions j ON j.id = m.job_description_id
+        LEFT JOIN resume_experience e ON e.resume_id = r.id
+        """
+        conditions = []
+        if jd_ids:
+            conditions.append(f"m.job_description_id IN ({','.join('?' * len(jd_ids))})")
+            params.extend(jd_ids)
+        if status:
+            conditions.append("m.status = ?")
+            params.append(status)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY m.id"
+
+        cursor = self.db_manager.conn.cursor()
+        try:
+            cursor.execute(query, tuple(params))
+            while True:
+                rows = cursor.fetchmany(self.batch_rows)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def export(self, path: str, file_format: Optional[str] = None, jd_ids: Optional[Sequence[int]] = None,
+               status: Optional[str] = None, include_skill_list: bool = False, skill_columns: Sequence[str] = (),
+               top_skills: int = 0) -> Dict[str, Any]:
+        """
+        Writes the results to `path` as Parquet (one row group per batch) or CSV (`.csv.gz` is gzipped).
+        The format follows the extension unless `file_format` is given. Returns rows written and columns.
+        """
+        file_format = (file_format or ("parquet" if path.lower().endswith(".parquet") else "csv")).lower()
+        if file_format == "parquet" and not parquet_available():
+            raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow); or export to .csv")
+        skills = normalize_skills(skill_columns)
+        if top_skills > 0:
+            skills += [skill for skill in self.top_skills(top_skills, jd_ids) if skill not in skills]
+        columns = self.columns(include_skill_list, skills)
+        batches = self.iter_batches(jd_ids, status, include_skill_list, skills)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Written to a temp file and renamed, so readers never see a half-written export
+        temp_path = f"{path}.tmp"
+        try:
+            rows_written = (self._write_parquet if file_format == "parquet" else self._write_csv)(temp_path, path, columns, batches)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        logger.info(f"Exported {rows_written} match rows ({len(columns)} columns) to {path} as {file_format}.")
+        return {"rows": rows_written, "columns": [name for name, _ in columns], "path": path, "format": file_format}
+
+    @staticmethod
+    def _write_csv(temp_path: str, path: str, columns: List[Tuple[str, str]], batches: Iterator[List[tuple]]) -> int:
+        opener = gzip.open if path.lower().endswith(".gz") else open
+        rows_written = 0
+        with opener(temp_path, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in columns])
+            for rows in batches:
+                writer.writerows(rows)
+                rows_written += len(rows)
+        return rows_written
+
+    @staticmethod
+    def _write_parquet(temp_path: str, path: str, columns: List[Tuple[str, str]], batches: Iterator[List[tuple]]) -> int:
+        schema = pa.schema([(name, getattr(pa, arrow_type)()) for name, arrow_type in columns])
+        rows_written = 0
+        with pq.ParquetWriter(temp_path, schema) as writer:
+            for rows in batches:
+                arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                rows_written += len(rows)
+        return rows_written
@@ -0,0 +1,217 @@
+import re
+import logging
+from datetime import date
+from typing import Optional, Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
+# Accepts things like "+1 (555) 123-4567", "+91 98765 43210", "555.123.4567"
+PHONE_PATTERN = re.compile(r"(?<!\w)(\+?\d{1,3}[\s.\-]?)?(\(?\d{2,4}\)?[\s.\-]?){2,4}\d{2,4}(?!\w)")
+MIN_PHONE_DIGITS = 7
+MAX_PHONE_DIGITS = 15
+NAME_SCAN_LINES = 8  # Names are almost always in the first few lines of a CV
+
+# Canonical section name -> header aliases as they appear in CVs (compared lowercased, without trailing ':')
+SECTION_HEADERS: Dict[str, List[str]] = {
+    "skills": ["skills", "technical skills", "key skills", "core skills", "skill set", "skillset",
+               "core competencies", "competencies", "technologies", "tools & technologies",
+               "tools and technologies", "technical proficiencies"],
+    "experience": ["experience", "work experience", "professional experience", "employment history",
+                   "work history", "career history", "employment", "professional background"],
+    "education": ["education", "academic background", "academic qualifications", "qualifications",
+                  "educational qualifications", "academics", "education & training"],
+    "projects": ["projects", "key projects", "personal projects", "academic projects"],
+    "summary": ["summary", "profile", "professional summary", "career objective", "objective", "about me"],
+    "certifications": ["certifications", "certificates", "licenses & certifications", "courses"],
+}
+_HEADER_LOOKUP = {alias: section for section, aliases in SECTION_HEADERS.items() for alias in aliases}
+MAX_HEADER_LENGTH = 40
+
+# Words that show up in the first lines of a CV but are never part of a name
+_NON_NAME_WORDS = {"resume", "curriculum", "vitae", "cv", "profile", "email", "phone", "mobile",
+                   "address", "linkedin", "github", "contact", "objective", "summary"}
+# Job title words - a headline like "Senior Software Engineer" or "Data Scientist" is not a name
+_JOB_TITLE_WORDS = {"engineer", "developer", "scientist", "analyst", "manager", "consultant", "architect",
+                    "designer", "administrator", "specialist", "intern", "lead", "senior", "junior", "principal",
+                    "software", "data", "full", "stack", "frontend", "backend", "devops", "director", "officer",
+                    "executive", "associate", "assistant", "technician", "programmer", "tester", "qa",
+                    "researcher", "student", "graduate", "professional", "head", "coordinator", "expert"}
+# Default document authors set by office suites and converters, never the candidate
+_GENERIC_AUTHORS = {"microsoft office user", "microsoft account", "office user", "user", "admin", "administrator",
+                    "owner", "author", "unknown", "windows user", "resume", "cv", "hp", "dell", "lenovo"}
+
+# Fields the LLM would otherwise be asked for, and what counts as "found" for each
+CORE_FIELDS = ["candidate_name", "email", "phone", "skills", "experience_summary", "education", "projects"]
+# Minimum fields the heuristics must fill before the LLM call can be skipped entirely
+REQUIRED_FOR_LLM_SKIP = ["candidate_name", "email", "skills", "experience_summary", "education"]
+MAX_EXPERIENCE_SUMMARY_CHARS = 500
+# "Jan 2019 - Mar 2021", "2018 – Present", "06/2020 - current" in the Experience section
+DATE_RANGE_PATTERN = re.compile(
+    r"(?:(\d{1,2})/|([A-Za-z]{3,9})\.?\s+)?((?:19|20)\d{2})\s*(?:-|–|—|to)\s*"
+    r"(?:(?:(\d{1,2})/|([A-Za-z]{3,9})\.?\s+)?((?:19|20)\d{2})|(present|current|now|date|today))",
+    re.IGNORECASE)
+_MONTHS = {name: index for index, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+
+
+def extract_email(text: str) -> Optional[str]:
+    match = EMAIL_PATTERN.search(text or "")
+    return match.group(0).rstrip(".").lower() if match else None
+
+
+def extract_phone(text: str) -> Optional[str]:
+    for match in PHONE_PATTERN.finditer(text or ""):
+        candidate = match.group(0).strip()
+        digits = re.sub(r"\D", "", candidate)
+        # Skip date ranges like "2019 - 2021" and other short digit runs
+        if MIN_PHONE_DIGITS <= len(digits) <= MAX_PHONE_DIGITS and not re.fullmatch(r"(19|20)\d{2}\D+(19|20)\d{2}", candidate):
+            return candidate
+    return None
+
+
+def _looks_like_name(line: str) -> bool:
+    if not line or len(line) > 50 or any(ch.isdigit() for ch in line) or "@" in line:
+        return False
+    words = line.replace(",", " ").split()
+    if not 2 <= len(words) <= 4:
+        return False
+    if any(word.lower().strip(".:") in _NON_NAME_WORDS | _JOB_TITLE_WORDS for word in words):
+        return False
+    if normalize_header(line) in _HEADER_LOOKUP:
+        return False
+    # Every word should start with a capital letter (ALL CAPS names are common too)
+    return all(word[0].isupper() and re.fullmatch(r"[A-Za-z.'\-]+", word) for word in words)
+
+
+def extract_name(text: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    for line in (text or "").splitlines()[:NAME_SCAN_LINES * 3]:
+        line = line.strip()
+        if not line:
+            continue
+        # "Name: Jane Doe" style label
+        labelled = re.match(r"^name\s*[:\-]\s*(.+)$", line, re.IGNORECASE)
+        if labelled and _looks_like_name(labelled.group(1).strip()):
+            return labelled.group(1).strip().title()
+        if _looks_like_name(line):
+            return line.title() if line.isupper() else line
+    author = str((metadata or {}).get("author") or "").strip()
+    if author and author.lower() not in _GENERIC_AUTHORS and _looks_like_name(author):
+        return author
+    return None
+
+
+def _month_index(number: Optional[str], name: Optional[str], default: int) -> int:
+    if number and 1 <= int(number) <= 12:
+        return int(number)
+    return _MONTHS.get((name or "")[:3].lower(), default)
+
+
+def experience_years(section_text: str, today: Optional[date] = None) -> Optional[float]:
+    """Total years covered by the date ranges of an Experience section (overlapping jobs counted once)."""
+    today = today or date.today()
+    spans = []
+    for match in DATE_RANGE_PATTERN.finditer(section_text or ""):
+        start = int(match.group(3)) * 12 + _month_index(match.group(1), match.group(2), 1) - 1
+        if match.group(7):
+            end = today.year * 12 + today.month - 1
+        else:
+            end = int(match.group(6)) * 12 + _month_index(match.group(4), match.group(5), 12) - 1
+        if start <= end <= today.year * 12 + today.month - 1:
+            spans.append((start, end + 1))
+    if not spans:
+        return None
+    months, covered_until = 0, 0
+    for start, end in sorted(spans):
+        months += max(0, end - max(start, covered_until))
+        covered_until = max(covered_until, end)
+    return round(months / 12, 1)
+
+
+def normalize_header(line: str) -> str:
+    return re.sub(r"\s+", " ", line.strip().strip(":").strip()).lower()
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """
+    Splits resume text into canonical sections keyed by name ("skills", "experience", "education", ...).
+    Text before the first recognised header is returned under "header".
+    """
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    for raw_line in (text or "").splitlines():
+        line = raw_line.strip()
+        header_key = normalize_header(line) if len(line) <= MAX_HEADER_LENGTH else ""
+        if header_key in _HEADER_LOOKUP:
+            current = _HEADER_LOOKUP[header_key]
+            sections.setdefault(current, [])
+            continue
+        # "Skills: Python, SQL" puts the header and content on one line
+        inline = re.match(r"^([A-Za-z &]{3,40}):\s*(.+)$", line)
+        if inline and normalize_header(inline.group(1)) in _HEADER_LOOKUP:
+            current = _HEADER_LOOKUP[normalize_header(inline.group(1))]
+            sections.setdefault(current, []).append(inline.group(2))
+            continue
+        sections.setdefault(current, []).append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items() if "\n".join(lines).strip()}
+
+
+def parse_skills(skills_text: str) -> List[str]:
+    skills: List[str] = []
+    seen = set()
+    for part in re.split(r"[,;|\n•●▪–]|\s-\s|\s{3,}", skills_text or ""):
+        # Drop category prefixes like "Languages: Python"
+        skill = part.split(":", 1)[-1].strip(" \t*-•.")
+        if 1 < len(skill) <= 40 and skill.lower() not in seen:
+            seen.add(skill.lower())
+            skills.append(skill)
+    return skills
+
+
+def _parse_entries(section_text: str) -> List[str]:
+    return [line.strip(" \t*-•") for line in (section_text or "").splitlines() if len(line.strip(" \t*-•")) > 2]
+
+
+def extract_resume_fields(text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Deterministic extraction of the fields the LLM prompt asks for.
+    Only fields that were actually found are present in the returned dict.
+    """
+    sections = split_sections(text)
+    header_text = sections.get("header", "")
+    fields: Dict[str, Any] = {}
+
+    name = extract_name(header_text or text, metadata)
+    if name:
+        fields["candidate_name"] = name
+    email = extract_email(header_text) or extract_email(text)
+    if email:
+        fields["email"] = email
+    phone = extract_phone(header_text) or extract_phone(text)
+    if phone:
+        fields["phone"] = phone
+
+    skills = parse_skills(sections.get("skills", ""))
+    if skills:
+        fields["skills"] = skills
+    experience = sections.get("experience", "")
+    years = experience_years(experience)
+    # Without dates the section text says nothing about total experience; the LLM is asked for the summary
+    if years is not None:
+        summary = f"{years:g} years of experience. " + re.sub(r"\s+", " ", experience)
+        fields["experience_summary"] = summary[:MAX_EXPERIENCE_SUMMARY_CHARS]
+    education = _parse_entries(sections.get("education", ""))
+    if education:
+        fields["education"] = education
+    projects = _parse_entries(sections.get("projects", ""))
+    if projects:
+        fields["projects"] = projects
+    return fields
+
+
+def missing_fields(fields: Dict[str, Any]) -> List[str]:
+    return [field for field in CORE_FIELDS if not fields.get(field)]
+
+
+def is_complete_enough(fields: Dict[str, Any]) -> bool:
+    return all(fields.get(field) for field in REQUIRED_FOR_LLM_SKIP)
@@ -0,0 +1,82 @@
+import re
+import json
+import sqlite3
+import logging
+from typing import Optional, Dict, List, Any
+
+from utils.skills import normalize_skill
+
+logger = logging.getLogger(__name__)
+
+# "5 years", "3+ yrs", "2.5 years" - the largest figure in the summary is taken as total experience
+EXPERIENCE_YEARS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+# Degree patterns per level (0 school .. 4 doctorate); when several match, the highest level counts
+EDUCATION_LEVELS = (
+    (4, re.compile(r"\b(ph\.?\s?d|doctor(?:ate|al)?)(?![a-z])", re.IGNORECASE)),
+    (3, re.compile(r"\b(master'?s?|m(?:\.\s?)?(?:sc|s|a|tech)|m\.\s?e|mba|mca)(?![a-z])", re.IGNORECASE)),
+    (2, re.compile(r"\b(bachelor'?s?|b(?:\.\s?)?(?:sc|s|a|tech)|b\.\s?e|bca|undergraduate)(?![a-z])", re.IGNORECASE)),
+    (1, re.compile(r"\b(diploma|associate'?s?)(?![a-z])", re.IGNORECASE)),
+    (0, re.compile(r"\b(high school|secondary|12th|hsc)(?![a-z])", re.IGNORECASE)),
+)
+
+
+def parse_experience_years(experience_summary: Optional[str]) -> Optional[float]:
+    years = [float(match) for match in EXPERIENCE_YEARS_PATTERN.findall(str(experience_summary or ""))]
+    return max(years) if years else None
+
+
+def education_level(value: Any) -> Optional[int]:
+    """Highest education level mentioned (0 school .. 4 doctorate) in a string or list of strings."""
+    texts = value if isinstance(value, list) else [value]
+    levels = [level for text in texts if text for level, pattern in EDUCATION_LEVELS if pattern.search(str(text))]
+    return max(levels) if levels else None
+
+
+def _as_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item or "").strip()]
+    if isinstance(value, str) and value.strip():
+        return [value.strip()]
+    return []
+
+
+def index_resume(cursor: sqlite3.Cursor, resume_id: int, resume_data: Optional[Dict[str, Any]], fts_enabled: bool = True):
+    """
+    (Re)writes the search rows of one resume: normalized skills, education entries, experience and the
+    FTS5 document. Runs on the caller's cursor so it is part of the same transaction as the resume upsert.
+    """
+    cursor.execute("DELETE FROM resume_skills WHERE resume_id = ?", (resume_id,))
+    cursor.execute("DELETE FROM resume_education WHERE resume_id = ?", (resume_id,))
+    cursor.execute("DELETE FROM resume_experience WHERE resume_id = ?", (resume_id,))
+    if fts_enabled:
+        cursor.execute("DELETE FROM resume_fts WHERE rowid = ?", (resume_id,))
+    if not resume_data:
+        return
+
+    raw_skills = _as_list(resume_data.get("skills"))
+    skill_rows: Dict[str, str] = {}
+    for raw_skill in raw_skills:
+        skill = normalize_skill(raw_skill)
+        if skill:
+            skill_rows.setdefault(skill, raw_skill)
+    cursor.executemany("INSERT INTO resume_skills (resume_id, skill, raw_skill) VALUES (?, ?, ?)",
+                       [(resume_id, skill, raw_skill) for skill, raw_skill in skill_rows.items()])
+
+    education = _as_list(resume_data.get("education"))
+    cursor.executemany("INSERT INTO resume_education (resume_id, position, entry, level) VALUES (?, ?, ?, ?)",
+                       [(resume_id, position, entry, education_level(entry)) for position, entry in enumerate(education)])
+
+    experience_summary = resume_data.get("experience_summary")
+    if experience_summary is not None and not isinstance(experience_summary, str):
+        experience_summary = json.dumps(experience_summary)
+    # Every indexed resume gets an experience row; create_tables uses it to find resumes still to backfill
+    cursor.execute("INSERT INTO resume_experience (resume_id, summary, years) VALUES (?, ?, ?)",
+                   (resume_id, experience_summary, parse_experience_years(experience_summary)))
+
+    if fts_enabled:
+        cursor.execute("""
+        INSERT INTO resume_fts (rowid, candidate_name, skills, experience, education, projects)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """, (resume_id, resume_data.get("candidate_name"),
+              ", ".join(raw_skills + [skill for skill in skill_rows if skill not in raw_skills]),
+              experience_summary, "; ".join(education), "; ".join(_as_list(resume_data.get("projects")))))
@@ -0,0 +1,468 @@
+import os
+import re
+import json
+import time
+import logging
+import statistics
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from utils.db_manager import DBManager
+from utils.checkpoints import STAGE_JD_SUMMARY, STAGE_RESUME_EXTRACT, STAGE_RESUME_MATCH, STAGE_SHORTLIST, STAGE_SCHEDULE
+from utils.hashing import text_hash, file_hash
+from utils.file_parser import parse_resume, extract_document_metadata
+from utils.llm_cache import LLMCacheReader, request_key
+from utils.ollama_client import completion_payload, embedding_payload
+from utils.ollama_pool import ENDPOINT_GENERATE, ENDPOINT_EMBEDDINGS
+from utils.embedding_store import embedding_key
+from utils.near_duplicates import NearDuplicateDetector
+from utils.extraction_batches import BatchItem, pack_batches, parse_batch_response
+from utils.skills import normalize_skills
+from agents.jd_summarizer_agent import build_summary_prompt, apply_summary_defaults
+from agents.resume_matcher_agent import (
+    is_resume_file, jd_embedding_text, resume_embedding_text, plan_extraction, build_extraction_prompt,
+    build_batch_extraction_prompt, compact_for_extraction, merge_extraction, apply_extraction_defaults, valid_batch_entry
+)
+from config import (
+    RESUMES_DIR, OLLAMA_LLM_MODEL, OLLAMA_EMBEDDING_MODEL, OLLAMA_CACHE_ENABLED, OLLAMA_CACHE_PATH, OLLAMA_CACHE_TTL_HOURS,
+    ENABLE_EMBEDDING_STORE, EMBEDDING_STORE_DIR, ENABLE_SKILL_COVERAGE, ENABLE_NEAR_DUPLICATE_DETECTION,
+    RESUME_EXTRACTION_BATCH_SIZE, RESUME_BATCH_TOKEN_BUDGET, RESUME_WORKERS, SHORTLIST_THRESHOLD,
+    INTERVIEW_AVAILABILITY_FILE, ENABLE_EMAIL_SENDING
+)
+
+logger = logging.getLogger(__name__)
+
+# Used when the LLM cache holds no recorded latencies for the configured models
+DEFAULT_LATENCY_SECONDS = {ENDPOINT_GENERATE: 10.0, ENDPOINT_EMBEDDINGS: 0.5}
+# DB write transactions per pipeline step, as issued by the agents
+WRITES_JD_SUMMARY = 3       # job_descriptions row, checkpoint, log
+WRITES_EXTRACTION = 1       # resume_extract checkpoint
+WRITES_MATCH = 4            # candidate upsert, score update, log, resume_match checkpoint
+WRITES_RESUME_ERROR = 2     # parse warning log, error candidate row
+WRITES_INVALIDATE = 2       # shortlist and schedule checkpoints cleared
+WRITES_SHORTLIST = 3        # status update, log, checkpoint (plus one log per shortlisted candidate)
+WRITES_INVITATION = 2       # status update, log
+WRITES_EMPTY_SHORTLIST = 1  # checkpoint
+WRITES_EMPTY_SCHEDULE = 2   # log, checkpoint
+
+
+class _DryRunSignatures:
+    """
+    Stands in for DBManager inside NearDuplicateDetector: reads the real signature tables plus the
+    signatures this run would add; writes are only counted.
+    """
+
+    def __init__(self, db_manager: DBManager, counts: Counter):
+        self.db_manager = db_manager
+        self.counts = counts
+        self.rows: Dict[str, tuple] = {}
+        self.buckets: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+
+    def get_resume_signature(self, content_hash: str) -> Optional[tuple]:
+        row = self.rows.get(content_hash)
+        return row[:5] if row else self.db_manager.get_resume_signature(content_hash)
+
+    def get_lsh_candidates(self, buckets: List[int]) -> List[tuple]:
+        rows = {row[0]: row for row in self.db_manager.get_lsh_candidates(buckets)}
+        for band, bucket in enumerate(buckets):
+            for content_hash in self.buckets.get((band, bucket), ()):
+                row = self.rows[content_hash]
+                rows[content_hash] = row[:4] + row[5:]
+        return list(rows.values())
+
+    def add_resume_signature(self, content_hash: str, resume_file_path: str, signature: bytes, buckets: List[int],
+                             duplicate_of: Optional[str] = None, similarity: Optional[float] = None,
+                             email: Optional[str] = None, phone: Optional[str] = None):
+        self.rows[content_hash] = (content_hash, resume_file_path, signature, duplicate_of, similarity, email, phone)
+        for band, bucket in enumerate(buckets):
+            self.buckets[(band, bucket)].add(content_hash)
+        self.counts["db_writes"] += 1
+
+    def update_resume_signature_path(self, content_hash: str, resume_file_path: str):
+        row = self.rows.get(content_hash) or tuple(self.db_manager.get_resume_signature(content_hash)) + (None, None)
+        self.rows[content_hash] = (content_hash, resume_file_path) + tuple(row[2:])
+        self.counts["db_writes"] += 1
+
+    def add_log(self, agent_name: str, level: str, message: str):
+        self.counts["db_writes"] += 1
+
+
+class RunPlanner:
+    """
+    Dry run of `python main.py run` (optionally with --resume): walks the JD CSV and RESUMES_DIR the way the
+    pipeline would and counts resume parses, LLM completions, embeddings, DB writes and emails, without calling
+    Ollama or writing anything. Answers already in the LLM cache, embedding store, skill vocabulary and
+    checkpoints are counted as reused, as are answers the run itself would cache before needing them again.
+    Where a count depends on LLM output that is not known yet (skills of a new extraction, which candidates
+    pass the shortlist threshold), the part that could not be counted exactly is reported separately.
+    """
+
+    def __init__(self, db_manager: DBManager, resume: bool = False, resumes_dir: str = RESUMES_DIR):
+        self.db_manager = db_manager
+        self.resume = resume
+        self.resumes_dir = resumes_dir
+        self.counts: Counter = Counter()
+        self.estimated: Counter = Counter()  # expected values of counts that depend on unknown LLM output
+        self.cache = LLMCacheReader(OLLAMA_CACHE_PATH, OLLAMA_CACHE_TTL_HOURS * 3600) if OLLAMA_CACHE_ENABLED else None
+        self._run_cached: Set[str] = set()  # request keys the run would have cached by the time they repeat
+        self._stored_embeddings = self._embedding_store_ids() if ENABLE_EMBEDDING_STORE else None
+        self._skills: Set[str] = {skill for skill, _ in db_manager.get_skill_embeddings(OLLAMA_EMBEDDING_MODEL)}
+        self._signatures = _DryRunSignatures(db_manager, self.counts)
+        self.duplicate_detector = NearDuplicateDetector(self._signatures) if ENABLE_NEAR_DUPLICATE_DETECTION else None
+        self._unknown_embedded: Set[str] = set()  # resume file hashes whose (unknown) embedding input the run would cache
+        self._texts: Dict[str, Optional[str]] = {}
+        self._parse_seconds: List[float] = []
+        self._shortlist_rate = self._historical_shortlist_rate()
+
+    # --- Reuse lookups ---
+    @staticmethod
+    def _embedding_store_ids() -> Set[str]:
+        # Read the ids directly: opening EmbeddingMatrixStore would create the directory
+        directory = os.path.join(EMBEDDING_STORE_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "_", OLLAMA_EMBEDDING_MODEL))
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return set()
+        with open(meta_path, "r", encoding="utf-8") as f:
+            ids_bytes = json.load(f)["ids_bytes"]
+        with open(os.path.join(directory, "ids.txt"), "rb") as f:
+            return set(f.read(ids_bytes).decode("utf-8").splitlines())
+
+    def _historical_shortlist_rate(self) -> Optional[float]:
+        total, passed = self.db_manager.fetch_one(
+            "SELECT COUNT(*), SUM(match_score >= ?) FROM matches WHERE match_score IS NOT NULL", (SHORTLIST_THRESHOLD,))
+        return (passed or 0) / total if total else None
+
+    def _request(self, endpoint: str, payload: Dict[str, Any], counter: str) -> Tuple[bool, Optional[Any]]:
+        """Counts one Ollama call. Returns (answered_without_ollama, cached response if it is known)."""
+        key = request_key(endpoint, payload)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            self.counts[f"{counter}_reused"] += 1
+            return True, cached
+        if key in self._run_cached:
+            self.counts[f"{counter}_reused"] += 1
+            return True, None
+        self.counts[counter] += 1
+        if self.cache:
+            self._run_cached.add(key)
+        return False, None
+
+    def _completion(self, prompt: str, counter: str) -> Optional[Any]:
+        _, cached = self._request(ENDPOINT_GENERATE, completion_payload(prompt, OLLAMA_LLM_MODEL, format_json=True), counter)
+        if isinstance(cached, str):
+            try:
+                return json.loads(cached)
+            except json.JSONDecodeError:
+                return None
+        return cached
+
+    def _embedding(self, text: str, counter: str = "embeddings"):
+        self._request(ENDPOINT_EMBEDDINGS, embedding_payload(text, OLLAMA_EMBEDDING_MODEL), counter)
+
+    def _resume_embedding(self, text: str):
+        if self._stored_embeddings is None:
+            self._embedding(text, "resume_embeddings")
+            return
+        key = embedding_key(text)
+        if key in self._stored_embeddings:
+            self.counts["resume_embeddings_reused"] += 1
+            return
+        self._embedding(text, "resume_embeddings")
+        self._stored_embeddings.add(key)
+
+    def _ensure_skills(self, skills: List[str]) -> List[str]:
+        normalized = normalize_skills(skills)
+        new_skills = [skill for skill in normalized if skill not in self._skills]
+        for skill in new_skills:
+            self._embedding(skill, "skill_embeddings")
+            self._skills.add(skill)
+        if new_skills:
+            self.counts["db_writes"] += 1
+        return normalized
+
+    def _parse(self, path: str) -> Optional[str]:
+        self.counts["parses"] += 1
+        if path not in self._texts:
+            started = time.perf_counter()
+            self._texts[path] = parse_resume(path)
+            self._parse_seconds.append(time.perf_counter() - started)
+        return self._texts[path]
+
+    # --- Pipeline walk ---
+    def _summarize_jd(self, jd: Dict[str, Any]) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+        """(jd_id if the run would reuse a stored JD, summary if it is known without calling Ollama)."""
+        jd_key = text_hash(jd["raw_text"])
+        if self.resume:
+            checkpoint = self.db_manager.get_checkpoint(STAGE_JD_SUMMARY, jd_key=jd_key)
+            jd_row = self.db_manager.get_job_description_by_id(checkpoint["jd_id"]) if checkpoint else None
+            if jd_row and isinstance(jd_row[2], dict):
+                self.counts["jd_summaries_reused"] += 1
+                return jd_row[0], jd_row[2]
+        response = self._completion(build_summary_prompt(jd["raw_text"]), "jd_summaries")
+        self.counts["db_writes"] += WRITES_JD_SUMMARY
+        summary = apply_summary_defaults(response) if isinstance(response, dict) else None
+        return None, summary
+
+    def _drop_near_duplicates(self, paths: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        # Mirrors ResumeMatcherAgent._drop_near_duplicates against the dry-run signature tables
+        if self.duplicate_detector is None:
+            return paths, {}
+        kept, parsed_texts = [], {}
+        for path in paths:
+            resume_key = file_hash(path) or ""
+            if not resume_key:
+                kept.append(path)
+                continue
+            known, match = self.duplicate_detector.lookup(resume_key, path)
+            if known:
+                if match:
+                    self.counts["near_duplicates_skipped"] += 1
+                else:
+                    kept.append(path)
+                continue
+            raw_text = self._parse(path)
+            if raw_text and self.duplicate_detector.check(resume_key, path, raw_text):
+                self.counts["near_duplicates_skipped"] += 1
+                continue
+            kept.append(path)
+            if raw_text:
+                parsed_texts[path] = raw_text
+        return kept, parsed_texts
+
+    def _extract_batch(self, batch: List[BatchItem], inputs: Dict[str, Tuple[str, Dict[str, Any]]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        # Mirrors ResumeMatcherAgent._extract_batch: retries are only known when the batch answer is cached
+        if len(batch) == 1:
+            resume_text, heuristic_data = inputs[batch[0].key]
+            response = self._completion(build_extraction_prompt(resume_text, batch[0].fields), "extractions")
+            return {batch[0].key: merge_extraction(response, heuristic_data, os.path.basename(batch[0].key))
+                    if isinstance(response, dict) else None}
+        response = self._completion(build_batch_extraction_prompt(batch), "extractions")
+        if response is None:
+            return {item.key: None for item in batch}
+        entries = parse_batch_response(response, [item.resume_id for item in batch])
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        retry = []
+        for item in batch:
+            resume_text, heuristic_data = inputs[item.key]
+            entry = entries.get(item.resume_id)
+            if entry is None or not valid_batch_entry(entry, item, resume_text):
+                retry.append(item)
+                continue
+            results[item.key] = merge_extraction(entry, heuristic_data, os.path.basename(item.key))
+        if retry:
+            self.counts["db_writes"] += 1  # retry log
+            parts = [retry] if len(retry) < len(batch) else [retry[:len(retry) // 2], retry[len(retry) // 2:]]
+            for part in parts:
+                results.update(self._extract_batch(part, inputs))
+        return results
+
+    def _extract_batched(self, jd_id: Optional[int], paths: List[str], parsed_texts: Dict[str, str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Mirrors ResumeMatcherAgent._prepare_resumes_batched; values are None when the extraction output is not known yet."""
+        pending: List[BatchItem] = []
+        inputs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        prepared: Dict[str, Optional[Dict[str, Any]]] = {}
+        for path in paths:
+            resume_key = file_hash(path) or ""
+            if resume_key and self.resume and (
+                    (jd_id is not None and self.db_manager.get_checkpoint(STAGE_RESUME_MATCH, jd_key=str(jd_id), resume_key=resume_key) is not None)
+                    or self.db_manager.get_checkpoint(STAGE_RESUME_EXTRACT, resume_key=resume_key) is not None):
+                continue
+            raw_text = parsed_texts.get(path) or self._parse(path)
+            if not raw_text:
+                continue
+            filename = os.path.basename(path)
+            heuristic_data, fields_to_extract = plan_extraction(raw_text, filename, extract_document_metadata(path))
+            self.counts["db_writes"] += WRITES_EXTRACTION
+            if not fields_to_extract:
+                prepared[path] = apply_extraction_defaults(heuristic_data, filename)
+                continue
+            inputs[path] = (raw_text, heuristic_data)
+            pending.append(BatchItem(path, f"r{len(pending) + 1}", compact_for_extraction(raw_text, fields_to_extract), fields_to_extract))
+        for batch in pack_batches(pending, RESUME_BATCH_TOKEN_BUDGET, RESUME_EXTRACTION_BATCH_SIZE):
+            prepared.update(self._extract_batch(batch, inputs))
+        return prepared
+
+    def _process_resume(self, jd_id: Optional[int], jd_skills: Optional[List[str]], path: str,
+                        parsed_texts: Dict[str, str], prepared: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+        """Mirrors ResumeMatcherAgent._process_resume_for_jd. Returns True if a match would be stored."""
+        resume_key = file_hash(path) or ""
+        if self.resume and resume_key and jd_id is not None and \
+                self.db_manager.get_checkpoint(STAGE_RESUME_MATCH, jd_key=str(jd_id), resume_key=resume_key) is not None:
+            self.counts["matches_reused"] += 1
+            return False
+
+        data: Optional[Dict[str, Any]] = None
+        if path in prepared:
+            data = prepared[path]
+        else:
+            checkpoint = self.db_manager.get_checkpoint(STAGE_RESUME_EXTRACT, resume_key=resume_key) if self.resume and resume_key else None
+            if checkpoint:
+                self.counts["extractions_reused"] += 1
+                data = checkpoint
+            else:
+                raw_text = parsed_texts.get(path) or self._parse(path)
+                if not raw_text:
+                    self.counts["db_writes"] += WRITES_RESUME_ERROR
+                    return False
+                filename = os.path.basename(path)
+                heuristic_data, fields_to_extract = plan_extraction(raw_text, filename, extract_document_metadata(path))
+                if fields_to_extract:
+                    response = self._completion(build_extraction_prompt(raw_text, fields_to_extract), "extractions")
+                    data = merge_extraction(response, heuristic_data, filename) if isinstance(response, dict) else None
+                else:
+                    data = apply_extraction_defaults(heuristic_data, filename)
+                self.counts["db_writes"] += WRITES_EXTRACTION
+
+        if data is None:
+            # Extraction output not known yet: the same file gives the same embedding input for every JD
+            if resume_key in self._unknown_embedded:
+                self.counts["resume_embeddings_reused"] += 1
+            else:
+                self.counts["resume_embeddings"] += 1
+                self.counts["unknown_extractions"] += 1
+                if resume_key and (self.cache or self._stored_embeddings is not None):
+                    self._unknown_embedded.add(resume_key)
+        else:
+            embedding_text = resume_embedding_text(data)
+            if embedding_text:
+                self._resume_embedding(embedding_text)
+            # Candidate skills are only embedded when the JD has required skills to cover
+            if ENABLE_SKILL_COVERAGE and jd_skills is not None and self._ensure_skills(jd_skills):
+                self._ensure_skills(data.get("skills", []))
+        self.counts["db_writes"] += WRITES_MATCH
+        return True
+
+    def _shortlist_and_schedule(self, jd_id: Optional[int], new_matches: int):
+        """Mirrors the shortlist and schedule stages; candidates passing the threshold are estimated for new matches."""
+        if self.resume and jd_id is not None and not new_matches and \
+                self.db_manager.get_checkpoint(STAGE_SHORTLIST, jd_key=str(jd_id)) is not None:
+            return
+        matched = passing = shortlisted = 0
+        if jd_id is not None:
+            matched = self.db_manager.count_candidates_for_jd(jd_id, status='matched')
+            passing = self.db_manager.fetch_one(
+                "SELECT COUNT(*) FROM candidates WHERE job_description_id = ? AND status = 'matched' AND match_score >= ?",
+                (jd_id, SHORTLIST_THRESHOLD))[0]
+            shortlisted = self.db_manager.count_candidates_for_jd(jd_id, status='shortlisted')
+        new_passing = new_matches * (self._shortlist_rate or 0.0)
+        if matched + new_matches == 0:
+            self.counts["db_writes"] += WRITES_EMPTY_SHORTLIST
+        else:
+            self.counts["db_writes"] += WRITES_SHORTLIST + passing
+            self.estimated["db_writes"] += new_passing
+        if new_matches:
+            self.counts["unknown_shortlist_decisions"] += new_matches
+
+        if self.resume and jd_id is not None and not new_matches and \
+                self.db_manager.get_checkpoint(STAGE_SCHEDULE, jd_key=str(jd_id)) is not None:
+            return
+        invitations = shortlisted + passing
+        if not invitations and not new_passing:
+            self.counts["db_writes"] += WRITES_EMPTY_SCHEDULE
+            return
+        self.counts["emails"] += invitations
+        self.estimated["emails"] += new_passing
+        booking = 1 if INTERVIEW_AVAILABILITY_FILE and os.path.exists(INTERVIEW_AVAILABILITY_FILE) else 0
+        self.counts["db_writes"] += invitations * WRITES_INVITATION + 1 + booking  # + schedule checkpoint
+        self.estimated["db_writes"] += new_passing * WRITES_INVITATION
+
+    def plan(self, job_descriptions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        paths = sorted(os.path.join(self.resumes_dir, name) for name in os.listdir(self.resumes_dir) if is_resume_file(name)) \
+            if os.path.isdir(self.resumes_dir) else []
+        for jd in job_descriptions:
+            jd_id, summary = self._summarize_jd(jd)
+            jd_skills: Optional[List[str]] = None
+            if summary is not None:
+                embedding_text = jd_embedding_text(summary)
+                if embedding_text is None:
+                    continue  # the pipeline skips resume matching for this JD
+                self._embedding(embedding_text, "jd_embeddings")
+                jd_skills = summary.get("required_skills", [])
+            else:
+                self.counts["jd_embeddings"] += 1
+                self.counts["unknown_jd_summaries"] += 1
+
+            kept, parsed_texts = self._drop_near_duplicates(paths)
+            prepared = self._extract_batched(jd_id, kept, parsed_texts) if RESUME_EXTRACTION_BATCH_SIZE > 1 else {}
+            new_matches = sum(self._process_resume(jd_id, jd_skills, path, parsed_texts, prepared) for path in kept)
+            if new_matches:
+                self.counts["db_writes"] += WRITES_INVALIDATE
+            self._shortlist_and_schedule(jd_id, new_matches)
+        return self.report(len(job_descriptions), len(paths))
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
+
+    # --- Report ---
+    def _latency(self, endpoint: str, model: str) -> Tuple[float, int]:
+        samples = self.cache.latencies(endpoint, model) if self.cache else []
+        return (statistics.median(samples), len(samples)) if samples else (DEFAULT_LATENCY_SECONDS[endpoint], 0)
+
+    def report(self, jd_count: int, resume_count: int) -> Dict[str, Any]:
+        completion_seconds, completion_samples = self._latency(ENDPOINT_GENERATE, OLLAMA_LLM_MODEL)
+        embedding_seconds, embedding_samples = self._latency(ENDPOINT_EMBEDDINGS, OLLAMA_EMBEDDING_MODEL)
+        parse_seconds = statistics.mean(self._parse_seconds) if self._parse_seconds else 0.0
+        workers = max(1, RESUME_WORKERS)
+        # JD summaries and JD embeddings run one at a time; per-resume work is spread over RESUME_WORKERS threads
+        serial = self.counts["jd_summaries"] * completion_seconds + self.counts["jd_embeddings"] * embedding_seconds
+        per_resume = (self.counts["extractions"] * completion_seconds + self.counts["parses"] * parse_seconds
+                      + (self.counts["resume_embeddings"] + self.counts["skill_embeddings"]) * embedding_seconds)
+        completions = self.counts["jd_summaries"] + self.counts["extractions"]
+        embeddings = self.counts["jd_embeddings"] + self.counts["resume_embeddings"] + self.counts["skill_embeddings"]
+        return {
+            "resume_mode": self.resume, "job_descriptions": jd_count, "resume_files": resume_count,
+            "parses": self.counts["parses"], "completions": completions, "embeddings": embeddings,
+            "db_writes": self.counts["db_writes"], "db_writes_estimated_extra": round(self.estimated["db_writes"], 1),
+            "emails": self.counts["emails"], "emails_estimated_extra": round(self.estimated["emails"], 1),
+            "details": dict(self.counts),
+            "shortlist_rate": self._shortlist_rate,
+            "latency_seconds": {"completion": completion_seconds, "completion_samples": completion_samples,
+                                "embedding": embedding_seconds, "embedding_samples": embedding_samples,
+                                "parse": parse_seconds},
+            "estimated_wall_seconds": serial + per_resume / workers,
+        }
+
+
+def format_plan(plan: Dict[str, Any]) -> str:
+    details = plan["details"]
+    latency = plan["latency_seconds"]
+
+    def reused(counter: str) -> str:
+        return f" ({details.get(f'{counter}_reused', 0)} reused)" if details.get(f"{counter}_reused") else ""
+
+    def estimated(key: str) -> str:
+        extra = plan[f"{key}_estimated_extra"]
+        return f" + ~{extra:g} for new matches passing the threshold" if extra else ""
+
+    def source(samples: int) -> str:
+        return f"median of {samples} recorded calls" if samples else "assumed, no recorded calls"
+
+    hours, remainder = divmod(int(plan["estimated_wall_seconds"]), 3600)
+    changes = plan.get("schema_changes", [])
+    lines = [f"Schema: `run` would first {'; '.join(changes[:3])}" + (f" (+{len(changes) - 3} more changes)" if len(changes) > 3 else "")
+             + ". Planned on an in-memory copy; nothing was written."] if changes else []
+    lines += [
+        f"Plan for {'`run --resume`' if plan['resume_mode'] else '`run`'}: {plan['job_descriptions']} JDs x {plan['resume_files']} resume files",
+        f"  Resume parses:     {plan['parses']}" + (f" ({details['near_duplicates_skipped']} near-duplicate resumes skipped)" if details.get("near_duplicates_skipped") else ""),
+        f"  LLM completions:   {plan['completions']} ({details.get('jd_summaries', 0)} JD summaries{reused('jd_summaries')}, "
+        f"{details.get('extractions', 0)} resume extractions{reused('extractions')})",
+        f"  Embeddings:        {plan['embeddings']} ({details.get('jd_embeddings', 0)} JD{reused('jd_embeddings')}, "
+        f"{details.get('resume_embeddings', 0)} resume{reused('resume_embeddings')}, {details.get('skill_embeddings', 0)} skill{reused('skill_embeddings')})",
+        f"  DB writes:         {plan['db_writes']}{estimated('db_writes')}",
+        f"  Emails:            {plan['emails']}{estimated('emails')}" + ("" if ENABLE_EMAIL_SENDING else " (printed only, ENABLE_EMAIL_SENDING is off)"),
+    ]
+    if details.get("matches_reused"):
+        lines.append(f"  Matches reused from checkpoints: {details['matches_reused']}")
+    unknown = details.get("unknown_extractions", 0) + details.get("unknown_jd_summaries", 0)
+    if unknown:
+        lines.append(f"  Skill embeddings of {unknown} new extractions/summaries depend on their (unknown) skills and are not counted")
+    if details.get("unknown_shortlist_decisions"):
+        rate = plan["shortlist_rate"]
+        lines.append(f"  Emails for {details['unknown_shortlist_decisions']} new matches are estimated at the historical shortlist rate"
+                     + (f" ({rate:.0%})" if rate is not None else " (no scored matches yet: counted as 0)"))
+    lines.append(f"  Estimated wall time: {hours}h {remainder // 60:02d}m {remainder % 60:02d}s "
+                 f"(completion {latency['completion']:.2f}s, {source(latency['completion_samples'])}; "
+                 f"embedding {latency['embedding']:.2f}s, {source(latency['embedding_samples'])}; "
+                 f"parse {latency['parse']:.3f}s; {max(1, RESUME_WORKERS)} resume workers)")
+    return "\n".join(lines)
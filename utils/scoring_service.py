@@ -0,0 +1,302 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Optional, Dict, List, Any, Callable
+
+from utils.ollama_client import OllamaClient
+from utils.db_pool import ThreadSafeDBManager
+from utils.checkpoints import CheckpointManager, STAGE_RESUME_MATCH, file_hash
+from utils.latency import LatencyTracker
+from agents.resume_matcher_agent import ResumeMatcherAgent, is_resume_file
+from agents.shortlister_agent import ShortlisterAgent
+from config import (
+    SERVICE_MAX_CONCURRENCY, SERVICE_MAX_QUEUE, SERVICE_MAX_UPLOAD_BYTES, SERVICE_UPLOAD_DIR,
+    DAEMON_JD_REFRESH_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceBusyError(Exception):
+    """Raised when the request queue is full; mapped to HTTP 503."""
+
+
+class RequestError(Exception):
+    """Client error with an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ScoringService:
+    """
+    Keeps the Ollama client, JD summaries and JD embeddings warm and runs scoring work on a fixed pool of
+    threads. Each pool thread owns its agents; they share one ThreadSafeDBManager (parallel reads, batched writes).
+    At most `max_concurrency` requests run at once and `max_queue` more may wait; the rest get HTTP 503.
+    """
+
+    def __init__(self, ollama_client: OllamaClient, max_concurrency: int = SERVICE_MAX_CONCURRENCY,
+                 max_queue: int = SERVICE_MAX_QUEUE, upload_dir: str = SERVICE_UPLOAD_DIR):
+        self.ollama_client = ollama_client
+        self.max_concurrency = max_concurrency
+        self.upload_dir = upload_dir
+        os.makedirs(upload_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="scoring")
+        self._admission = threading.BoundedSemaphore(max_concurrency + max_queue)
+        self._local = threading.local()
+        # One manager for all pool threads: parallel reads, writes batched by its single writer thread
+        self.db_manager = ThreadSafeDBManager()
+        self._jd_lock = threading.Lock()
+        self._jd_contexts: Dict[int, Dict[str, Any]] = {}
+        self._jd_contexts_loaded_at = 0.0
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.latency: Dict[str, LatencyTracker] = {}
+
+    # --- Per-thread resources ---
+    def _thread_agents(self) -> Dict[str, Any]:
+        agents = getattr(self._local, "agents", None)
+        if agents is None:
+            db_manager = self.db_manager
+            # Already-matched (JD, resume) pairs are never re-scored
+            checkpoints = CheckpointManager(db_manager, resume=True)
+            agents = {
+                "db_manager": db_manager,
+                "checkpoints": checkpoints,
+                "resume_matcher": ResumeMatcherAgent(self.ollama_client, db_manager, checkpoints),
+                # Shortlisting on request always re-evaluates, regardless of earlier runs
+                "shortlister": ShortlisterAgent(db_manager, CheckpointManager(db_manager, resume=False)),
+            }
+            self._local.agents = agents
+        return agents
+
+    def _jd_contexts_snapshot(self, agents: Dict[str, Any], force: bool = False) -> Dict[int, Dict[str, Any]]:
+        with self._jd_lock:
+            if force or time.time() - self._jd_contexts_loaded_at > DAEMON_JD_REFRESH_SECONDS:
+                agents["resume_matcher"].refresh_jd_contexts(self._jd_contexts)
+                self._jd_contexts_loaded_at = time.time()
+            return dict(self._jd_contexts)
+
+    def warm_up(self):
+        contexts = self._executor.submit(lambda: self._jd_contexts_snapshot(self._thread_agents(), force=True)).result()
+        logger.info(f"Scoring service warmed up with {len(contexts)} JDs.")
+
+    # --- Admission control ---
+    def run(self, endpoint: str, fn: Callable[..., Any], *args) -> Any:
+        if not self._admission.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise ServiceBusyError("Too many concurrent requests, retry later")
+        started = time.time()
+        with self._stats_lock:
+            self.in_flight += 1
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+                tracker = self.latency.setdefault(endpoint, LatencyTracker())
+            tracker.record(time.time() - started)
+            self._admission.release()
+
+    # --- Operations (run on pool threads) ---
+    def _save_upload(self, filename: str, content: bytes) -> str:
+        safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.basename(filename or ""))
+        if not safe_name or not is_resume_file(safe_name):
+            raise RequestError(400, "filename must end in .pdf or .docx")
+        target_path = os.path.join(self.upload_dir, safe_name)
+        if os.path.exists(target_path) and file_hash(target_path) != hashlib.sha256(content).hexdigest():
+            stem, extension = os.path.splitext(safe_name)
+            target_path = os.path.join(self.upload_dir, f"{stem}_{hashlib.sha256(content).hexdigest()[:8]}{extension}")
+        # Write then rename, so a watching daemon never sees a half-written file
+        temp_path = target_path + ".part"
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, target_path)
+        return target_path
+
+    def score_resume(self, filename: str, content: bytes, jd_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        agents = self._thread_agents()
+        resume_file_path = self._save_upload(filename, content)
+        contexts = self._jd_contexts_snapshot(agents)
+        if jd_ids:
+            missing = [jd_id for jd_id in jd_ids if jd_id not in contexts]
+            if missing:
+                contexts = self._jd_contexts_snapshot(agents, force=True)
+                missing = [jd_id for jd_id in jd_ids if jd_id not in contexts]
+            if missing:
+                raise RequestError(404, f"Unknown JD IDs: {missing}")
+            selected = [contexts[jd_id] for jd_id in jd_ids]
+        else:
+            selected = list(contexts.values())
+
+        agents["resume_matcher"].process_resume_for_jds(resume_file_path, selected)
+
+        # Previously matched pairs are skipped by the agent; their stored results are reported as-is
+        resume_key = file_hash(resume_file_path) or ""
+        response: Dict[str, Any] = {"resume_file_path": resume_file_path}
+        signature = agents["db_manager"].get_resume_signature(resume_key) if resume_key else None
+        if signature and signature[3]:
+            # Near-duplicate of an earlier resume: it was not scored itself, so the representative's scores are reported
+            representative = agents["db_manager"].get_resume_signature(signature[3])
+            response["duplicate_of"] = representative[1] if representative else None
+            resume_key = signature[3]
+        # The checkpoint only says which candidate row belongs to the pair; the score is read from matches,
+        # since rescoring (or new SCORE_WEIGHTS) updates it there
+        matched = []
+        for context in selected:
+            result = agents["checkpoints"].get(STAGE_RESUME_MATCH, jd_key=str(context["jd_id"]), resume_key=resume_key)
+            if result:
+                matched.append((context, result.get("candidate_id")))
+        current_scores = agents["db_manager"].get_match_scores([candidate_id for _, candidate_id in matched if candidate_id is not None])
+        scores = [{"jd_id": context["jd_id"], "job_title": context["summary"].get("job_title"),
+                   "candidate_id": candidate_id, "match_score": current_scores.get(candidate_id)}
+                  for context, candidate_id in matched]
+        scores.sort(key=lambda item: item["match_score"] if item["match_score"] is not None else -1.0, reverse=True)
+        response["scores"] = scores
+        return response
+
+    def ranked_candidates(self, jd_id: int, limit: int) -> Dict[str, Any]:
+        agents = self._thread_agents()
+        db_manager = agents["db_manager"]
+        candidates = [candidate.as_dict() for candidate in db_manager.iter_candidates_for_jd(jd_id, limit=limit)]
+        return {"jd_id": jd_id, "count": db_manager.count_candidates_for_jd(jd_id), "candidates": candidates}
+
+    def shortlist(self, jd_id: int) -> Dict[str, Any]:
+        agents = self._thread_agents()
+        agents["shortlister"].shortlist_candidates(jd_id)
+        shortlisted = agents["db_manager"].get_candidates_by_status_for_jd(jd_id, 'shortlisted')
+        return {"jd_id": jd_id, "shortlisted": [
+            {"candidate_id": row[0], "name": row[1], "email": row[2], "match_score": row[3]} for row in shortlisted
+        ]}
+
+    def search(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        def skill_list(name: str) -> List[str]:
+            return [skill for value in query.get(name, []) for skill in value.split(",") if skill.strip()]
+
+        min_years = query.get("min_years", [None])[0]
+        jd_id = query.get("jd_id", [None])[0]
+        try:
+            results = self._thread_agents()["db_manager"].search_resumes(
+                all_skills=skill_list("all"), any_skills=skill_list("any"), exclude_skills=skill_list("exclude"),
+                text_query=query.get("q", [None])[0], min_experience_years=float(min_years) if min_years else None,
+                job_description_id=int(jd_id) if jd_id else None, limit=int(query.get("limit", ["50"])[0])
+            )
+        except sqlite3.OperationalError as e:
+            # Malformed FTS5 query syntax
+            raise RequestError(400, f"Invalid search query: {e}")
+        return {"count": len(results), "results": results}
+
+    def list_jds(self) -> Dict[str, Any]:
+        contexts = self._jd_contexts_snapshot(self._thread_agents())
+        return {"jds": [{"jd_id": jd_id, "job_title": context["summary"].get("job_title")} for jd_id, context in sorted(contexts.items())]}
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            endpoints = dict(self.latency)
+            in_flight, rejected = self.in_flight, self.rejected
+        return {
+            "in_flight": in_flight,
+            "rejected": rejected,
+            "max_concurrency": self.max_concurrency,
+            "cached_jds": len(self._jd_contexts),
+            "latency_seconds": {endpoint: tracker.summary() for endpoint, tracker in endpoints.items()},
+            "db": self.db_manager.metrics(),
+            "ollama_concurrency": self.ollama_client.concurrency_metrics(),
+            "ollama_backends": self.ollama_client.backend_metrics(),
+            "ollama_responses": self.ollama_client.response_metrics(),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.db_manager.close()
+        self.ollama_client.close()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+      GET  /health
+      GET  /metrics
+      GET  /jds
+      GET  /jds/<id>/candidates?limit=50
+      GET  /search?all=python,docker&any=go&exclude=php&q=<fts5 query>&min_years=3&jd_id=1&limit=50
+      POST /jds/<id>/shortlist
+      POST /score?filename=cv.pdf[&jd_ids=1,2]   (request body = raw resume file)
+    """
+    service: ScoringService  # set by make_server
+
+    def log_message(self, format: str, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            if method == "GET" and parts == ["health"]:
+                self._send_json(200, {"status": "ok"})
+            elif method == "GET" and parts == ["metrics"]:
+                self._send_json(200, self.service.metrics())
+            elif method == "GET" and parts == ["jds"]:
+                self._send_json(200, self.service.run("jds", self.service.list_jds))
+            elif method == "GET" and parts == ["search"]:
+                self._send_json(200, self.service.run("search", self.service.search, query))
+            elif method == "GET" and len(parts) == 3 and parts[0] == "jds" and parts[2] == "candidates":
+                limit = int(query.get("limit", ["50"])[0])
+                self._send_json(200, self.service.run("candidates", self.service.ranked_candidates, int(parts[1]), limit))
+            elif method == "POST" and len(parts) == 3 and parts[0] == "jds" and parts[2] == "shortlist":
+                self._send_json(200, self.service.run("shortlist", self.service.shortlist, int(parts[1])))
+            elif method == "POST" and parts == ["score"]:
+                length = int(self.headers.get("Content-Length", "0"))
+                if length <= 0 or length > SERVICE_MAX_UPLOAD_BYTES:
+                    raise RequestError(413 if length > 0 else 400, f"Resume body must be 1..{SERVICE_MAX_UPLOAD_BYTES} bytes")
+                content = self.rfile.read(length)
+                jd_ids = [int(jd_id) for jd_id in query.get("jd_ids", [""])[0].split(",") if jd_id.strip()]
+                filename = query.get("filename", [""])[0]
+                started = time.time()
+                result = self.service.run("score", self.service.score_resume, filename, content, jd_ids or None)
+                result["elapsed_seconds"] = round(time.time() - started, 4)
+                self._send_json(200, result)
+            else:
+                self._send_json(404, {"error": f"No route for {method} {url.path}"})
+        except ServiceBusyError as e:
+            self._send_json(503, {"error": str(e)})
+        except RequestError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except ValueError as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            logger.error(f"Error handling {method} {self.path}: {e}", exc_info=True)
+            self._send_json(500, {"error": "Internal server error"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+def make_server(service: ScoringService, host: str, port: int) -> ThreadingHTTPServer:
+    handler = type("BoundScoringRequestHandler", (ScoringRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
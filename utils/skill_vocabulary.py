@@ -0,0 +1,109 @@
+import logging
+import numpy as np
+from typing import Optional, Dict, List, Iterable, Sequence
+
+from utils.ollama_client import OllamaClient
+from utils.db_manager import DBManager
+from utils.skills import SKILL_ALIASES, normalize_skill, normalize_skills # re-exported for existing callers
+
+logger = logging.getLogger(__name__)
+
+
+class SkillVocabulary:
+    """
+    Global, persisted vocabulary of normalized skill strings and their embeddings.
+    Each unique skill is embedded once per embedding model and shared by every JD and resume,
+    so embedding cost grows with the number of distinct skills rather than candidates x JDs.
+    """
+
+    def __init__(self, ollama_client: OllamaClient, db_manager: DBManager, model: Optional[str] = None):
+        self.ollama_client = ollama_client
+        self.db_manager = db_manager
+        self.model = model or ollama_client.embedding_model
+        self._index: Dict[str, int] = {}
+        self._vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._load()
+
+    def _load(self):
+        for skill, embedding_blob in self.db_manager.get_skill_embeddings(self.model):
+            self._add(skill, np.frombuffer(embedding_blob, dtype=np.float32))
+        logger.info(f"Loaded {len(self._index)} skill embeddings for model {self.model}")
+
+    def _add(self, skill: str, vector: np.ndarray):
+        self._index[skill] = len(self._vectors)
+        self._vectors.append(vector)
+        self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def ensure_embeddings(self, skills: Iterable[str]) -> List[str]:
+        """Embeds (and persists) any normalized skill not yet in the vocabulary. Returns the normalized skills that have a vector."""
+        normalized = normalize_skills(skills)
+        new_rows = []
+        for skill in normalized:
+            if skill in self._index:
+                continue
+            embedding = self.ollama_client.generate_embedding(skill)
+            if not embedding:
+                logger.warning(f"Failed to embed skill '{skill}'. It will be ignored for coverage scoring.")
+                continue
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                continue
+            vector /= norm
+            if self._vectors and vector.shape[0] != self._vectors[0].shape[0]:
+                logger.error(f"Embedding dimension mismatch for skill '{skill}': {vector.shape[0]} vs {self._vectors[0].shape[0]}")
+                continue
+            self._add(skill, vector)
+            new_rows.append((skill, vector.tobytes(), vector.shape[0]))
+        if new_rows:
+            self.db_manager.add_skill_embeddings(self.model, new_rows)
+            logger.info(f"Added {len(new_rows)} new skills to the vocabulary (size: {len(self._index)})")
+        return [skill for skill in normalized if skill in self._index]
+
+    def _full_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack(self._vectors) if self._vectors else np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    def indices(self, skills: Sequence[str]) -> np.ndarray:
+        return np.array([self._index[skill] for skill in skills if skill in self._index], dtype=np.int64)
+
+    def coverage(self, required_skills: Iterable[str], candidate_skills: Iterable[str]) -> Optional[float]:
+        scores = self.coverage_batch(required_skills, [candidate_skills])
+        return None if scores is None else float(scores[0])
+
+    def coverage_batch(self, required_skills: Iterable[str], candidates_skills: Sequence[Iterable[str]]) -> Optional[np.ndarray]:
+        """
+        Skill coverage for many candidates against one JD: for each required skill take the best cosine
+        match among the candidate's skills, then average over required skills.
+        Returns None when the JD has no embeddable required skills.
+        """
+        required = self.ensure_embeddings(required_skills)
+        if not required:
+            return None
+        candidate_lists = [self.ensure_embeddings(skills) for skills in candidates_skills]
+
+        matrix = self._full_matrix()
+        required_matrix = matrix[self.indices(required)]
+        union = sorted({skill for skills in candidate_lists for skill in skills})
+        if not union:
+            return np.zeros(len(candidate_lists), dtype=np.float32)
+        union_position = {skill: position for position, skill in enumerate(union)}
+
+        # Required skills x unique candidate skills, computed once for the whole batch
+        similarity = np.clip(required_matrix @ matrix[self.indices(union)].T, 0.0, 1.0)
+
+        scores = np.zeros(len(candidate_lists), dtype=np.float32)
+        lengths = np.array([len(skills) for skills in candidate_lists])
+        non_empty = lengths > 0
+        if non_empty.any():
+            columns = np.array([union_position[skill] for skills in candidate_lists for skill in skills], dtype=np.int64)
+            offsets = np.concatenate(([0], np.cumsum(lengths[non_empty])[:-1]))
+            # Best match per required skill within each candidate's column block
+            best = np.maximum.reduceat(similarity[:, columns], offsets, axis=1)
+            scores[non_empty] = best.mean(axis=0)
+        return scores
@@ -0,0 +1,31 @@
+import re
+from typing import Dict, List, Iterable
+
+# Common spelling variants mapped onto one vocabulary entry
+SKILL_ALIASES: Dict[str, str] = {
+    "js": "javascript",
+    "ts": "typescript",
+    "k8s": "kubernetes",
+    "golang": "go",
+    "postgres": "postgresql",
+    "ml": "machine learning",
+    "nodejs": "node.js",
+    "node": "node.js",
+    "react.js": "react",
+    "reactjs": "react",
+}
+
+
+def normalize_skill(skill: str) -> str:
+    normalized = re.sub(r"\s+", " ", str(skill or "")).strip().strip(".,;:-*").lower()
+    return SKILL_ALIASES.get(normalized, normalized)
+
+
+def normalize_skills(skills: Iterable[str]) -> List[str]:
+    """Normalizes and de-duplicates a skill list, preserving order."""
+    seen: Dict[str, None] = {}
+    for skill in skills or []:
+        normalized = normalize_skill(skill)
+        if normalized:
+            seen.setdefault(normalized, None)
+    return list(seen)
@@ -0,0 +1,186 @@
+import os
+import json
+import heapq
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Set, Tuple, Iterable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+EPOCH = datetime(1970, 1, 1)
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+DEFAULT_PANEL = "default"
+
+
+def to_minute(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(minutes=1)
+
+
+def from_minute(minute: int) -> datetime:
+    return EPOCH + timedelta(minutes=minute)
+
+
+class InterviewRequest(NamedTuple):
+    match_id: int
+    resume_id: Optional[int]  # one person shortlisted for two JDs must not get overlapping interviews
+    score: float
+    panel: str  # key into SlotAllocator.panels, see panel_for()
+
+
+class Booking(NamedTuple):
+    match_id: int
+    interviewers: Tuple[str, ...]
+    start: datetime
+    end: datetime
+
+
+class SlotAllocator:
+    """
+    Assigns interview slots from interviewer availability. The availability file (JSON) looks like:
+
+        {"slot_minutes": 45, "horizon_days": 14,
+         "interviewers": {"alice@corp.com": {"weekly": {"mon": ["09:00-12:00"], "wed": ["14:00-17:00"]},
+                                             "windows": [{"start": "2026-11-02T09:00", "end": "2026-11-02T12:00"}]}},
+         "panels": {"default": {"interviewers": ["alice@corp.com"], "size": 1},
+                    "3": {"interviewers": ["alice@corp.com", "bob@corp.com"], "size": 2}}}
+
+    "weekly" hours repeat for the next `horizon_days`. Each window is cut into back-to-back slots from its own
+    start ("14:00-17:00" gives 14:00, 14:45, 15:30 and 16:15). Panels are looked up by JD id, then job title, then
+    "default" (every interviewer, one per interview); an interview needs `size` panel members at once.
+    An interviewer's free time is kept as a set of free minutes, so bookings and reservations remove exactly
+    the time they overlap, whatever the slot alignment. Each panel keeps a min-heap of its members' slot
+    starts. Requests are served best score first with the earliest slot where enough members and the
+    candidate are free: O(log slots + slot_minutes) each.
+    """
+
+    def __init__(self, config: Dict[str, Any], now: Optional[datetime] = None, min_notice_hours: float = 0.0):
+        self.slot_minutes = int(config.get("slot_minutes", 45))
+        if not 0 < self.slot_minutes <= MINUTES_PER_DAY:
+            raise ValueError(f"slot_minutes must be between 1 and {MINUTES_PER_DAY}, got {self.slot_minutes}")
+        self.horizon_days = int(config.get("horizon_days", 14))
+        now = now or datetime.now()
+        self.earliest = to_minute(now + timedelta(hours=min_notice_hours))
+        self.free: Dict[str, Set[int]] = {}  # free minutes per interviewer
+        self.starts: Dict[str, Set[int]] = {}  # slot starts per interviewer, aligned to each window's start
+        for interviewer, availability in (config.get("interviewers") or {}).items():
+            self.free[interviewer], self.starts[interviewer] = self._expand(availability or {}, now)
+        self.panels = self._load_panels(config.get("panels") or {})
+        self.load: Counter = Counter()  # interviews per interviewer, to spread a panel's work
+        self._heaps: Dict[str, List[int]] = {}
+        self._candidate_busy: Dict[int, Set[int]] = {}
+        logger.info(f"Slot allocator: {len(self.free)} interviewers, {sum(len(slots) for slots in self.starts.values())} "
+                    f"free {self.slot_minutes}-minute slots, {len(self.panels)} panels")
+
+    @classmethod
+    def from_file(cls, path: str, now: Optional[datetime] = None, min_notice_hours: float = 0.0) -> Optional["SlotAllocator"]:
+        """None when the file does not exist (scheduling then falls back to proposing a time by email)."""
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), now=now, min_notice_hours=min_notice_hours)
+
+    # --- Availability ---
+    def _window_slots(self, start: int, end: int) -> List[int]:
+        """Back-to-back slot starts inside [start, end), counted from `start`."""
+        return list(range(start, end - self.slot_minutes + 1, self.slot_minutes))
+
+    def _expand(self, availability: Dict[str, Any], now: datetime) -> Tuple[Set[int], Set[int]]:
+        spans = [(datetime.fromisoformat(window["start"]), datetime.fromisoformat(window["end"]))
+                 for window in availability.get("windows", [])]
+        weekly = availability.get("weekly") or {}
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for day in (today + timedelta(days=offset) for offset in range(self.horizon_days if weekly else 0)):
+            for span in weekly.get(WEEKDAYS[day.weekday()], []):
+                start_text, _, end_text = span.partition("-")
+                spans.append((datetime.combine(day.date(), datetime.strptime(start_text.strip(), "%H:%M").time()),
+                              datetime.combine(day.date(), datetime.strptime(end_text.strip(), "%H:%M").time())))
+        free: Set[int] = set()
+        starts: Set[int] = set()
+        for start, end in spans:
+            start_minute, end_minute = to_minute(start), to_minute(end)
+            free.update(range(start_minute, end_minute))
+            # Slots keep the window's alignment on every run; those starting before the notice period are dropped
+            starts.update(slot for slot in self._window_slots(start_minute, end_minute) if slot >= self.earliest)
+        return free, starts
+
+    def _load_panels(self, panels: Dict[str, Any]) -> Dict[str, Tuple[List[str], int]]:
+        loaded: Dict[str, Tuple[List[str], int]] = {}
+        for key, panel in panels.items():
+            members = panel.get("interviewers", []) if isinstance(panel, dict) else list(panel)
+            size = int(panel.get("size", 1)) if isinstance(panel, dict) else 1
+            unknown = [member for member in members if member not in self.free]
+            if unknown:
+                logger.warning(f"Panel '{key}' lists interviewers without availability: {', '.join(unknown)}")
+            members = [member for member in members if member in self.free]
+            if size > len(members):
+                logger.error(f"Panel '{key}' needs {size} interviewers but only {len(members)} have availability; it cannot be scheduled.")
+            loaded[str(key)] = (members, size)
+        if DEFAULT_PANEL not in loaded:
+            loaded[DEFAULT_PANEL] = (sorted(self.free), 1)
+        return loaded
+
+    def panel_for(self, jd_id: int, job_title: Optional[str] = None) -> str:
+        for key in (str(jd_id), job_title):
+            if key and key in self.panels:
+                return key
+        return DEFAULT_PANEL
+
+    def reserve(self, interviewer: str, start: datetime, end: datetime, resume_id: Optional[int] = None):
+        """Marks an existing booking (an earlier run, another worker) as taken for the interviewer and candidate."""
+        taken = range(to_minute(start), to_minute(end))
+        self.free.get(interviewer, set()).difference_update(taken)
+        self.load[interviewer] += 1
+        if resume_id is not None:
+            self._candidate_busy.setdefault(resume_id, set()).update(taken)
+
+    # --- Allocation ---
+    def _heap(self, panel: str) -> List[int]:
+        heap = self._heaps.get(panel)
+        if heap is None:
+            members, _ = self.panels[panel]
+            heap = sorted(set().union(*(self.starts[member] for member in members)))  # sorted is a valid heap
+            self._heaps[panel] = heap
+        return heap
+
+    def allocate(self, requests: Iterable[InterviewRequest]) -> Dict[int, Booking]:
+        """Books the earliest feasible slot for each request, best score first; requests that do not fit are left out."""
+        bookings: Dict[int, Booking] = {}
+        for request in sorted(requests, key=lambda request: -(request.score or 0.0)):
+            booking = self._allocate_one(request)
+            if booking:
+                bookings[request.match_id] = booking
+        return bookings
+
+    def _allocate_one(self, request: InterviewRequest) -> Optional[Booking]:
+        members, size = self.panels[request.panel]
+        if size > len(members):
+            return None
+        heap = self._heap(request.panel)
+        busy = self._candidate_busy.get(request.resume_id, set())
+        skipped: List[int] = []
+        booking = None
+        while heap:
+            slot = heap[0]
+            minutes = range(slot, slot + self.slot_minutes)
+            free_members = [member for member in members if self.free[member].issuperset(minutes)]
+            if len(free_members) < size:
+                heapq.heappop(heap)  # time is only ever taken, so this slot cannot fit the panel again
+                continue
+            if not busy.isdisjoint(minutes):
+                skipped.append(heapq.heappop(heap))  # only this candidate is busy then
+                continue
+            chosen = tuple(sorted(free_members, key=lambda member: self.load[member])[:size])
+            for member in chosen:
+                self.free[member].difference_update(minutes)
+                self.load[member] += 1
+            if len(free_members) - size < size:
+                heapq.heappop(heap)
+            if request.resume_id is not None:
+                self._candidate_busy.setdefault(request.resume_id, set()).update(minutes)
+            booking = Booking(request.match_id, chosen, from_minute(slot), from_minute(slot + self.slot_minutes))
+            break
+        for slot in skipped:
+            heapq.heappush(heap, slot)
+        return booking
@@ -0,0 +1,140 @@
+import re
+import logging
+from collections import Counter
+from typing import Optional, Dict, List, Set
+
+from utils.resume_heuristics import split_sections
+from utils.file_parser import PAGE_BREAK
+
+logger = logging.getLogger(__name__)
+
+# Lower value = more useful to the extraction prompt. "header" holds the contact block before the first section.
+SECTION_PRIORITY: Dict[str, int] = {
+    "header": 0,
+    "skills": 1,
+    "experience": 2,
+    "education": 3,
+    "projects": 4,
+    "certifications": 5,
+    "summary": 6,
+}
+DEFAULT_SECTION_PRIORITY = 10
+
+SECTION_TITLES: Dict[str, str] = {
+    "header": "Contact",
+    "skills": "Skills",
+    "experience": "Experience",
+    "education": "Education",
+    "projects": "Projects",
+    "certifications": "Certifications",
+    "summary": "Summary",
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Only explicit markers ("Page 2", "- Page 2 of 3 -"); bare numbers may be phone numbers or years
+_PAGE_MARKER_PATTERN = re.compile(r"^(-\s*)?page\s*\d+(\s*(of|/)\s*\d+)?(\s*-)?$", re.IGNORECASE)
+PAGE_EDGE_LINES = 2  # Non-empty lines at the top and bottom of each page checked for running headers/footers
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap BPE-ish estimate: words and punctuation marks count as one token each, long words as more."""
+    return sum(1 + len(token) // 8 for token in _TOKEN_PATTERN.findall(text or ""))
+
+
+def _normalize_page(text: str) -> str:
+    text = text.replace("\xa0", " ").replace("\t", " ").replace("\r", "\n")
+    lines = [re.sub(r" {2,}", " ", line).strip() for line in text.split("\n")]
+    # Collapse runs of blank lines left behind by PyPDF2's layout output
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def normalize_whitespace(text: str) -> str:
+    # Page breaks are kept on a line of their own for remove_repeated_lines
+    pages = [_normalize_page(page) for page in (text or "").split(PAGE_BREAK)]
+    return f"\n{PAGE_BREAK}\n".join(page for page in pages if page)
+
+
+def _line_signature(line: str) -> str:
+    # Running footers like "Jane Doe - Page 2" only differ by their page number
+    return re.sub(r"\bpage\s*\d+(\s*(of|/)\s*\d+)?", "page #", line.lower())
+
+
+def _page_edges(lines: List[str]) -> Set[int]:
+    content = [position for position, line in enumerate(lines) if re.search(r"[^\W\d_]", line)]
+    return set(content[:PAGE_EDGE_LINES] + content[-PAGE_EDGE_LINES:])
+
+
+def remove_repeated_lines(text: str) -> str:
+    """
+    Drops "Page N (of M)" markers and running headers/footers: lines at the top or bottom of a page that
+    also appear at the top or bottom of another page (the first occurrence is kept). Lines inside a
+    page are never dropped, even when they repeat (two jobs can share a title).
+    """
+    pages = [[line for line in page.split("\n") if not _PAGE_MARKER_PATTERN.match(line)]
+             for page in text.split(PAGE_BREAK)]
+    edges = [_page_edges(lines) for lines in pages]
+    pages_per_signature = Counter(signature for lines, edge in zip(pages, edges)
+                                  for signature in {_line_signature(lines[position]) for position in edge})
+    seen_signatures = set()
+    kept: List[str] = []
+    for lines, edge in zip(pages, edges):
+        for position, line in enumerate(lines):
+            if position in edge and pages_per_signature[_line_signature(line)] > 1:
+                signature = _line_signature(line)
+                if signature in seen_signatures:
+                    continue
+                seen_signatures.add(signature)
+            kept.append(line)
+        kept.append("")
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def _truncate_to_budget(text: str, token_budget: int) -> str:
+    kept: List[str] = []
+    used = 0
+    for line in text.split("\n"):
+        line_tokens = estimate_tokens(line)
+        if used + line_tokens > token_budget:
+            break
+        kept.append(line)
+        used += line_tokens
+    return "\n".join(kept).strip()
+
+
+def compact_resume_text(text: str, token_budget: int,
+                        section_priority: Optional[Dict[str, int]] = None) -> str:
+    """
+    Normalises and de-duplicates resume text, then fills `token_budget` with whole sections in
+    priority order (the last section that does not fit is truncated line by line).
+    Selected sections are emitted in their original document order.
+    """
+    priorities = {**SECTION_PRIORITY, **(section_priority or {})}
+    cleaned = remove_repeated_lines(normalize_whitespace(text))
+    sections = split_sections(cleaned)
+    if not sections:
+        return ""
+
+    document_order = list(sections)
+    ranked = sorted(document_order, key=lambda name: (priorities.get(name, DEFAULT_SECTION_PRIORITY), document_order.index(name)))
+
+    selected: Dict[str, str] = {}
+    remaining = token_budget
+    for name in ranked:
+        title = SECTION_TITLES.get(name, name.title())
+        block = f"## {title}\n{sections[name]}"
+        block_tokens = estimate_tokens(block)
+        if block_tokens <= remaining:
+            selected[name] = block
+            remaining -= block_tokens
+        elif remaining > estimate_tokens(f"## {title}") + 8:
+            truncated = _truncate_to_budget(block, remaining)
+            if truncated:
+                selected[name] = truncated
+                remaining -= estimate_tokens(truncated)
+        if remaining <= 0:
+            break
+
+    compacted = "\n\n".join(selected[name] for name in document_order if name in selected)
+    logger.debug(f"Compacted resume text from ~{estimate_tokens(text)} to ~{estimate_tokens(compacted)} tokens "
+                 f"(sections kept: {', '.join(name for name in document_order if name in selected)})")
+    return compacted
@@ -0,0 +1,56 @@
+import os
+import socket
+import logging
+import threading
+from typing import Optional
+
+from utils.db_manager import DBManager
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id(suffix: Optional[str] = None) -> str:
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    return f"{worker_id}-{suffix}" if suffix else worker_id
+
+
+class LeaseHeartbeat:
+    """
+    Background thread that keeps a work item lease alive while the worker processes it.
+    Uses its own DB connection because sqlite3 connections cannot be shared across threads.
+    `lost` is set if another worker took over the item (e.g. this process stalled past the lease).
+    """
+
+    def __init__(self, item_id: int, worker_id: str, lease_seconds: int, interval_seconds: int, db_path: Optional[str] = None):
+        self.item_id = item_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval_seconds = interval_seconds
+        self.db_path = db_path
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-heartbeat-{item_id}", daemon=True)
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join(timeout=self.interval_seconds)
+
+    def _run(self):
+        db_manager = DBManager(self.db_path) if self.db_path else DBManager()
+        try:
+            while not self._stop.wait(self.interval_seconds):
+                try:
+                    if not db_manager.renew_work_item_lease(self.item_id, self.worker_id, self.lease_seconds):
+                        logger.error(f"Worker {self.worker_id} lost the lease on work item {self.item_id}")
+                        self.lost.set()
+                        return
+                    logger.debug(f"Worker {self.worker_id} renewed lease on work item {self.item_id}")
+                except Exception as e:
+                    # A transient lock error should not kill the heartbeat; the lease has slack
+                    logger.warning(f"Heartbeat for work item {self.item_id} failed: {e}")
+        finally:
+            db_manager.close()